@@ -6,6 +6,15 @@ defaults = {
     "strict-file-paths": False,
     "raster-limit": 12 * (1024 ** 2),  # ca. 100 MB of float64
     "geometry-limit": 10000,
+    "scheduler": "sync",
+    "result-cache-size": 0,  # in bytes, 0 disables the result cache
+    "token-sample-size": 0,  # in bytes, 0 hashes arrays completely
+    "construct-cache-size": 0,  # number of graphs, 0 disables the cache
+    "dataset-pool-size": 16,  # open GDAL datasets per thread, 0 disables
+    "warp-cache-size": 64 * (1024 ** 2),  # in bytes, 0 disables
+    "raster-cache-size": 1024 ** 3,  # in bytes, per RasterCache path
+    "temporal-chunk-size": 0,  # in bytes of source data per request, 0 disables
+    "checkpoint-cache-size": 0,  # in bytes, 0 disables Cumulative checkpoints
 }
 
 dask.config.update_defaults({"geomodeling": defaults})
@@ -1 +1,3 @@
 from .graphs import *  # NOQA
+from .cache import *  # NOQA
+from .profiling import *  # NOQA
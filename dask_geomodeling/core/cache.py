@@ -0,0 +1,107 @@
+"""
+Module containing the in-process result cache.
+"""
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from dask import config
+
+__all__ = ["ResultCache", "get_result_cache", "estimate_size"]
+
+
+def estimate_size(obj):
+    """Estimate the size in bytes of a (nested) Block.process result.
+
+    Arrays are measured by their ``nbytes``, (Geo)DataFrames and Series by
+    their (deep) memory usage. Dictionaries, lists and tuples are traversed.
+    """
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_size(x) for x in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(estimate_size(x) for x in obj)
+    return sys.getsizeof(obj)
+
+
+class ResultCache(object):
+    """A thread-safe least-recently-used cache with a budget in bytes.
+
+    :param maxsize: the maximum total size of the stored results in bytes
+
+    Results that are larger than ``maxsize`` are not stored. The size of a
+    result is estimated with :func:`estimate_size`.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = int(maxsize)
+        self.size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        """Return the result stored at key and mark it as recently used."""
+        with self._lock:
+            try:
+                value, _ = self._data[key]
+            except KeyError:
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """Store a result. Returns False if the result is too large."""
+        size = estimate_size(value)
+        if size > self.maxsize:
+            return False
+        with self._lock:
+            if key in self._data:
+                self.size -= self._data.pop(key)[1]
+            self._data[key] = value, size
+            self.size += size
+            self._evict()
+        return True
+
+    def resize(self, maxsize):
+        """Change the budget, evicting results if necessary."""
+        with self._lock:
+            self.maxsize = int(maxsize)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def _evict(self):
+        while self.size > self.maxsize and self._data:
+            _, (_, size) = self._data.popitem(last=False)
+            self.size -= size
+
+
+_result_cache = ResultCache(0)
+
+
+def get_result_cache():
+    """Return the process-wide result cache.
+
+    The budget of the cache (in bytes) is taken from the
+    geomodeling.result-cache-size setting. A size of 0 disables the cache.
+    """
+    maxsize = config.get("geomodeling.result-cache-size", 0)
+    if maxsize != _result_cache.maxsize:
+        _result_cache.resize(maxsize)
+    return _result_cache
@@ -1,30 +1,105 @@
 """
 Module containing the core graphs.
 """
-import inspect
 import sys
 import json
+import hashlib
 import logging
-
+import pickle
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import partial, wraps
+
+import numpy as np
+from dask import config
 from dask.base import tokenize, normalize_token
+from dask.callbacks import Callback
 from dask.local import get_sync
 
 from shapely.geometry.base import BaseGeometry
 from datetime import datetime
 from datetime import timedelta
 
+from .cache import get_result_cache
+from .profiling import get_callbacks, _insert_profiling
+
 logger = logging.getLogger(__name__)
 
-__all__ = ["construct", "construct_multiple", "compute", "Block", "DummyBlock"]
+__all__ = [
+    "construct",
+    "construct_multiple",
+    "compute",
+    "compute_multiple",
+    "get_data_many",
+    "planning_cache",
+    "get_scheduler",
+    "cached_metadata",
+    "Block",
+    "DummyBlock",
+]
+
+
+def _get_keys(args, graph):
+    """List the keys of graph in args, also inside (nested) lists."""
+    keys = []
+    stack = list(args)
+    while stack:
+        arg = stack.pop()
+        if isinstance(arg, list):
+            stack.extend(arg)
+            continue
+        try:
+            if arg in graph:
+                keys.append(arg)
+        except TypeError:  # unhashable
+            pass
+    return keys
+
+
+def _substitute_keys(arg, results):
+    """Replace keys in arg by their results, also inside (nested) lists."""
+    if isinstance(arg, list):
+        return [_substitute_keys(x, results) for x in arg]
+    try:
+        return results[arg]
+    except (KeyError, TypeError):
+        return arg
 
 
-def _construct_exc_callback(e, dumps):
-    """Callback to be used as a 'pack_exception' kwarg in get_sync
+def _construct_graph(graph, names):
+    """Evaluate a graph of {key: (constructor, *args)}, depth-first.
 
+    Args that are keys of the graph (also inside lists) are replaced by the
+    constructed objects, as dask's ``get_sync`` would do, but without the
+    overhead of a scheduler and without recursion. Exceptions are raised with
+    the key prepended to their message.
     """
-    key = inspect.currentframe().f_back.f_locals.get("key")
-    e.args = ("{0}: {1}".format(key, str(e)),)
-    raise e
+    results = {}
+    in_progress = set()
+    stack = [(name, False) for name in reversed(names)]
+    while stack:
+        key, ready = stack.pop()
+        if key in results:
+            continue
+        task = graph[key]
+        if not ready:
+            if key in in_progress:
+                raise ValueError("Found a cycle in the graph at '{}'".format(key))
+            in_progress.add(key)
+            stack.append((key, True))
+            stack.extend(
+                (dep, False) for dep in _get_keys(task[1:], graph) if dep not in results
+            )
+            continue
+        args = [_substitute_keys(arg, results) for arg in task[1:]]
+        try:
+            results[key] = task[0](*args)
+        except Exception as e:
+            e.args = ("{0}: {1}".format(key, str(e)),)
+            raise e
+    return tuple(results[name] for name in names)
 
 
 def _reconstruct_token(key):
@@ -39,10 +114,276 @@ def _reconstruct_token(key):
     return token.lower()
 
 
-def compute(graph, name, *args, **kwargs):
-    """Compute a graph ({name: [func, arg1, arg2, ...]}) using dask.get_sync
+def _get_threaded():
+    from dask.threaded import get
+
+    return get
+
+
+def _get_multiprocessing():
+    from dask.multiprocessing import get
+
+    return get
+
+
+SCHEDULERS = {
+    "sync": lambda: get_sync,
+    "threads": _get_threaded,
+    "processes": _get_multiprocessing,
+}
+
+
+def get_scheduler(scheduler=None):
+    """Return the dask ``get`` function to compute graphs with.
+
+    :param scheduler: one of ``'sync'``, ``'threads'``, ``'processes'`` or a
+      dask ``get`` callable. Defaults to the geomodeling.scheduler setting.
+
+    The global scheduler setting can be adapted as follows:
+      >>> from dask import config
+      >>> config.set({"geomodeling.scheduler": "threads"})
+    """
+    if scheduler is None:
+        scheduler = config.get("geomodeling.scheduler", "sync")
+    if callable(scheduler):
+        return scheduler
+    try:
+        return SCHEDULERS[scheduler]()
+    except (KeyError, TypeError):
+        raise ValueError(
+            "Unknown scheduler '{}', use one of {} or a dask get "
+            "function".format(scheduler, sorted(SCHEDULERS))
+        )
+
+
+_missing = object()
+
+
+def _cached_result(value):
+    return value
+
+
+def _get_cache_keys(graph, names):
+    """Return the result cache keys of names and the nodes they depend on.
+
+    A node name only identifies a block and a request. The cache key of a node
+    also includes the keys of the nodes it depends on, so that it changes when
+    a file that is read upstream is changed (the names of the nodes of such
+    blocks include the file signature, see Block.get_file_signature).
+    """
+    keys = {}
+    stack = list(names)
+    while stack:
+        name = stack[-1]
+        if name in keys:
+            stack.pop()
+            continue
+        deps = [arg for arg in graph[name][1:] if isinstance(arg, str) and arg in graph]
+        missing = [dep for dep in deps if dep not in keys]
+        if missing:
+            stack.extend(missing)
+            continue
+        stack.pop()
+        if deps:
+            keys[name] = "{}_{}".format(name, tokenize([keys[dep] for dep in deps]))
+        else:
+            keys[name] = name
+    return keys
+
+
+def _insert_cache(graph, names, cache):
+    """Return a graph in which the nodes that are present in the result cache
+    are replaced by their result. Nodes that are not needed are left out.
+
+    Also returns a dict with the cache keys of the nodes that are computed."""
+    keys = _get_cache_keys(graph, names)
+    new_graph = {}
+    computed = {}
+    stack = list(names)
+    while stack:
+        name = stack.pop()
+        if name in new_graph:
+            continue
+        value = cache.get(keys[name], _missing)
+        if value is not _missing:
+            new_graph[name] = (partial(_cached_result, value),)
+            continue
+        task = graph[name]
+        new_graph[name] = task
+        computed[name] = keys[name]
+        stack.extend(arg for arg in task[1:] if isinstance(arg, str) and arg in graph)
+    return new_graph, computed
+
+
+def _store_result(cache, keys, name, result, graph, state, worker_id):
+    """Callback that stores the result of a computed node in the cache"""
+    key = keys.get(name)
+    if key is not None:
+        cache.put(key, result)
+
+
+def compute(graph, name, *args, scheduler=None, **kwargs):
+    """Compute a graph ({name: [func, arg1, arg2, ...]}) using a dask scheduler
+
+    The scheduler defaults to the geomodeling.scheduler setting (``'sync'``).
+    Extra keyword arguments (e.g. ``num_workers``) are passed to the
+    scheduler's ``get`` function.
+
+    If the geomodeling.result-cache-size setting is nonzero, results of
+    individual nodes are kept in an in-process LRU cache keyed by node name,
+    so that subsequent computations skip the nodes that were already
+    computed. Cached results are shared: do not modify them inplace.
+
+    Results of blocks that read files are cached until the modification time
+    or the size of the file changes (see :meth:`Block.get_file_signature`).
+    The results are stored by the process that runs the scheduler, so that
+    this also works with the 'processes' scheduler. Custom ``get`` functions
+    that do not support dask callbacks (e.g. of dask.distributed) only use the
+    results that are already in the cache.
+
+    Active node callbacks (see :class:`NodeCallback` and :class:`Profiler`)
+    are notified of every node that is computed.
+    """
+    return compute_multiple(graph, [name], scheduler=scheduler, **kwargs)[0]
+
+
+def compute_multiple(graph, names, scheduler=None, **kwargs):
+    """Compute multiple endpoints of a graph in one go.
+
+    Nodes that are shared between endpoints are computed only once. See
+    :func:`compute` for the other arguments. Returns a list of results, in the
+    order of ``names``.
     """
-    return get_sync(graph, [name])[0]
+    get = get_scheduler(scheduler)
+    cache = get_result_cache()
+    computed = None
+    if cache.maxsize > 0:
+        graph, computed = _insert_cache(graph, names, cache)
+    callbacks = get_callbacks()
+    if callbacks:
+        cached = () if computed is None else set(graph) - set(computed)
+        graph = _insert_profiling(graph, callbacks, cached)
+    if not computed:
+        return list(get(graph, list(names), **kwargs))
+    # store the results from the scheduler, as the nodes may run in another
+    # process
+    with Callback(posttask=partial(_store_result, cache, computed)):
+        return list(get(graph, list(names), **kwargs))
+
+
+def get_data_many(blocks_and_requests, scheduler=None):
+    """Evaluate multiple (block, request) tuples in one computation.
+
+    A single compute graph is generated for all requests, so that identical
+    (block, request) combinations (e.g. reads from the same source) are
+    computed only once. Returns a list of results, in the order of
+    ``blocks_and_requests``.
+
+    Identical requests share the same result object: do not modify results
+    inplace.
+    """
+    graph = {}
+    names = []
+    with planning_cache():
+        for block, request in blocks_and_requests:
+            graph, name = block.get_compute_graph(cached_compute_graph=graph, **request)
+            names.append(name)
+    if not names:
+        return []
+    return compute_multiple(graph, names, scheduler=scheduler)
+
+
+# the request modes of which the results are kept in the planning cache
+PLANNING_CACHE_MODES = ("time", "meta", "extent")
+
+_planning = threading.local()
+
+
+@contextmanager
+def planning_cache():
+    """Context manager that evaluates identical planning sub-requests once.
+
+    Some blocks compute data while generating the compute graph, for example
+    the 'time' or 'extent' of a source. Inside this context, the results of
+    ``Block.get_data`` calls with a mode in PLANNING_CACHE_MODES are kept, so
+    that identical requests are evaluated only once.
+
+    Every ``Block.get_compute_graph`` call is wrapped in this context. Use it
+    explicitly to share planning results between multiple calls, for example
+    when computing a batch of tiles:
+
+    >>> with planning_cache():
+    ...     tiles = [view.get_data(**request) for request in requests]
+
+    The cache is local to the current thread. Cached results are shared: do
+    not modify them inplace.
+    """
+    if getattr(_planning, "cache", None) is not None:
+        yield  # nested: the outermost context owns the cache
+        return
+    _planning.cache = {}
+    try:
+        yield
+    finally:
+        _planning.cache = None
+
+
+def _get_compute_name(block, request):
+    """Return the name of the compute graph node of block and request."""
+    # NB generates a random hash if the request cannot be tokenized
+    signature = block.get_file_signature()
+    if signature is None:
+        token = tokenize([block.token, request])
+    else:
+        token = tokenize([block.token, request, signature])
+    return "{}_{}".format(block.__class__.__name__.lower(), token)
+
+
+# caches for Block.get_import_path and Block.from_import_path
+_import_paths = {}
+_import_path_classes = {}
+
+_validated_graphs = OrderedDict()
+_validated_graphs_lock = threading.Lock()
+
+
+def _get_graph_key(graph, names):
+    """Return a content hash of a graph, or None if it can't be pickled.
+
+    Pickling is much faster than tokenizing. Equal pickles imply equal graphs.
+    The settings that file path validation depends on are included, so that
+    a graph is validated again when they change.
+    """
+    settings = (
+        config.get("geomodeling.root"),
+        config.get("geomodeling.strict-file-paths"),
+    )
+    try:
+        pickled = pickle.dumps(
+            (graph, list(names), settings), protocol=pickle.HIGHEST_PROTOCOL
+        )
+    except Exception:
+        return
+    return hashlib.sha1(pickled).hexdigest()
+
+
+def _get_validated_graph(key):
+    if key is None:
+        return
+    with _validated_graphs_lock:
+        try:
+            _validated_graphs.move_to_end(key)
+            return _validated_graphs[key]
+        except KeyError:
+            return
+
+
+def _put_validated_graph(key, value):
+    maxsize = config.get("geomodeling.construct-cache-size", 0)
+    with _validated_graphs_lock:
+        _validated_graphs[key] = value
+        while len(_validated_graphs) > maxsize:
+            _validated_graphs.popitem(last=False)
 
 
 def construct(graph, name, validate=True):
@@ -53,7 +394,22 @@ def construct(graph, name, validate=True):
 
 def construct_multiple(graph, names, validate=True):
     """Construct multiple Blocks from given graph and endpoint names.
+
+    If the geomodeling.construct-cache-size setting is nonzero, up to that
+    number of graphs that were constructed with validation are remembered by
+    their contents (and the root and strict-file-paths settings), so that
+    constructing them again skips the validation (e.g. file access in
+    ``__init__``). The remembered graphs keep their arguments (e.g. arrays of
+    a MemorySource) in memory. Also, changes on disk are not noticed: a file
+    that was removed after the first validation does not raise an error.
     """
+    graph_key = None
+    if validate and config.get("geomodeling.construct-cache-size", 0) > 0:
+        graph_key = _get_graph_key(graph, names)
+        validated = _get_validated_graph(graph_key)
+        if validated is not None:
+            return construct_multiple(*validated, validate=False)
+
     # deserialize import paths where necessary and cast lists to tuples
     new_graph = {}
     for key, value in graph.items():
@@ -75,7 +431,158 @@ def construct_multiple(graph, names, validate=True):
                 )
             new_graph[key] = (cls._init_no_validation, token) + args
 
-    return get_sync(new_graph, names, pack_exception=_construct_exc_callback)
+    blocks = _construct_graph(new_graph, names)
+
+    if graph_key is not None:
+        # remember the validated blocks by their definition graph, in which
+        # the args are as normalized by the __init__ methods
+        definition = {}
+        for block in blocks:
+            definition.update(block.get_graph()[0])
+        _put_validated_graph(graph_key, (definition, [block.name for block in blocks]))
+    return blocks
+
+
+def cached_metadata(func):
+    """Decorator that caches the outcome of a metadata method on the Block.
+
+    Blocks are immutable, so attributes that are derived from the args (like
+    ``period`` or ``extent``) only need to be computed once. Use this below the
+    ``@property`` decorator. The cache is bypassed for blocks that depend on a
+    block with ``CACHE_METADATA = False``.
+
+    Blocks that read files (see :meth:`Block.get_file_signature`) may change
+    their metadata when the file changes. The cache of such a block and of the
+    blocks depending on it is cleared when one of the file signatures changes.
+    """
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(self):
+        if not self._metadata_cacheable:
+            return func(self)
+        signature = self.get_file_signatures()
+        try:
+            cached_signature, cache = self._cached_metadata
+        except AttributeError:
+            cached_signature = None
+        if cached_signature != signature:
+            cache = {}
+            self._cached_metadata = signature, cache
+        try:
+            return cache[name]
+        except KeyError:
+            pass
+        result = cache[name] = func(self)
+        return result
+
+    return wrapper
+
+
+def _postorder(block, get_sources):
+    """Iterate over a block and its ancestors without recursion.
+
+    Every block is yielded after the blocks that ``get_sources(block)``
+    returns. Blocks are yielded once.
+    """
+    seen = {id(block)}
+    stack = [(block, iter(get_sources(block)))]
+    while stack:
+        current, sources = stack[-1]
+        for source in sources:
+            if id(source) not in seen:
+                seen.add(id(source))
+                stack.append((source, iter(get_sources(source))))
+                break
+        else:
+            stack.pop()
+            yield current
+
+
+def _get_block_args(block):
+    return [arg for arg in block.args if isinstance(arg, Block)]
+
+
+def _get_untokenized_args(block):
+    return [
+        arg
+        for arg in block.args
+        if isinstance(arg, Block) and not hasattr(arg, "_cached_token")
+    ]
+
+
+def _get_unevaluated_args(block):
+    return [
+        arg
+        for arg in block.args
+        if isinstance(arg, Block) and not hasattr(arg, "_cached_metadata_cacheable")
+    ]
+
+
+# arrays of at least this size (in bytes) have their digest cached
+ARRAY_DIGEST_MIN_SIZE = 2 ** 16
+
+_array_digests = {}
+
+
+class _ArrayDigest(object):
+    """The normalized token of an array, see :func:`_get_array_digest`."""
+
+    __slots__ = ("normalized",)
+
+    def __init__(self, normalized):
+        self.normalized = normalized
+
+
+def _sample_array(array, sample_size):
+    """Return about sample_size bytes of evenly spaced elements of array"""
+    n = max(sample_size // array.itemsize, 2)
+    indices = np.linspace(0, array.size - 1, n).astype(np.intp)
+    return array.flat[indices]
+
+
+def _get_array_digest(array):
+    """Return the normalized token of a large array, cached per array.
+
+    Hashing multi-GB arrays takes seconds, so the outcome is cached by the
+    identity and memory layout of the array. This assumes that arrays that are
+    passed to blocks are not modified inplace, which is necessary anyway as
+    tokens are cached on blocks.
+
+    If the geomodeling.token-sample-size setting is nonzero, arrays larger than
+    that amount of bytes are hashed by an evenly spaced sample of its
+    elements. Beware that differences outside of the sample are then not
+    reflected in the token, leading to unjustified (result) cache hits. Only
+    use this if large arrays are never changed at a few positions only.
+    """
+    sample_size = config.get("geomodeling.token-sample-size", 0)
+    interface = array.__array_interface__
+    key = (
+        id(array),
+        interface["data"][0],
+        array.shape,
+        interface["strides"],
+        array.dtype.str,
+        sample_size,
+    )
+    try:
+        return _array_digests[key][1]
+    except KeyError:
+        pass
+    if sample_size and array.nbytes > sample_size:
+        normalized = (
+            "sampled",
+            normalize_token(_sample_array(array, sample_size)),
+            array.shape,
+        )
+    else:
+        normalized = normalize_token(array)
+    digest = _ArrayDigest(normalized)
+    # remove the digest as soon as the array is garbage collected, so that the
+    # key can't be reused by another array with the same id and data address
+    ref = weakref.ref(array, lambda _: _array_digests.pop(key, None))
+    _array_digests[key] = ref, digest
+    return digest
 
 
 class Block(object):
@@ -94,6 +601,12 @@ class Block(object):
 
     JSON_VERSION = 2
 
+    # Set this to False on blocks whose metadata (e.g. period or extent) may
+    # change during the lifetime of the object. Blocks depending on such a
+    # block do not cache their metadata either. This is not needed for blocks
+    # that read files: their cache is cleared when the file signature changes.
+    CACHE_METADATA = True
+
     @property
     def token(self):
         """Generates a unique and deterministic representation of this object
@@ -103,11 +616,56 @@ class Block(object):
             return self._cached_token
         except AttributeError:
             pass
-        klass_path = self.get_import_path()
-        args = [arg.token if isinstance(arg, Block) else arg for arg in self.args]
-        self._cached_token = tokenize(klass_path, *args)
+        # tokenize the ancestors first, so that this does not recurse
+        for block in _postorder(self, _get_untokenized_args):
+            block._cached_token = block._tokenize()
         return self._cached_token
 
+    def _tokenize(self):
+        """Compute the token, given that the args have their token cached"""
+        klass_path = self.get_import_path()
+        args = []
+        for arg in self.args:
+            if isinstance(arg, Block):
+                arg = arg.token
+            elif (
+                isinstance(arg, np.ndarray)
+                and arg.nbytes >= ARRAY_DIGEST_MIN_SIZE
+                and not arg.dtype.hasobject
+            ):
+                arg = _get_array_digest(arg)
+            args.append(arg)
+        return tokenize(klass_path, *args)
+
+    @property
+    def _metadata_cacheable(self):
+        """Whether this block and its ancestors allow metadata caching"""
+        try:
+            return self._cached_metadata_cacheable
+        except AttributeError:
+            pass
+        # evaluate the ancestors first, so that this does not recurse
+        for block in _postorder(self, _get_unevaluated_args):
+            args = _get_block_args(block)
+            block._cached_metadata_cacheable = block.CACHE_METADATA and all(
+                arg._metadata_cacheable for arg in args
+            )
+            # also collect the blocks that read files (by identity)
+            file_blocks = {id(x): x for arg in args for x in arg._file_blocks}
+            if type(block).get_file_signature is not Block.get_file_signature:
+                file_blocks[id(block)] = block
+            block._cached_file_blocks = tuple(file_blocks.values())
+        return self._cached_metadata_cacheable
+
+    @property
+    def _file_blocks(self):
+        """This block and its ancestors that read files"""
+        try:
+            return self._cached_file_blocks
+        except AttributeError:
+            self._metadata_cacheable  # also sets _cached_file_blocks
+            return self._cached_file_blocks
+
     @staticmethod  # must be a static method
     def process(data):
         """
@@ -148,11 +706,58 @@ class Block(object):
         """
         return ((source, request) for source in self.args)
 
+    def get_file_signature(self):
+        """Return the signature of the file(s) that this block reads, or None.
+
+        Blocks that read files should return a value that changes when the
+        files are changed (for instance the modification time and size), so
+        that the result cache does not return results of an outdated file.
+        The signature is included in the compute graph node names of the block.
+        """
+        return None
+
+    def get_file_signatures(self):
+        """Return the file signatures of this block and of its ancestors that
+        read files, as a list (see :meth:`get_file_signature`).
+
+        Use this to invalidate results that are derived from this block and
+        that outlive a single computation.
+        """
+        return [block.get_file_signature() for block in self._file_blocks]
+
     """Below are methods that should never be overridden by subclasses"""
 
-    def get_data(self, **request):
-        """Directly evaluate the request and return the data."""
-        return compute(*self.get_compute_graph(**request))
+    def get_data(self, scheduler=None, **request):
+        """Directly evaluate the request and return the data.
+
+        Independent branches of the compute graph are executed concurrently
+        when a parallel scheduler is used. See :func:`get_scheduler` for the
+        possible values of ``scheduler``.
+        """
+        cache = getattr(_planning, "cache", None)
+        if cache is None or request.get("mode") not in PLANNING_CACHE_MODES:
+            return compute(*self.get_compute_graph(**request), scheduler=scheduler)
+        # in a planning_cache context
+        name = _get_compute_name(self, request)
+        try:
+            return cache[name]
+        except KeyError:
+            pass
+        result = cache[name] = compute(
+            *self.get_compute_graph(**request), scheduler=scheduler
+        )
+        return result
+
+    def get_data_many(self, requests, scheduler=None):
+        """Evaluate multiple requests and return a list of data.
+
+        The requests are evaluated in one computation, so that work that is
+        shared between the requests is done only once. See
+        :func:`get_data_many`.
+        """
+        return get_data_many(
+            [(self, request) for request in requests], scheduler=scheduler
+        )
 
     def get_compute_graph(self, cached_compute_graph=None, **request):
         """Lazy version of get_data, returns a compute graph dict, that
@@ -164,25 +769,40 @@ class Block(object):
         that args may reference to other keys in the dictionary.
         """
         # generate a token from the specific request passed to the block
-        # NB generates a random hash if the request cannot be tokenized
-        token = tokenize([self.token, request])
-        name = "{}_{}".format(self.__class__.__name__.lower(), token)
+        name = _get_compute_name(self, request)
         graph = cached_compute_graph or dict()
 
         if name in graph:
             return graph, name
 
-        args = [self.process]
-        for source, req in self.get_sources_and_requests(**request):
-            if isinstance(source, Block) and req is not None:
-                graph, compute_name = source.get_compute_graph(
-                    cached_compute_graph=graph, **req
-                )
-                args.append(compute_name)
-            else:
-                args.append(source)
+        # walk through the sources depth-first using an explicit stack (instead
+        # of recursion), so that very deep graphs do not hit the recursion
+        # limit. Nodes are added to the graph after their sources.
+        with planning_cache():
+            stack = [
+                (name, [self.process], iter(self.get_sources_and_requests(**request)))
+            ]
+            while stack:
+                current_name, args, sources_and_requests = stack[-1]
+                for source, req in sources_and_requests:
+                    if not isinstance(source, Block) or req is None:
+                        args.append(source)
+                        continue
+                    source_name = _get_compute_name(source, req)
+                    args.append(source_name)
+                    if source_name not in graph:
+                        stack.append(
+                            (
+                                source_name,
+                                [source.process],
+                                iter(source.get_sources_and_requests(**req)),
+                            )
+                        )
+                        break
+                else:
+                    graph[current_name] = tuple(args)
+                    stack.pop()
 
-        graph[name] = tuple(args)
         return graph, name
 
     def get_graph(self, serialize=False):
@@ -197,21 +817,19 @@ class Block(object):
         If serialize == True, the Block classes will be replaced by their
         corresponding import paths.
         """
-        if serialize:
-            args = [self.get_import_path()]
-        else:
-            args = [self.__class__]
         graph = dict()
-        for arg in self.args:
-            if isinstance(arg, Block):
-                sub_graph, sub_name = arg.get_graph(serialize=serialize)
-                graph.update(sub_graph)
-                args.append(sub_name)
+        for block in _postorder(self, _get_block_args):
+            if serialize:
+                args = [block.get_import_path()]
             else:
-                args.append(arg)
-        name = self.name
-        graph[name] = args
-        return graph, name
+                args = [block.__class__]
+            for arg in block.args:
+                if isinstance(arg, Block):
+                    args.append(arg.name)
+                else:
+                    args.append(arg)
+            graph[block.name] = args
+        return graph, self.name
 
     @property
     def name(self):
@@ -226,6 +844,10 @@ class Block(object):
     @classmethod
     def get_import_path(cls):
         """Serialize the Block by returning its import path."""
+        try:
+            return _import_paths[cls]
+        except KeyError:
+            pass
         name = cls.__name__
         module = cls.__module__
 
@@ -244,16 +866,22 @@ class Block(object):
                     % (cls, module, name)
                 )
 
-        return "{}.{}".format(module, name)
+        path = _import_paths[cls] = "{}.{}".format(module, name)
+        return path
 
     @staticmethod
     def from_import_path(path):
         """Deserialize the Block by importing it from given path."""
+        try:
+            return _import_path_classes[path]
+        except KeyError:
+            pass
         module, name = path.rsplit(".", 1)
         __import__(module)
         mod = sys.modules[module]
         klass = getattr(mod, name)
         if issubclass(klass, Block):
+            _import_path_classes[path] = klass
             return klass
         else:
             raise TypeError('"{}" is not valid Block.'.format(path))
@@ -299,6 +927,9 @@ class DummyBlock(Block):
     def token(self):
         return self.name.split("_")[1]
 
+    def _tokenize(self):
+        return self.token
+
     @property
     def name(self):
         return self.args[0]
@@ -319,3 +950,9 @@ def normalize_shapely_geometry(geometry):
 @normalize_token.register((datetime, timedelta))
 def normalize_datetime(value):
     return hash(value)
+
+
+# Tokenize cached array digests by their precomputed normalized token.
+@normalize_token.register(_ArrayDigest)
+def normalize_array_digest(value):
+    return value.normalized
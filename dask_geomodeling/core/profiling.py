@@ -0,0 +1,228 @@
+"""
+Module containing per-node instrumentation of compute graphs.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+from .cache import estimate_size
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+__all__ = ["NodeCallback", "Profiler"]
+
+STATS_FIELDS = ("wall_time", "cpu_time", "output_size", "rss_delta")
+
+# CPU time of the current thread, falls back to process time on Python < 3.7
+_thread_time = getattr(time, "thread_time", time.process_time)
+
+# the active node callbacks are local to the thread that activated them
+_active = threading.local()
+
+
+def get_callbacks():
+    """Return the node callbacks that are active in the current thread."""
+    return list(getattr(_active, "callbacks", ()))
+
+
+def _get_peak_rss():
+    """Return the peak resident set size of this process in bytes"""
+    if resource is None:
+        return
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak  # in bytes
+    return peak * 1024  # in kilobytes
+
+
+def _profile_task(key, callbacks, func, *args):
+    """Execute a task and report its statistics to callbacks."""
+    rss_start = _get_peak_rss()
+    cpu_start = _thread_time()
+    wall_start = time.perf_counter()
+    result = func(*args)
+    wall_time = time.perf_counter() - wall_start
+    cpu_time = _thread_time() - cpu_start
+    rss_end = _get_peak_rss()
+    stats = {
+        "wall_time": wall_time,
+        "cpu_time": cpu_time,
+        "output_size": estimate_size(result),
+        "rss_delta": None if rss_start is None else rss_end - rss_start,
+        "cached": False,
+    }
+    for callback in callbacks:
+        callback.node_finished(key, stats)
+    return result
+
+
+def _report_cached(key, callbacks, func, *args):
+    """Return a result from the result cache and report it to callbacks."""
+    result = func(*args)
+    stats = {
+        "wall_time": 0.0,
+        "cpu_time": 0.0,
+        "output_size": estimate_size(result),
+        "rss_delta": 0,
+        "cached": True,
+    }
+    for callback in callbacks:
+        callback.node_finished(key, stats)
+    return result
+
+
+def _insert_profiling(graph, callbacks, cached=()):
+    """Return a graph in which every task reports to callbacks.
+
+    The nodes in ``cached`` are taken from the result cache. They are reported
+    as such, without measuring them."""
+    return {
+        key: (
+            partial(
+                _report_cached if key in cached else _profile_task,
+                key,
+                callbacks,
+                task[0],
+            ),
+        )
+        + task[1:]
+        for (key, task) in graph.items()
+    }
+
+
+class NodeCallback(object):
+    """Base class for callbacks that are notified of every computed node.
+
+    Use an instance as a context manager to activate it for all compute
+    calls (e.g. ``Block.get_data``) within the context. Subclasses implement
+    :meth:`node_finished`. The callback is only active in the thread that
+    entered the context, so that computations in other threads (e.g.
+    concurrent web requests) are not recorded.
+
+    Nodes are measured in the thread that executes them, so this works with
+    the 'sync' and 'threads' schedulers, but not with 'processes'.
+    """
+
+    def __enter__(self):
+        try:
+            callbacks = _active.callbacks
+        except AttributeError:
+            callbacks = _active.callbacks = []
+        callbacks.append(self)
+        return self
+
+    def __exit__(self, *args):
+        _active.callbacks.remove(self)
+
+    def node_finished(self, key, stats):
+        """Called after a node has been computed.
+
+        :param key: the name of the node in the compute graph
+        :param stats: a dict with the fields ``wall_time`` and ``cpu_time``
+          (in seconds), ``output_size`` (the estimated size of the result in
+          bytes), ``rss_delta`` (the increase of the peak resident set size
+          of the process in bytes, or None if this cannot be measured) and
+          ``cached`` (True if the result was taken from the result cache; the
+          times and ``rss_delta`` are then 0).
+
+        With the 'threads' scheduler, nodes may run concurrently. The
+        ``rss_delta`` is process wide and may then include other nodes.
+        """
+        pass
+
+
+class Profiler(NodeCallback):
+    """Records statistics of every computed node.
+
+    >>> from dask_geomodeling.core import Profiler
+    >>> with Profiler() as profiler:
+    ...     view.get_data(**request)
+    >>> print(profiler.report())
+
+    The statistics can be aggregated by block class (:meth:`by_class`) or by
+    node name (:meth:`by_name`). See :meth:`NodeCallback.node_finished` for
+    the recorded statistics.
+    """
+
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+
+    def node_finished(self, key, stats):
+        with self._lock:
+            self.records.append((key, stats))
+
+    @staticmethod
+    def _get_class_name(key):
+        # node names are constructed as '<lowercase class name>_<token>'
+        return key.rsplit("_", 1)[0]
+
+    def _aggregate(self, get_group):
+        result = {}
+        for key, stats in self.records:
+            group = get_group(key)
+            try:
+                totals = result[group]
+            except KeyError:
+                totals = result[group] = dict.fromkeys(STATS_FIELDS, 0)
+                totals["count"] = 0
+                totals["cached"] = 0
+            totals["count"] += 1
+            totals["cached"] += stats["cached"]
+            for field in STATS_FIELDS:
+                if stats[field] is None or totals[field] is None:
+                    totals[field] = None
+                else:
+                    totals[field] += stats[field]
+        # sort by descending wall time
+        return OrderedDict(
+            sorted(result.items(), key=lambda x: x[1]["wall_time"], reverse=True)
+        )
+
+    def by_class(self):
+        """Return the summed statistics per block class, slowest first.
+
+        The classes are identified by their lowercase class name. Each value
+        is a dict with the statistics, the number of nodes (``count``) and the
+        number of nodes that were taken from the result cache (``cached``).
+        """
+        return self._aggregate(self._get_class_name)
+
+    def by_name(self):
+        """Return the summed statistics per node name, slowest first."""
+        return self._aggregate(lambda key: key)
+
+    def report(self, by="class"):
+        """Return a table with the aggregated statistics as a string.
+
+        :param by: aggregate by ``'class'`` (default) or by ``'name'``
+        """
+        if by == "class":
+            aggregated = self.by_class()
+        elif by == "name":
+            aggregated = self.by_name()
+        else:
+            raise ValueError("Cannot aggregate by '{}'".format(by))
+        lines = [
+            "{:<48} {:>6} {:>6} {:>10} {:>10} {:>12} {:>12}".format(
+                by, "count", "cached", "wall (s)", "cpu (s)", "output (B)", "rss (B)"
+            )
+        ]
+        for group, totals in aggregated.items():
+            lines.append(
+                "{:<48} {:>6} {:>6} {:>10.4f} {:>10.4f} {:>12} {:>12}".format(
+                    group,
+                    totals["count"],
+                    totals["cached"],
+                    totals["wall_time"],
+                    totals["cpu_time"],
+                    totals["output_size"],
+                    "-" if totals["rss_delta"] is None else totals["rss_delta"],
+                )
+            )
+        return "\n".join(lines)
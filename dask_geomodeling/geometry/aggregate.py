@@ -11,13 +11,20 @@ import numpy as np
 import geopandas as gpd
 
 from dask import config
+from osgeo import osr
 from dask_geomodeling import measurements
 from dask_geomodeling import utils
+from dask_geomodeling.core import Block
 from dask_geomodeling.raster import RasterBlock
 
 from .base import GeometryBlock
 
-__all__ = ["AggregateRaster", "AggregateRasterAboveThreshold"]
+__all__ = [
+    "AggregateRaster",
+    "AggregateRasterAboveThreshold",
+    "PointSample",
+    "PointSampleWindows",
+]
 
 
 class Bucket:
@@ -531,3 +538,298 @@ class AggregateRasterAboveThreshold(AggregateRaster):
         process_kwargs = src_and_req[2][0]
         process_kwargs["threshold_name"] = self.threshold_name
         return src_and_req
+
+
+def _group_points(features, req_srs, sample_srs, pixel_size, window_size):
+    """Group the centroids of features into windows of at most window_size by
+    window_size pixels, on a grid with origin (0, 0) in sample_srs.
+
+    Returns the points (in sample_srs), a list with the indices of the points
+    per group, and per group the pixel indices (i1, i2, j1, j2) of the
+    smallest window that contains its points (rows increasing downwards).
+    """
+    # transform the points into the projection in which we sample
+    centroids = features["geometry"].centroid
+    points = np.array([centroids.x.values, centroids.y.values]).T
+    if utils.get_epsg_or_wkt(req_srs) != utils.get_epsg_or_wkt(sample_srs):
+        transform = osr.CoordinateTransformation(
+            utils.get_sr(req_srs), utils.get_sr(sample_srs)
+        )
+        points = np.array(transform.TransformPoints(points))[:, :2]
+
+    rows = np.floor(-points[:, 1] / pixel_size).astype(np.int64)
+    cols = np.floor(points[:, 0] / pixel_size).astype(np.int64)
+    keys = np.array([rows // window_size, cols // window_size]).T
+    _, inverse, counts = np.unique(
+        keys, axis=0, return_inverse=True, return_counts=True
+    )
+    order = np.argsort(inverse.ravel(), kind="stable")
+    groups = np.split(order, np.cumsum(counts)[:-1])
+    windows = [
+        (
+            int(rows[group].min()),
+            int(rows[group].max()) + 1,
+            int(cols[group].min()),
+            int(cols[group].max()) + 1,
+        )
+        for group in groups
+    ]
+    return points, groups, windows
+
+
+def _get_window_bbox(window, pixel_size):
+    """Return the bbox of a window (i1, i2, j1, j2) of pixels"""
+    i1, i2, j1, j2 = window
+    return j1 * pixel_size, -i2 * pixel_size, j2 * pixel_size, -i1 * pixel_size
+
+
+class PointSampleWindows(Block):
+    """
+    Compute the raster windows that PointSample reads for a request.
+
+    :param source: the source of (point) geometry data
+    :param projection: the projection to sample the raster in
+    :param pixel_size: the pixel size to sample the raster with
+    :param window_size: the maximum width and height (in pixels) of a window
+
+    :type source: GeometryBlock
+    :type projection: string
+    :type pixel_size: float
+    :type window_size: int
+
+    For a geometry request on the source, this returns a dict with the pixel
+    indices ``(i1, i2, j1, j2)`` of each window under ``"windows"``. The
+    windows lie on a grid with origin (0, 0), with rows increasing downwards.
+    """
+
+    def __init__(self, source, projection, pixel_size, window_size, *args):
+        if not isinstance(source, GeometryBlock):
+            raise TypeError("'{}' object is not allowed".format(type(source)))
+        super(PointSampleWindows, self).__init__(
+            source, projection, float(pixel_size), int(window_size), *args
+        )
+
+    @property
+    def source(self):
+        return self.args[0]
+
+    @property
+    def projection(self):
+        return self.args[1]
+
+    @property
+    def pixel_size(self):
+        return self.args[2]
+
+    @property
+    def window_size(self):
+        return self.args[3]
+
+    def get_sources_and_requests(self, **request):
+        process_kwargs = {
+            "req_srs": request["projection"],
+            "sample_srs": self.projection,
+            "pixel_size": self.pixel_size,
+            "window_size": self.window_size,
+        }
+        return [(process_kwargs, None), (self.source, request)]
+
+    @staticmethod
+    def process(process_kwargs, data):
+        if len(data["features"]) == 0:
+            return {"windows": []}
+        _, _, windows = _group_points(data["features"], **process_kwargs)
+        return {"windows": windows}
+
+
+class PointSample(GeometryBlock):
+    """
+    Sample a raster at the location of each geometry
+
+    :param source: the source of (point) geometry data
+    :param raster: the source of raster data
+    :param projection: the projection to sample the raster in
+    :param pixel_size: the pixel size to sample the raster with
+    :param window_size: the maximum width and height (in pixels) of the
+      windows that are read from the raster. Default 256.
+    :param column_name: the name of the column to output the results
+    :returns: GeometryBlock with the sampled values in ``column_name``
+
+    :type source: GeometryBlock
+    :type raster: RasterBlock
+    :type projection: string or None
+    :type pixel_size: float or None
+    :type window_size: int
+    :type column_name: string
+
+    If projection or pixel_size are not given, these are taken from the
+    provided RasterBlock. Non-point geometries are sampled at their centroid.
+
+    The points are grouped into windows of at most ``window_size`` by
+    ``window_size`` pixels, that are aligned to a grid with origin (0, 0).
+    Every window is read from the raster once, and all points in it are
+    sampled at once. Points at which the raster has no data get NaN. As the
+    windows depend on the locations of the geometries, they are computed
+    while planning the request, by a PointSampleWindows block (just like
+    AggregateRaster requests the extent of its source). Each window is a
+    separate node in the compute graph.
+
+    If a time range is requested (through 'start' and 'stop'), each cell of
+    the resulting column contains an array with a value for each frame.
+    """
+
+    def __init__(
+        self,
+        source,
+        raster,
+        projection=None,
+        pixel_size=None,
+        window_size=256,
+        column_name="value",
+        *args
+    ):
+        if not isinstance(source, GeometryBlock):
+            raise TypeError("'{}' object is not allowed".format(type(source)))
+        if not isinstance(raster, RasterBlock):
+            raise TypeError("'{}' object is not allowed".format(type(raster)))
+        if projection is None:
+            projection = raster.projection
+        if not isinstance(projection, str):
+            raise TypeError("'{}' object is not allowed".format(type(projection)))
+        if pixel_size is None:
+            # get the pixel_size from the raster geo_transform
+            geo_transform = raster.geo_transform
+            if geo_transform is None:
+                raise ValueError(
+                    "Cannot get the pixel_size from the source "
+                    "raster. Please provide a pixel_size."
+                )
+            pixel_size = min(abs(float(geo_transform[1])), abs(float(geo_transform[5])))
+        else:
+            pixel_size = abs(float(pixel_size))
+        if pixel_size == 0.0:
+            raise ValueError("Pixel size cannot be 0")
+        window_size = int(window_size)
+        if window_size < 1:
+            raise ValueError("The window size should be at least 1")
+        if not isinstance(column_name, str):
+            raise TypeError("'{}' object is not allowed".format(type(column_name)))
+        super(PointSample, self).__init__(
+            source, raster, projection, pixel_size, window_size, column_name, *args
+        )
+
+    @property
+    def source(self):
+        return self.args[0]
+
+    @property
+    def raster(self):
+        return self.args[1]
+
+    @property
+    def projection(self):
+        return self.args[2]
+
+    @property
+    def pixel_size(self):
+        return self.args[3]
+
+    @property
+    def window_size(self):
+        return self.args[4]
+
+    @property
+    def column_name(self):
+        return self.args[5]
+
+    @property
+    def columns(self):
+        return self.source.columns | {self.column_name}
+
+    def get_sources_and_requests(self, **request):
+        if request.get("mode") == "extent":
+            return [({"mode": "extent"}, None), (self.source, request)]
+
+        # the windows depend on the locations of the geometries
+        windows = PointSampleWindows(
+            self.source, self.projection, self.pixel_size, self.window_size
+        ).get_data(**request)["windows"]
+
+        process_kwargs = {
+            "mode": request.get("mode", "intersects"),
+            "req_srs": request["projection"],
+            "sample_srs": self.projection,
+            "pixel_size": self.pixel_size,
+            "window_size": self.window_size,
+            "windows": windows,
+            "column_name": self.column_name,
+        }
+        sources_and_requests = [(process_kwargs, None), (self.source, request)]
+        for window in windows:
+            i1, i2, j1, j2 = window
+            raster_request = {
+                "mode": "vals",
+                "projection": self.projection,
+                "start": request.get("start"),
+                "stop": request.get("stop"),
+                "aggregation": None,
+                "bbox": _get_window_bbox(window, self.pixel_size),
+                "width": j2 - j1,
+                "height": i2 - i1,
+            }
+            sources_and_requests.append((self.raster, raster_request))
+        return sources_and_requests
+
+    @staticmethod
+    def process(process_kwargs, data, *all_data):
+        if process_kwargs["mode"] == "extent":
+            return data
+
+        features = data["features"]
+        req_srs = process_kwargs["req_srs"]
+        if len(features) == 0:
+            return {"features": features, "projection": req_srs}
+
+        points, groups, windows = _group_points(
+            features,
+            req_srs,
+            process_kwargs["sample_srs"],
+            process_kwargs["pixel_size"],
+            process_kwargs["window_size"],
+        )
+        # the raster data of the windows that were computed while planning
+        window_data = dict(zip(process_kwargs["windows"], all_data))
+
+        # the windows share the time axis, so they all have the same depth
+        depth = max(
+            [len(data["values"]) for data in all_data if data is not None], default=1
+        )
+        pixel_size = process_kwargs["pixel_size"]
+        sampled = np.full((depth, len(features)), np.nan, dtype="f8")
+        for group, window in zip(groups, windows):
+            data = window_data.get(window)
+            if data is None:
+                continue
+            values = data["values"]
+            i1, i2, j1, j2 = window
+            height, width = i2 - i1, j2 - j1
+            bbox = _get_window_bbox(window, pixel_size)
+            # compute the indices of the points into the window
+            rows, cols = utils.GeoTransform.from_bbox(bbox, height, width).get_indices(
+                points[group]
+            )
+            # guard against rounding errors at the window edges
+            rows = np.clip(rows, 0, height - 1)
+            cols = np.clip(cols, 0, width - 1)
+            window_values = values[:, rows, cols].astype("f8")
+            window_values[values[:, rows, cols] == data["no_data_value"]] = np.nan
+            sampled[:, group] = window_values
+
+        result = features.copy()
+        column_name = process_kwargs["column_name"]
+        if depth == 1:
+            result[column_name] = sampled[0]
+        else:
+            # store an array in a dataframe cell: set each cell with [np.array]
+            result[column_name] = [[x] for x in sampled.T]
+        return {"features": result, "projection": req_srs}
@@ -55,6 +55,9 @@ class GeometryFileSource(GeometryBlock):
     def path(self):
         return utils.safe_abspath(self.url)
 
+    def get_file_signature(self):
+        return utils.get_file_signature(self.path)
+
     @property
     def columns(self):
         # this is exactly how geopandas determines the columns
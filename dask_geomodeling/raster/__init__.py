@@ -1,7 +1,9 @@
 from .base import RasterBlock  # NOQA
+from .cache import *  # NOQA
 from .elemwise import *  # NOQA
 from .combine import *  # NOQA
 from .spatial import *  # NOQA
 from .temporal import *  # NOQA
 from .misc import *  # NOQA
+from .parallelize import *  # NOQA
 from .sources import *  # NOQA
@@ -3,7 +3,11 @@ Module containing the raster block base classes.
 """
 from datetime import datetime as Datetime
 
+import numpy as np
+
 from dask_geomodeling import Block
+from dask_geomodeling.core import cached_metadata
+from dask_geomodeling.utils import get_time_index
 
 
 class RasterBlock(Block):
@@ -32,6 +36,8 @@ class RasterBlock(Block):
     - height: data height
     - start: start date as naive UTC datetime
     - stop: stop date as naive UTC datetime
+    - aggregation: the resampling method of raster sources (optional, see
+      :mod:`dask_geomodeling.raster.resample`)
 
     The data response contains the following:
 
@@ -45,6 +51,7 @@ class RasterBlock(Block):
 
     DEFAULT_ORIGIN = Datetime(1970, 1, 1, 0, 0)
 
+    @cached_metadata
     def __len__(self):
         """ Return number of temporal bands. """
         # all empty
@@ -59,13 +66,33 @@ class RasterBlock(Block):
         timedelta = self.timedelta
         if timedelta is None:
             # hard way, since bands are not aligned
-            return len(self.get_data(mode="time", start=start, stop=stop)["time"])
+            return len(self.time_index)
 
         # bands are aligned, just divide the period length by the delta
         period_seconds = (stop - start).total_seconds()
         delta_seconds = timedelta.total_seconds()
         return int(period_seconds / delta_seconds) + 1
 
+    @property
+    @cached_metadata
+    def time_index(self):
+        """The times of all frames as a read-only numpy datetime64 array.
+
+        Use ``utils.get_nearest_time_index`` to look up frames in it. For
+        blocks with a timedelta this builds an array of all frames; prefer
+        computing frames from ``period`` and ``timedelta`` there.
+        """
+        period = self.period
+        if period is None:
+            return get_time_index([])
+        timedelta = self.timedelta
+        if timedelta is not None:
+            start = np.datetime64(period[0], "us")
+            delta = np.timedelta64(timedelta, "us")
+            return get_time_index(start + np.arange(len(self)) * delta)
+        data = self.get_data(mode="time", start=period[0], stop=period[1])
+        return get_time_index(data["time"] if data else [])
+
     def __add__(self, other):
         from . import Add
 
@@ -161,37 +188,46 @@ class BaseSingle(RasterBlock):
     def store(self):
         return self.args[0]
 
+    @cached_metadata
     def __len__(self):
         return len(self.store)
 
     @property
+    @cached_metadata
     def extent(self):
         return self.store.extent
 
     @property
+    @cached_metadata
     def period(self):
         return self.store.period
 
     @property
+    @cached_metadata
     def timedelta(self):
         return self.store.timedelta
 
     @property
+    @cached_metadata
     def dtype(self):
         return self.store.dtype
 
     @property
+    @cached_metadata
     def fillvalue(self):
         return self.store.fillvalue
 
     @property
+    @cached_metadata
     def geometry(self):
         return self.store.geometry
 
     @property
+    @cached_metadata
     def projection(self):
         return self.store.projection
 
     @property
+    @cached_metadata
     def geo_transform(self):
         return self.store.geo_transform
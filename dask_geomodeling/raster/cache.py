@@ -0,0 +1,290 @@
+"""
+Module containing raster blocks that cache results on disk.
+"""
+import os
+import threading
+from math import floor
+
+import numpy as np
+from dask import config
+from dask.base import tokenize
+
+from dask_geomodeling import utils
+
+from .base import BaseSingle
+
+
+__all__ = ["RasterCache"]
+
+# the tolerance (in pixels) for a request to be aligned with the tile grid
+ALIGNMENT_TOLERANCE = 0.01
+
+# the number of significant digits of the pixel size of the tile grid
+PIXEL_SIZE_DIGITS = 10
+
+# the total size of the tiles per cache root, as far as known to this process
+_cache_sizes = {}
+_cache_sizes_lock = threading.Lock()
+
+
+def _snap(value, tolerance=ALIGNMENT_TOLERANCE):
+    """Return value as integer if it is (almost) integer, else None"""
+    rounded = round(value)
+    if abs(value - rounded) > tolerance:
+        return
+    return int(rounded)
+
+
+def _save_tile(path, values):
+    """Save an array to path atomically"""
+    tmp_path = "{}.{}.{}.tmp".format(path, os.getpid(), threading.get_ident())
+    with open(tmp_path, "wb") as f:
+        np.save(f, values)
+    os.replace(tmp_path, path)
+
+
+def _snap_pixel_size(value):
+    """Round a pixel size to PIXEL_SIZE_DIGITS significant digits.
+
+    Requests of the same resolution (e.g. XYZ tiles) may have pixel sizes that
+    differ in the last bits, as they are computed from different bboxes.
+    """
+    return float("{:.{}g}".format(value, PIXEL_SIZE_DIGITS))
+
+
+def _evict(path, max_size):
+    """Remove the least recently used tiles until path is below max_size.
+
+    Returns the total size of the remaining tiles."""
+    tiles = []
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            if not filename.endswith(".npy"):
+                continue
+            tile_path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(tile_path)
+            except OSError:
+                continue  # removed concurrently
+            tiles.append((stat.st_mtime, stat.st_size, tile_path))
+    total = sum(size for (_, size, _) in tiles)
+    for _, size, tile_path in sorted(tiles):
+        if total <= max_size:
+            break
+        try:
+            os.remove(tile_path)
+        except OSError:
+            pass
+        total -= size
+    return total
+
+
+def _add_tile(path, size, max_size):
+    """Add a saved tile to the total size of the tiles in path, and evict
+    tiles if max_size is exceeded.
+
+    The total size is determined from disk once per process and after every
+    eviction. Tiles that are saved by other processes in the meantime are not
+    counted, so the actual size may exceed max_size until the next eviction.
+    """
+    with _cache_sizes_lock:
+        total = _cache_sizes.get(path)
+        if total is None:
+            total = _evict(path, max_size)
+        elif total + size > max_size:
+            total = _evict(path, max_size)
+        else:
+            total += size
+        _cache_sizes[path] = total
+
+
+class RasterCache(BaseSingle):
+    """Cache the 'vals' results of a raster on disk, in tiles.
+
+    Requests are snapped to a fixed grid of tiles of ``tile_size`` by
+    ``tile_size`` pixels. Tiles that are on disk are read using a memory map,
+    the other tiles are computed by the store and saved to disk. The tiles
+    are stored in a subdirectory of ``path`` named after the token of the
+    store and the signatures of the files that it reads (see
+    :meth:`Block.get_file_signatures`), so that changing the store or one of
+    its files invalidates the cache.
+
+    :param store: the raster whose results to cache
+    :param path: the directory to store the tiles in. Relative paths are
+      interpreted relative to the geomodeling.root setting.
+    :param tile_size: the width and height of a tile in pixels
+
+    :type store: RasterBlock
+    :type path: str
+    :type tile_size: integer
+
+    The tile grid starts at the origin of the requested projection and has
+    the pixel size of the request, rounded to PIXEL_SIZE_DIGITS significant
+    digits. Requests that are not aligned to this grid (for instance point
+    requests) bypass the cache, as do 'time' and 'meta' requests.
+
+    The tiles that are on disk are opened while planning a request, so that
+    they remain readable if they are removed (e.g. by another process that
+    evicts tiles) before the request is computed. They are marked as recently
+    used when the request is computed. Tiles for which the store returns no
+    data are not saved.
+
+    The total size of all tiles in ``path`` is limited by the
+    geomodeling.raster-cache-size setting (in bytes). When it is exceeded,
+    the least recently used tiles are removed. Each process keeps track of
+    the tiles it saves, so the size may temporarily exceed the limit when
+    multiple processes share the cache:
+
+      >>> from dask import config
+      >>> config.set({"geomodeling.raster-cache-size": 10 * 1024 ** 3})
+    """
+
+    def __init__(self, store, path, tile_size):
+        if not isinstance(path, str):
+            raise TypeError("'{}' object is not allowed".format(type(path)))
+        tile_size = int(tile_size)
+        if tile_size < 1:
+            raise ValueError("The tile size should be at least 1")
+        super().__init__(store, utils.safe_abspath(path), tile_size)
+
+    @property
+    def path(self):
+        return self.args[1]
+
+    @property
+    def tile_size(self):
+        return self.args[2]
+
+    def _get_tiles(self, request):
+        """Return the layer token and a list of (filename, offset, request)
+        per tile, or None if the request is not aligned to the tile grid."""
+        x1, y1, x2, y2 = request["bbox"]
+        width, height = request["width"], request["height"]
+        if width == 0 or height == 0 or x1 == x2 or y1 == y2:
+            return
+        # the pixel indices of the request, with rows increasing downwards
+        j1 = _snap(x1 * width / (x2 - x1))
+        i1 = _snap(-y2 * height / (y2 - y1))
+        if j1 is None or i1 is None:
+            return
+        size_x = _snap_pixel_size((x2 - x1) / width)
+        size_y = _snap_pixel_size((y2 - y1) / height)
+        i2, j2 = i1 + height, j1 + width
+
+        ts = self.tile_size
+        tiles = []
+        for ti in range(floor(i1 / ts), floor((i2 - 1) / ts) + 1):
+            for tj in range(floor(j1 / ts), floor((j2 - 1) / ts) + 1):
+                bbox = (
+                    tj * ts * size_x,
+                    -(ti + 1) * ts * size_y,
+                    (tj + 1) * ts * size_x,
+                    -ti * ts * size_y,
+                )
+                tile_request = {**request, "bbox": bbox, "width": ts, "height": ts}
+                # the offset of the tile with respect to the request
+                offset = ti * ts - i1, tj * ts - j1
+                tiles.append(("{}_{}.npy".format(ti, tj), offset, tile_request))
+        # the layer identifies all request fields except the bbox and shape,
+        # and the state of the files that the store reads
+        layer = tokenize(
+            {
+                k: v
+                for (k, v) in request.items()
+                if k not in ("bbox", "width", "height")
+            },
+            size_x,
+            size_y,
+            self.store.get_file_signatures(),
+        )
+        return layer, tiles
+
+    def get_sources_and_requests(self, **request):
+        if request["mode"] != "vals":
+            return [(None, None), (self.store, request)]
+        tiles = self._get_tiles(request)
+        if tiles is None:
+            return [(None, None), (self.store, request)]
+        layer, tiles = tiles
+
+        directory = os.path.join(self.path, self.store.token, layer)
+        sources_and_requests = []
+        offsets = []
+        paths = []
+        cached = []
+        for name, offset, tile_request in tiles:
+            path = os.path.join(directory, name)
+            # a memory map stays valid if the file is removed
+            try:
+                tile = np.load(path, mmap_mode="r")
+            except (IOError, ValueError):
+                tile = None
+                sources_and_requests.append((self.store, tile_request))
+            offsets.append(offset)
+            paths.append(path)
+            cached.append(tile)
+
+        process_kwargs = {
+            "directory": directory,
+            "root": self.path,
+            "offsets": offsets,
+            "paths": paths,
+            "cached": cached,
+            "width": request["width"],
+            "height": request["height"],
+            "tile_size": self.tile_size,
+            "fillvalue": self.fillvalue,
+        }
+        return [(process_kwargs, None)] + sources_and_requests
+
+    @staticmethod
+    def process(process_kwargs, *all_data):
+        if process_kwargs is None:
+            return all_data[0]  # non-cached requests
+
+        fillvalue = process_kwargs["fillvalue"]
+        max_size = config.get("geomodeling.raster-cache-size")
+        computed = iter(all_data)
+        tiles = []
+        for path, tile in zip(process_kwargs["paths"], process_kwargs["cached"]):
+            if tile is not None:
+                try:
+                    os.utime(path)  # mark as recently used
+                except OSError:
+                    pass  # removed after planning, the memory map is still valid
+                tiles.append(tile)
+                continue
+            data = next(computed)
+            if data is None:
+                tiles.append(None)  # e.g. outside of the extent of the store
+                continue
+            values = data["values"]
+            if data["no_data_value"] != fillvalue:
+                values = np.where(values == data["no_data_value"], fillvalue, values)
+            os.makedirs(process_kwargs["directory"], exist_ok=True)
+            _save_tile(path, values)
+            _add_tile(process_kwargs["root"], os.path.getsize(path), max_size)
+            tiles.append(values)
+
+        nonempty = [values for values in tiles if values is not None]
+        if not nonempty:
+            return
+
+        height, width = process_kwargs["height"], process_kwargs["width"]
+        ts = process_kwargs["tile_size"]
+        offsets = process_kwargs["offsets"]
+        if len(tiles) == 1 and offsets[0] == (0, 0) and (height, width) == (ts, ts):
+            return {"values": tiles[0], "no_data_value": fillvalue}
+
+        first = nonempty[0]
+        result = np.full((len(first), height, width), fillvalue, dtype=first.dtype)
+        for (i, j), values in zip(offsets, tiles):
+            if values is None:
+                continue
+            # the part of the tile that overlaps with the request
+            ti1, tj1 = max(-i, 0), max(-j, 0)
+            ti2, tj2 = min(height - i, ts), min(width - j, ts)
+            result[:, i + ti1 : i + ti2, j + tj1 : j + tj2] = values[
+                :, ti1:ti2, tj1:tj2
+            ]
+        return {"values": result, "no_data_value": fillvalue}
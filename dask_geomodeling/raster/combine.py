@@ -1,11 +1,17 @@
 """
 Module containing raster blocks that combine rasters.
 """
-import itertools
 from datetime import timedelta as Timedelta
 import numpy as np
 
-from dask_geomodeling.utils import get_dtype_max, get_index, GeoTransform
+from dask_geomodeling.core import cached_metadata
+from dask_geomodeling.utils import (
+    get_dtype_max,
+    get_index,
+    get_nearest_time_index,
+    get_time_index,
+    GeoTransform,
+)
 
 from .base import RasterBlock
 
@@ -62,11 +68,13 @@ class BaseCombine(RasterBlock):
             return timedeltas[0]
 
     @property
+    @cached_metadata
     def timedelta(self):
         """ The period between timesteps in case of equidistant time. """
         return self.get_aligned_timedelta(self.args)
 
     @property
+    @cached_metadata
     def period(self):
         """ Return the combined period datetime tuple. """
         periods = filter_none([x.period for x in self.args])
@@ -79,6 +87,7 @@ class BaseCombine(RasterBlock):
         return min([p[0] for p in periods]), max([p[1] for p in periods])
 
     @property
+    @cached_metadata
     def extent(self):
         """ Boundingbox of combined contents in WGS84 projection. """
         extents = filter_none([x.extent for x in self.args])
@@ -95,14 +104,17 @@ class BaseCombine(RasterBlock):
         return x1, y1, x2, y2
 
     @property
+    @cached_metadata
     def dtype(self):
         return np.result_type(*self.args)
 
     @property
+    @cached_metadata
     def fillvalue(self):
         return get_dtype_max(self.dtype)
 
     @property
+    @cached_metadata
     def geometry(self):
         """Combined geometry in the projection of the first store geometry. """
         geometries = filter_none([x.geometry for x in self.args])
@@ -120,6 +132,7 @@ class BaseCombine(RasterBlock):
         return result
 
     @property
+    @cached_metadata
     def projection(self):
         """Projection of the data if they match, else None"""
         projection = self.args[0].projection
@@ -131,6 +144,7 @@ class BaseCombine(RasterBlock):
         return projection
 
     @property
+    @cached_metadata
     def geo_transform(self):
         geo_transform = self.args[0].geo_transform
         if geo_transform is None:
@@ -283,9 +297,11 @@ class Group(BaseCombine):
         return [(process_kwargs, None)] + requests
 
     @staticmethod
-    def _unique_times(multi):
-        times = filter_none([data.get("time", None) for data in multi])
-        return sorted(set(itertools.chain(*times)))
+    def _get_time_indices(times):
+        """Return the times of each 'time' result as a datetime64 array and the
+        sorted unique times of all of them"""
+        indices = [get_time_index(time["time"] if time else []) for time in times]
+        return indices, np.unique(np.concatenate(indices))
 
     @staticmethod
     def _nearest_index(time, start):
@@ -294,14 +310,13 @@ class Group(BaseCombine):
             return len(time) - 1
         else:
             # nearest band
-            return min(enumerate(time), key=lambda d: abs(d[1] - start))[0]
+            return int(get_nearest_time_index(time, start))
 
     @staticmethod
     def _merge_vals_by_time(multi, times, kwargs):
         """ Merge chunks using indices. """
-        # determine the unique times and assign result bands
-        sorted_times = Group._unique_times(times)
-        bands = dict((y, x) for x, y in enumerate(sorted_times))
+        # determine the unique times
+        time_indices, sorted_times = Group._get_time_indices(times)
         fillvalue = get_dtype_max(kwargs["dtype"])
 
         # initialize values array
@@ -309,16 +324,17 @@ class Group(BaseCombine):
         values = np.full(shape, fillvalue, dtype=kwargs["dtype"])
 
         # populate values array
-        for data, time in zip(multi, times):
+        for data, time_index in zip(multi, time_indices):
+            # find corresponding target bands by source datetime
+            bands = np.searchsorted(sorted_times, time_index)
             # source_index is the index into the source array
-            for source_index, datetime in enumerate(time["time"]):
+            for source_index, band in enumerate(bands):
                 source_band = data["values"][source_index]
                 # determine data index
                 index = get_index(
                     values=source_band, no_data_value=data["no_data_value"]
                 )
-                # find corresponding target band by source datetime
-                target_band = values[bands[datetime]]
+                target_band = values[band]
                 # paste source into target provided there is data
                 target_band[index] = source_band[index]
 
@@ -332,18 +348,17 @@ class Group(BaseCombine):
 
     @staticmethod
     def _merge_meta_by_time(multi, times, kwargs):
-        # determine the unique times and assign result bands
-        sorted_times = Group._unique_times(times)
-        bands = dict((y, x) for x, y in enumerate(sorted_times))
+        # determine the unique times
+        time_indices, sorted_times = Group._get_time_indices(times)
         meta_result = [None] * len(sorted_times)
 
         # populate result array
-        for data, time in zip(multi, times):
+        for data, time_index in zip(multi, time_indices):
+            # find corresponding target bands by source datetime
+            bands = np.searchsorted(sorted_times, time_index)
             # source_index is the index into the source array
-            for source_index, datetime in enumerate(time["time"]):
+            for source_index, target_band in enumerate(bands):
                 source_band = data["meta"][source_index]
-                # find corresponding target band by source datetime
-                target_band = bands[datetime]
                 # paste source into target provided there is data
                 meta_result[target_band] = source_band
 
@@ -406,14 +421,14 @@ class Group(BaseCombine):
             else:
                 return args[0]
         elif combine_mode == "by_time" and mode == "time":
-            sorted_times = Group._unique_times(args)
+            _, sorted_times = Group._get_time_indices(args)
 
             # check if single band result required
             start, stop = process_kwargs["start"], process_kwargs["stop"]
             if stop is None and len(sorted_times) > 1:
                 index = Group._nearest_index(sorted_times, start)
                 sorted_times = sorted_times[index : index + 1]
-            return {"time": sorted_times}
+            return {"time": sorted_times.tolist()}
         elif combine_mode == "by_time" and mode in ["meta", "vals"]:
             # split the data and time results, skipping None
             n = int(len(args) // 2)
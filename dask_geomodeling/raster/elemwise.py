@@ -4,7 +4,9 @@ Module containing elementwise raster blocks.
 from functools import wraps
 
 import numpy as np
+from dask.base import tokenize
 
+from dask_geomodeling.core import cached_metadata
 from dask_geomodeling.utils import get_dtype_max, get_index, GeoTransform
 
 from .base import RasterBlock, BaseSingle
@@ -52,6 +54,18 @@ class BaseElementwise(RasterBlock):
         return [arg for arg in self.args if isinstance(arg, RasterBlock)]
 
     def get_sources_and_requests(self, **request):
+        process_kwargs, sources_and_requests = self._get_sources_and_requests(
+            request
+        )
+        if _get_math_func(self) is not None and any(
+            _get_math_func(source) is not None for (source, _) in sources_and_requests
+        ):
+            process_kwargs, sources_and_requests = self._fuse_sources_and_requests(
+                process_kwargs, sources_and_requests
+            )
+        return [(process_kwargs, None)] + sources_and_requests
+
+    def _get_sources_and_requests(self, request):
         start = request.get("start", None)
         stop = request.get("stop", None)
 
@@ -65,9 +79,49 @@ class BaseElementwise(RasterBlock):
         process_kwargs = {"dtype": self.dtype.name, "fillvalue": self.fillvalue}
         sources_and_requests = [(source, request) for source in self.args]
 
-        return [(process_kwargs, None)] + sources_and_requests
+        return process_kwargs, sources_and_requests
+
+    def _fuse_sources_and_requests(self, process_kwargs, sources_and_requests):
+        """Collapse elementwise math sources into this block.
+
+        The math sources are replaced by their own sources, so that a chain
+        of elementwise math operations is computed in a single graph node.
+        The operations are listed in ``process_kwargs["operations"]`` in
+        evaluation order; each refers to its arguments with ("arg", index)
+        or ("op", index). The last operation is the one of this block.
+        """
+        operations = []
+        leaves = []
+        visited = {}
+
+        def visit(source, request):
+            func = _get_math_func(source)
+            if (
+                func is None
+                or request is None
+                or len(visited) >= FUSED_MAX_OPERATIONS
+            ):
+                leaves.append((source, request))
+                return "arg", len(leaves) - 1
+            key = source.token, tokenize(request)
+            if key not in visited:
+                visited[key] = None  # counts towards FUSED_MAX_OPERATIONS
+                kwargs, _sources_and_requests = source._get_sources_and_requests(
+                    dict(request)
+                )
+                args = [visit(*x) for x in _sources_and_requests]
+                operations.append(dict(func=func, args=args, **kwargs))
+                visited[key] = "op", len(operations) - 1
+            return visited[key]
+
+        args = [visit(*x) for x in sources_and_requests]
+        if not operations:
+            return process_kwargs, sources_and_requests
+        operations.append(dict(func=_get_math_func(self), args=args, **process_kwargs))
+        return {"operations": operations}, leaves
 
     @property
+    @cached_metadata
     def timedelta(self):
         """ The period between timesteps in case of equidistant time. """
         if len(self._sources) == 1:
@@ -87,6 +141,7 @@ class BaseElementwise(RasterBlock):
             return timedeltas[0]
 
     @property
+    @cached_metadata
     def period(self):
         """ Return period datetime tuple. """
         if len(self._sources) == 1:
@@ -105,6 +160,7 @@ class BaseElementwise(RasterBlock):
             return start, stop
 
     @property
+    @cached_metadata
     def extent(self):
         """ Boundingbox of contents in WGS84 projection. """
         if len(self._sources) == 1:
@@ -125,6 +181,7 @@ class BaseElementwise(RasterBlock):
             return x1, y1, x2, y2
 
     @property
+    @cached_metadata
     def dtype(self):
         dtype = np.result_type(*self.args)
         if np.issubdtype(dtype, np.integer) or dtype == np.bool:
@@ -137,6 +194,7 @@ class BaseElementwise(RasterBlock):
             return dtype
 
     @property
+    @cached_metadata
     def fillvalue(self):
         dtype = self.dtype
         if dtype == np.bool:
@@ -145,6 +203,7 @@ class BaseElementwise(RasterBlock):
             return get_dtype_max(dtype)
 
     @property
+    @cached_metadata
     def geometry(self):
         """Intersection of geometries in the projection of the first store
         geometry. """
@@ -165,6 +224,7 @@ class BaseElementwise(RasterBlock):
         return result
 
     @property
+    @cached_metadata
     def projection(self):
         """Projection of the data if they match, else None"""
         projection = self._sources[0].projection
@@ -176,6 +236,7 @@ class BaseElementwise(RasterBlock):
         return projection
 
     @property
+    @cached_metadata
     def geo_transform(self):
         geo_transform = self._sources[0].geo_transform
         if geo_transform is None:
@@ -229,15 +290,178 @@ class BaseLogic(BaseElementwise):
         return None
 
 
+# the maximum number of elementwise operations that are fused into one node
+FUSED_MAX_OPERATIONS = 64
+# the number of elements that fused operations evaluate at once
+FUSED_CHUNK_SIZE = 2 ** 16
+
+
+def _get_math_func(block):
+    """Return the math function of an elementwise block, if it has one."""
+    if not isinstance(block, BaseElementwise):
+        return
+    return getattr(block.process, "math_func", None)
+
+
+def _apply_math_func(func, dtype, fillvalue, compute_args, nodata_mask):
+    """Apply func and fill the nodata_mask. Returns values, no_data_value"""
+    if dtype == np.dtype("bool"):
+        no_data_value = None
+        if func is np.not_equal:
+            fillvalue = True
+        else:
+            fillvalue = False
+        func_kwargs = {}
+    else:
+        func_kwargs = {"dtype": dtype}
+        no_data_value = fillvalue
+
+    with np.errstate(all="ignore"):  # suppresses warnings
+        result_values = func(*compute_args, **func_kwargs)
+
+    if nodata_mask is not None:
+        result_values[nodata_mask] = fillvalue
+    return result_values, no_data_value
+
+
+def _iter_chunks(shape, size):
+    """Yield indices that split a 3D array into chunks of about size elements.
+    """
+    depth, height, width = shape
+    if height * width <= size:
+        step = max(size // max(height * width, 1), 1)
+        for i in range(0, depth, step):
+            yield (slice(i, i + step),)
+    else:
+        step = max(size // width, 1)
+        for i in range(depth):
+            for j in range(0, height, step):
+                yield i, slice(j, j + step)
+
+
+def _evaluate_operations(operations, args):
+    """Evaluate fused elementwise operations, chunk by chunk.
+
+    The result is equal to evaluating the operations one by one with
+    math_process_func. Temporary arrays are limited to FUSED_CHUNK_SIZE
+    elements.
+    """
+    # determine whether the result will be None, 'time' or 'meta', in the
+    # same order as math_process_func would do
+    early = [None] * len(operations)
+    for i, operation in enumerate(operations):
+        for kind, index in operation["args"]:
+            if kind == "op":
+                if early[index] is not None:
+                    early[i] = early[index]
+                    break
+                continue
+            data = args[index]
+            if data is None:
+                early[i] = (None,)
+                break
+            if not isinstance(data, dict):
+                continue
+            if "time" in data or "meta" in data:
+                early[i] = (data,)
+                break
+            if "values" not in data:
+                raise TypeError("Cannot apply math function to value {}".format(data))
+    if early[-1] is not None:
+        return early[-1][0]
+
+    # collect the values, nodata values and constants
+    inputs = []
+    shapes = set()
+    for data in args:
+        if not isinstance(data, dict):
+            inputs.append((data, None))
+            continue
+        values = data["values"]
+        shapes.add(values.shape)
+        if values.dtype == np.dtype("bool"):
+            inputs.append((values, None))
+        else:
+            inputs.append((values, data.get("no_data_value")))
+
+    shape = shapes.pop() if len(shapes) == 1 else None
+    if shape is not None and len(shape) == 3:
+        # broadcast constant arrays so that they can be chunked too
+        try:
+            inputs = [
+                (np.broadcast_to(x, shape), y) if isinstance(x, np.ndarray) else (x, y)
+                for (x, y) in inputs
+            ]
+        except ValueError:
+            shape = None
+    else:
+        shape = None
+
+    dtype = np.dtype(operations[-1]["dtype"])
+    if dtype == np.dtype("bool"):
+        no_data_value = None
+    else:
+        no_data_value = operations[-1]["fillvalue"]
+    if shape is None:
+        chunks = [()]  # evaluate in one go
+        result_values = None
+    else:
+        chunks = _iter_chunks(shape, FUSED_CHUNK_SIZE)
+        result_values = np.empty(shape, dtype=dtype)
+
+    for chunk in chunks:
+        results = []
+        for operation in operations:
+            compute_args = []
+            nodata_mask = None
+            for kind, index in operation["args"]:
+                if kind == "op":
+                    values, _no_data_value = results[index]
+                else:
+                    values, _no_data_value = inputs[index]
+                    if isinstance(values, np.ndarray):
+                        values = values[chunk]
+                compute_args.append(values)
+                if _no_data_value is None:
+                    continue
+                _nodata_mask = values == _no_data_value
+                if nodata_mask is None:
+                    nodata_mask = _nodata_mask
+                else:
+                    nodata_mask |= _nodata_mask
+            results.append(
+                _apply_math_func(
+                    operation["func"],
+                    operation["dtype"],
+                    operation["fillvalue"],
+                    compute_args,
+                    nodata_mask,
+                )
+            )
+        if result_values is None:
+            result_values = results[-1][0]
+        else:
+            result_values[chunk] = results[-1][0]
+
+    return {"no_data_value": no_data_value, "values": result_values}
+
+
 def wrap_math_process_func(func):
     """This enables normal math functions to operate only on the data values.
     Nodata is propagated. In case of comparison operators, nodata becomes
     False, except for NotEqual, where it becomes True.
 
-    'meta' and 'time' fields are propagated from the first source. """
+    'meta' and 'time' fields are propagated from the first source.
+
+    Chains of elementwise math blocks are fused into one node by
+    BaseElementwise.get_sources_and_requests. In that case, the fused
+    operations are evaluated by ``_evaluate_operations``."""
 
     @wraps(func)  # propagates the name and docstring
     def math_process_func(process_kwargs, *args):
+        if "operations" in process_kwargs:
+            return _evaluate_operations(process_kwargs["operations"], args)
+
         compute_args = []  # the args for the math operation
         # perform the nodata masking manually, as numpy maskedarrays are slow
         nodata_mask = None
@@ -269,24 +493,12 @@ def wrap_math_process_func(func):
             else:
                 raise TypeError("Cannot apply math function to value {}".format(data))
 
-        if dtype == np.dtype("bool"):
-            no_data_value = None
-            if func is np.not_equal:
-                fillvalue = True
-            else:
-                fillvalue = False
-            func_kwargs = {}
-        else:
-            func_kwargs = {"dtype": dtype}
-            no_data_value = fillvalue
-
-        with np.errstate(all="ignore"):  # suppresses warnings
-            result_values = func(*compute_args, **func_kwargs)
-
-        if nodata_mask is not None:
-            result_values[nodata_mask] = fillvalue
+        result_values, no_data_value = _apply_math_func(
+            func, dtype, fillvalue, compute_args, nodata_mask
+        )
         return {"no_data_value": no_data_value, "values": result_values}
 
+    math_process_func.math_func = func
     return math_process_func
 
 
@@ -362,6 +574,7 @@ class Divide(BaseMath):
     process = staticmethod(wrap_math_process_func(np.divide))
 
     @property
+    @cached_metadata
     def dtype(self):
         # use at least float32
         return np.result_type(np.float32, *self.args)
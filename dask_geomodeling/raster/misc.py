@@ -6,6 +6,7 @@ import numpy as np
 import shapely
 
 from dask import config
+from dask_geomodeling.core import cached_metadata
 from dask_geomodeling.geometry import GeometryBlock
 from dask_geomodeling.utils import (
     get_uint_dtype,
@@ -69,6 +70,7 @@ class Clip(BaseSingle):
         return {"values": values, "no_data_value": data["no_data_value"]}
 
     @property
+    @cached_metadata
     def extent(self):
         """Intersection of bounding boxes of 'store' and 'source'. """
         result, mask = [s.extent for s in self.args]
@@ -86,6 +88,7 @@ class Clip(BaseSingle):
             return x1, y1, x2, y2
 
     @property
+    @cached_metadata
     def geometry(self):
         """Intersection of geometries of 'store' and 'source'. """
         result, mask = [x.geometry for x in self.args]
@@ -0,0 +1,125 @@
+"""
+Module containing blocks that parallelize raster requests
+"""
+from itertools import product
+from math import ceil
+
+import numpy as np
+
+from .base import BaseSingle
+
+
+__all__ = ["RasterTiler"]
+
+
+class RasterTiler(BaseSingle):
+    """Parallelize operations on a RasterBlock by tiling the request
+
+    A 'vals' request is split into tiles of at most ``tile_width`` by
+    ``tile_height`` pixels, that are aligned to the pixels of the request.
+    The tiles are evaluated as separate nodes in the compute graph, so that
+    a parallel scheduler can compute them concurrently. Afterwards, the
+    tiles are stitched together into the requested array.
+
+    :param store: the raster whose requests to tile
+    :param tile_width: the maximum width of a tile in pixels
+    :param tile_height: the maximum height of a tile in pixels
+
+    :type store: RasterBlock
+    :type tile_width: integer
+    :type tile_height: integer
+
+    Tiles for which the store returns no data are filled with 'no data'. The
+    result is empty only if all tiles are empty.
+
+    Requests of other modes ('time', 'meta') are passed to the store as is.
+    """
+
+    def __init__(self, store, tile_width, tile_height):
+        tile_width = int(tile_width)
+        tile_height = int(tile_height)
+        if tile_width < 1 or tile_height < 1:
+            raise ValueError("The tile width and height should be at least 1")
+        super().__init__(store, tile_width, tile_height)
+
+    @property
+    def tile_width(self):
+        return self.args[1]
+
+    @property
+    def tile_height(self):
+        return self.args[2]
+
+    def get_sources_and_requests(self, **request):
+        if request["mode"] != "vals":
+            return [({"mode": request["mode"]}, None), (self.store, request)]
+
+        width = request["width"]
+        height = request["height"]
+        ncols = ceil(width / self.tile_width)
+        nrows = ceil(height / self.tile_height)
+        if ncols <= 1 and nrows <= 1:
+            return [({"mode": "vals"}, None), (self.store, request)]  # shortcut
+
+        # compute the bbox of each tile from its pixel indices
+        x1, y1, x2, y2 = request["bbox"]
+        size_x = (x2 - x1) / width
+        size_y = (y2 - y1) / height
+        tiles = []
+        sources_and_requests = []
+        for i, j in product(range(nrows), range(ncols)):
+            i1 = i * self.tile_height
+            i2 = min(i1 + self.tile_height, height)
+            j1 = j * self.tile_width
+            j2 = min(j1 + self.tile_width, width)
+            tiles.append((i1, i2, j1, j2))
+            bbox = (
+                x1 + j1 * size_x,
+                y2 - i2 * size_y,
+                x1 + j2 * size_x,
+                y2 - i1 * size_y,
+            )
+            sources_and_requests.append(
+                (
+                    self.store,
+                    {**request, "bbox": bbox, "width": j2 - j1, "height": i2 - i1},
+                )
+            )
+
+        process_kwargs = {
+            "mode": "vals",
+            "tiles": tiles,
+            "width": width,
+            "height": height,
+        }
+        return [(process_kwargs, None)] + sources_and_requests
+
+    @staticmethod
+    def process(process_kwargs, *all_data):
+        if "tiles" not in process_kwargs:
+            return all_data[0]  # for non-tiled or non-vals requests
+
+        # a tile may be empty (e.g. outside of the extent of the store)
+        tiles_and_data = [
+            (tile, data)
+            for (tile, data) in zip(process_kwargs["tiles"], all_data)
+            if data is not None
+        ]
+        if not tiles_and_data:
+            return
+
+        first = tiles_and_data[0][1]
+        no_data_value = first["no_data_value"]
+        result = np.full(
+            (len(first["values"]), process_kwargs["height"], process_kwargs["width"]),
+            no_data_value,
+            dtype=first["values"].dtype,
+        )
+        for (i1, i2, j1, j2), data in tiles_and_data:
+            values = data["values"]
+            if data["no_data_value"] != no_data_value:
+                values = np.where(
+                    values == data["no_data_value"], no_data_value, values
+                )
+            result[:, i1:i2, j1:j2] = values
+        return {"values": result, "no_data_value": no_data_value}
@@ -0,0 +1,139 @@
+"""
+Module containing functions to resample raster data.
+
+The resampling method of a raster source is selected per request using the
+``aggregation`` field of a 'vals' request:
+
+- ``'nearest'`` (default): take the value of the nearest pixel
+- ``'bilinear'``: interpolate bilinearly between the 4 nearest pixels
+- ``'average'``: average the pixels that are covered by the target pixel
+
+Nodata pixels do not contribute to the result; a target pixel is nodata if
+all contributing pixels are nodata. The resampled data has the dtype of
+the source data.
+"""
+import numpy as np
+
+from dask_geomodeling.utils import get_index, get_nearest_indices
+
+__all__ = ["RESAMPLING_METHODS", "get_resampling_method", "resample"]
+
+RESAMPLING_METHODS = ("nearest", "bilinear", "average")
+
+
+def get_resampling_method(request):
+    """Return the resampling method of a request.
+
+    :param request: a 'vals' request, with an optional ``aggregation`` field
+
+    Raises ValueError if the method is unknown.
+    """
+    method = request.get("aggregation") or "nearest"
+    if method not in RESAMPLING_METHODS:
+        raise ValueError(
+            "Unknown aggregation '{}', choose from {}".format(
+                method, RESAMPLING_METHODS
+            )
+        )
+    return method
+
+
+def _get_valid(data, no_data_value):
+    """Return a boolean array that is True where data is valid"""
+    valid = get_index(data, no_data_value)
+    if data.dtype.kind == "f":
+        valid &= np.isfinite(data)
+    return valid
+
+
+def _cast(values, dtype):
+    """Cast float values to dtype, rounding for integer and boolean dtypes"""
+    dtype = np.dtype(dtype)
+    if dtype.kind == "b":
+        return values >= 0.5
+    if dtype.kind in "iu":
+        return np.round(values).astype(dtype)
+    return values.astype(dtype)
+
+
+def _resample_nearest(data, no_data_value, height, width):
+    rows = get_nearest_indices(data.shape[1], height)
+    cols = get_nearest_indices(data.shape[2], width)
+    return data[:, rows[:, np.newaxis], cols]
+
+
+def _get_bilinear_weights(length, size):
+    """Return the two neighbouring indices and the weight of the second one
+    for every pixel of an axis of given length that is resampled to size"""
+    coords = (np.arange(size) + 0.5) * (length / size) - 0.5
+    coords = np.clip(coords, 0, length - 1)
+    first = np.floor(coords).astype(np.intp)
+    second = np.minimum(first + 1, length - 1)
+    return first, second, coords - first
+
+
+def _resample_bilinear(data, no_data_value, height, width):
+    r1, r2, wr = _get_bilinear_weights(data.shape[1], height)
+    c1, c2, wc = _get_bilinear_weights(data.shape[2], width)
+    wr = wr[:, np.newaxis]
+    valid = _get_valid(data, no_data_value)
+    values = np.where(valid, data, 0).astype(np.float64)
+
+    total = np.zeros((data.shape[0], height, width))
+    weights = np.zeros((data.shape[0], height, width))
+    for rows, row_weight in ((r1, 1 - wr), (r2, wr)):
+        for cols, col_weight in ((c1, 1 - wc), (c2, wc)):
+            index = (slice(None), rows[:, np.newaxis], cols)
+            weight = valid[index] * (row_weight * col_weight)
+            total += values[index] * weight
+            weights += weight
+
+    result = np.full((data.shape[0], height, width), no_data_value, data.dtype)
+    has_data = weights > 0
+    result[has_data] = _cast(total[has_data] / weights[has_data], data.dtype)
+    return result
+
+
+def _resample_average(data, no_data_value, height, width):
+    # the first source pixel of every target pixel, along both axes
+    rows = (np.arange(height) * (data.shape[1] / height)).astype(np.intp)
+    cols = (np.arange(width) * (data.shape[2] / width)).astype(np.intp)
+    valid = _get_valid(data, no_data_value)
+    values = np.where(valid, data, 0).astype(np.float64)
+
+    # sum the values and count the valid pixels in every block
+    total = np.add.reduceat(np.add.reduceat(values, rows, axis=1), cols, axis=2)
+    count = np.add.reduceat(
+        np.add.reduceat(valid.astype(np.intp), rows, axis=1), cols, axis=2
+    )
+
+    result = np.full((data.shape[0], height, width), no_data_value, data.dtype)
+    has_data = count > 0
+    result[has_data] = _cast(total[has_data] / count[has_data], data.dtype)
+    return result
+
+
+_RESAMPLERS = {
+    "nearest": _resample_nearest,
+    "bilinear": _resample_bilinear,
+    "average": _resample_average,
+}
+
+
+def resample(data, no_data_value, height, width, method="nearest"):
+    """Resample a 3D array (t, y, x) to the shape (t, height, width).
+
+    :param data: the array to resample
+    :param no_data_value: the value that designates 'no data' in data
+    :param height: the height of the result
+    :param width: the width of the result
+    :param method: one of ``'nearest'``, ``'bilinear'`` or ``'average'``
+
+    Returns data itself if it already has the requested shape, otherwise a
+    new array with the dtype of data.
+    """
+    if data.shape[1:] == (height, width):
+        return data
+    if data.size == 0 or height == 0 or width == 0:
+        return np.full((data.shape[0], height, width), no_data_value, data.dtype)
+    return _RESAMPLERS[method](data, no_data_value, height, width)
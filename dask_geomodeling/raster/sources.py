@@ -3,22 +3,207 @@ Module containing raster sources.
 """
 import numpy as np
 
-from osgeo import gdal, gdal_array
+from osgeo import gdal_array
 
 from datetime import datetime, timedelta
 
 from dask_geomodeling import utils
+from dask_geomodeling.core import cached_metadata
 
 from .base import RasterBlock
+from .resample import get_resampling_method, resample
 
-__all__ = ["MemorySource", "RasterFileSource"]
+__all__ = ["MemorySource", "MemoryMappedSource", "RasterFileSource"]
+
+
+def _fill_padding(result, zoomed_ranges, no_data_value):
+    """Fill the pixels of result outside of the zoomed ranges with nodata"""
+    (i1, i2), (j1, j2) = zoomed_ranges
+    result[:, :i1] = no_data_value
+    result[:, i2:] = no_data_value
+    result[:, i1:i2, :j1] = no_data_value
+    result[:, i1:i2, j2:] = no_data_value
+
+
+def _get_point_index(geo_transform, bbox, shape):
+    """Return the (i, j) pixel index of a point request into an array of
+    given shape, or None if the bbox is not a point or the point is outside
+    of the array."""
+    x1, y1, x2, y2 = bbox
+    if x1 != x2 or y1 != y2:
+        return
+    (i, _), (j, _) = geo_transform.get_indices_for_bbox(bbox)
+    if 0 <= i < shape[-2] and 0 <= j < shape[-1]:
+        return i, j
+
+
+def _fill_point(values, no_data_value, height, width):
+    """Broadcast the pixel values of a point request to the requested shape"""
+    if values.dtype.kind == "f":
+        values[~np.isfinite(values)] = no_data_value
+    result = np.empty((len(values), height, width), dtype=values.dtype)
+    result[:] = values.reshape(-1, 1, 1)
+    return result
+
+
+def _get_overview_level(band, x_factor, y_factor):
+    """Return the index of the coarsest overview of band that has a
+    resolution at least as fine as the requested resolution, or None if
+    reading from the band itself is best.
+
+    :param x_factor: the requested pixel width divided by the native one
+    :param y_factor: the requested pixel height divided by the native one
+    """
+    factor = min(x_factor, y_factor)
+    level, best = None, 1.0
+    for k in range(band.GetOverviewCount()):
+        overview = band.GetOverview(k)
+        overview_factor = min(band.XSize / overview.XSize, band.YSize / overview.YSize)
+        if best < overview_factor <= factor:
+            level, best = k, overview_factor
+    return level
+
+
+def _read_bands(dataset, first_band, ranges, out):
+    """Read consecutive bands from a GDAL dataset into an array.
+
+    The window given by ranges is resampled by GDAL (nearest neighbour) to
+    the shape of out, so that only the required pixels are read. For coarse
+    requests, the best matching overview is read instead of the full
+    resolution band.
+    """
+    (i1, i2), (j1, j2) = ranges
+    length, height, width = out.shape
+    level = _get_overview_level(
+        dataset.GetRasterBand(first_band + 1),
+        (j2 - j1) / width,
+        (i2 - i1) / height,
+    )
+    if level is not None:
+        for k in range(length):
+            band = dataset.GetRasterBand(first_band + k + 1).GetOverview(level)
+            # scale the window to the overview
+            fx = band.XSize / dataset.RasterXSize
+            fy = band.YSize / dataset.RasterYSize
+            x1, x2 = int(round(j1 * fx)), max(int(round(j2 * fx)), 1)
+            y1, y2 = int(round(i1 * fy)), max(int(round(i2 * fy)), 1)
+            x1, y1 = min(x1, x2 - 1), min(y1, y2 - 1)
+            band.ReadAsArray(x1, y1, x2 - x1, y2 - y1, buf_obj=out[k])
+        return
+
+    window = int(j1), int(i1), int(j2 - j1), int(i2 - i1)
+    if length > 1:
+        band_list = list(range(first_band + 1, first_band + length + 1))
+        try:
+            dataset.ReadAsArray(*window, buf_obj=out, band_list=band_list)
+        except TypeError:
+            pass  # GDAL < 3 does not support band_list, read band by band
+        else:
+            return
+    for k in range(length):
+        band = dataset.GetRasterBand(first_band + k + 1)
+        band.ReadAsArray(*window, buf_obj=out[k])
+
+
+def _get_warp_indices(process_kwargs, geo_transform, shape):
+    """Return the source pixels for a 'vals' request (see
+    utils.get_warp_indices), or None if no reprojection is necessary."""
+    projection = process_kwargs["projection"]
+    src_projection = process_kwargs["src_projection"]
+    if projection.upper() == src_projection.upper():
+        return
+    return utils.get_warp_indices(
+        tuple(geo_transform),
+        tuple(shape),
+        src_projection,
+        tuple(process_kwargs["bbox"]),
+        process_kwargs["width"],
+        process_kwargs["height"],
+        projection,
+    )
+
+
+def _read_warped(dataset, first_band, indices, out):
+    """Read consecutive bands from a GDAL dataset reprojected into an array.
+
+    Only the window that contains the source pixels is read. If out is much
+    coarser than the source, the window is decimated by an integer factor.
+    """
+    mask, rows, cols = indices
+    if not mask.any():
+        return
+    i1, i2 = int(rows.min()), int(rows.max()) + 1
+    j1, j2 = int(cols.min()), int(cols.max()) + 1
+    height, width = mask.shape
+    factor = max(int(min((i2 - i1) / height, (j2 - j1) / width)), 1)
+    buf_shape = (
+        out.shape[0],
+        int(np.ceil((i2 - i1) / factor)),
+        int(np.ceil((j2 - j1) / factor)),
+    )
+    buf = np.empty(buf_shape, dtype=out.dtype)
+    _read_bands(dataset, first_band, ((i1, i2), (j1, j2)), buf)
+    buf_rows = (rows - i1) * buf_shape[1] // (i2 - i1)
+    buf_cols = (cols - j1) * buf_shape[2] // (j2 - j1)
+    out[:, mask] = buf[:, buf_rows, buf_cols]
+
+
+def _validate_memory_args(
+    data,
+    no_data_value,
+    projection,
+    pixel_size,
+    pixel_origin,
+    time_first,
+    time_delta,
+    metadata,
+):
+    """Validate and normalize the arguments of a MemorySource (except data)"""
+    no_data_value = data.dtype.type(no_data_value)
+    projection = utils.get_epsg_or_wkt(projection)
+    if not hasattr(pixel_size, "__iter__"):
+        pixel_size = [pixel_size] * 2
+    else:
+        pixel_size = list(pixel_size)
+        if len(pixel_size) != 2:
+            raise ValueError("pixel_size should have length 2")
+    pixel_size = [float(x) for x in pixel_size]
+    pixel_origin = [float(x) for x in pixel_origin]
+    if len(pixel_origin) != 2:
+        raise ValueError("pixel_origin should have length 2")
+    if isinstance(time_first, datetime):
+        time_first = utils.dt_to_ms(time_first)
+    else:
+        time_first = int(time_first)
+    if isinstance(time_delta, timedelta):
+        time_delta = int(time_delta.total_seconds() * 1000)
+    elif time_delta is None:
+        if data.shape[0] > 1:
+            raise ValueError("time_delta is required for temporal data")
+    else:
+        time_delta = int(time_delta)
+    if metadata is not None:
+        metadata = list(metadata)
+        if len(metadata) != data.shape[0]:
+            raise ValueError("Metadata length should match data length")
+    return (
+        no_data_value,
+        projection,
+        pixel_size,
+        pixel_origin,
+        time_first,
+        time_delta,
+        metadata,
+    )
 
 
 class MemorySource(RasterBlock):
     """A raster source that interfaces data from memory.
 
-    Nodata values are supported, but when upsampling the data, these are
-    assumed to be 0 biasing data edges towards 0.
+    The data is resampled to the requested resolution using the method given
+    by the 'aggregation' field of the request (see
+    :mod:`dask_geomodeling.raster.resample`). Reprojection always uses
+    nearest neighbour interpolation.
 
     :param data: the pixel values
         this value will be transformed in a 3D array (t, y, x)
@@ -54,42 +239,18 @@ class MemorySource(RasterBlock):
         metadata=None,
     ):
         data = np.atleast_3d(data)
-        no_data_value = data.dtype.type(no_data_value)
-        projection = utils.get_epsg_or_wkt(projection)
-        if not hasattr(pixel_size, "__iter__"):
-            pixel_size = [pixel_size] * 2
-        else:
-            pixel_size = list(pixel_size)
-            if len(pixel_size) != 2:
-                raise ValueError("pixel_size should have length 2")
-        pixel_size = [float(x) for x in pixel_size]
-        pixel_origin = [float(x) for x in pixel_origin]
-        if len(pixel_origin) != 2:
-            raise ValueError("pixel_origin should have length 2")
-        if isinstance(time_first, datetime):
-            time_first = utils.dt_to_ms(time_first)
-        else:
-            time_first = int(time_first)
-        if isinstance(time_delta, timedelta):
-            time_delta = int(time_delta.total_seconds() * 1000)
-        elif time_delta is None:
-            if data.shape[0] > 1:
-                raise ValueError("time_delta is required for temporal data")
-        else:
-            time_delta = int(time_delta)
-        if metadata is not None:
-            metadata = list(metadata)
-            if len(metadata) != data.shape[0]:
-                raise ValueError("Metadata length should match data length")
         super().__init__(
             data,
-            no_data_value,
-            projection,
-            pixel_size,
-            pixel_origin,
-            time_first,
-            time_delta,
-            metadata,
+            *_validate_memory_args(
+                data,
+                no_data_value,
+                projection,
+                pixel_size,
+                pixel_origin,
+                time_first,
+                time_delta,
+                metadata,
+            )
         )
 
     @property
@@ -145,6 +306,7 @@ class MemorySource(RasterBlock):
         return utils.Extent(bbox, utils.get_sr(self.projection))
 
     @property
+    @cached_metadata
     def extent(self):
         extent = self._get_extent()
         if extent is None:
@@ -152,6 +314,7 @@ class MemorySource(RasterBlock):
         return extent.transformed(utils.EPSG4326).bbox
 
     @property
+    @cached_metadata
     def geometry(self):
         extent = self._get_extent()
         if extent is None:
@@ -162,6 +325,7 @@ class MemorySource(RasterBlock):
         return self.data.shape[0]
 
     @property
+    @cached_metadata
     def period(self):
         if len(self) == 0:
             return
@@ -173,20 +337,20 @@ class MemorySource(RasterBlock):
             return first, last
 
     @property
+    @cached_metadata
     def timedelta(self):
         if len(self) <= 1:
             return None
         return timedelta(milliseconds=self.time_delta)
 
+    def _get_vals_data(self, first_i, last_i):
+        """Return the data for a 'vals' request of frames first_i to last_i"""
+        return self.data[first_i : last_i + 1]
+
     def get_sources_and_requests(self, **request):
         mode = request["mode"]
 
-        if (
-            mode == "vals"
-            and request.get("projection").upper() != self.projection.upper()
-        ):
-            raise RuntimeError("This source block cannot reproject data")
-        elif mode == "meta" and self.metadata is None:
+        if mode == "meta" and self.metadata is None:
             return [({"mode": "empty_meta"}, None)]
 
         # interpret start and stop request parameters
@@ -204,12 +368,15 @@ class MemorySource(RasterBlock):
         if mode == "vals":
             process_kwargs = {
                 "mode": "vals",
-                "data": self.data[first_i : last_i + 1],
+                "data": self._get_vals_data(first_i, last_i),
                 "no_data_value": self.no_data_value,
                 "bbox": request["bbox"],
                 "width": request["width"],
                 "height": request["height"],
                 "geo_transform": self.geo_transform,
+                "projection": request["projection"],
+                "src_projection": self.projection,
+                "aggregation": get_resampling_method(request),
             }
         elif mode == "meta":
             # metadata can't be None at this point
@@ -261,24 +428,157 @@ class MemorySource(RasterBlock):
         if width == 0 or height == 0:
             return np.empty((data.shape[0], height, width), dtype=data.dtype)
 
+        # reproject if the requested projection differs
+        indices = _get_warp_indices(process_kwargs, gt, data.shape[1:])
+        if indices is not None:
+            mask, rows, cols = indices
+            result = np.full(
+                (data.shape[0], height, width), no_data_value, dtype=data.dtype
+            )
+            result[:, mask] = data[:, rows, cols]
+            if result.dtype.kind == "f":
+                result[~np.isfinite(result)] = no_data_value
+            return {"values": result, "no_data_value": no_data_value}
+
+        # point requests: take the pixel from all frames, without resampling
+        index = _get_point_index(gt, bbox, data.shape)
+        if index is not None:
+            values = np.array(data[(slice(None),) + index])
+            result = _fill_point(values, no_data_value, height, width)
+            return {"values": result, "no_data_value": no_data_value}
+
         # transform the requested bounding box to indices into the array
         shape = data.shape
         ranges, padding = gt.get_array_ranges(bbox, shape)
-        result = data[:, slice(*ranges[0]), slice(*ranges[1])]
 
-        # pad the data to the shape given by the index
-        if padding is not None:
-            padding = ((0, 0),) + padding  # for the time axis
-            result = np.pad(result, padding, "constant", constant_values=no_data_value)
-
-        # zoom to the desired height and width
-        result = utils.zoom_raster(result, no_data_value, height, width)
+        # compute the part of the result that is covered by the data
+        zoomed = utils.get_zoomed_ranges(ranges, padding, height, width)
+        (i1, i2), (j1, j2) = zoomed
+        result = np.empty((shape[0], height, width), dtype=data.dtype)
+        _fill_padding(result, zoomed, no_data_value)
+
+        # resample the data into the result
+        if i1 < i2 and j1 < j2:
+            window = data[:, slice(*ranges[0]), slice(*ranges[1])]
+            result[:, i1:i2, j1:j2] = resample(
+                window, no_data_value, i2 - i1, j2 - j1, process_kwargs["aggregation"]
+            )
 
         # fill nan values if they popped up
-        result[~np.isfinite(result)] = no_data_value
+        if result.dtype.kind == "f":
+            result[~np.isfinite(result)] = no_data_value
         return {"values": result, "no_data_value": no_data_value}
 
 
+class MemoryMappedSource(MemorySource):
+    """A raster source that interfaces data from a memory-mapped .npy file.
+
+    This source behaves as the MemorySource, but the data is not loaded into
+    memory. Only the path to the file is included in the compute graph, and
+    every process maps the file into its memory once, so that multiple
+    workers share the data through the operating system's page cache.
+
+    If a request is aligned with the pixels of the data and needs no padding
+    or resampling, the result is a (read-only) view of the memory map. In that
+    case, NaN values in the file are not replaced by the no_data_value.
+
+    :param url: the path to a .npy file containing a 3D array (t, y, x).
+      File paths have to be contained inside the current root setting.
+      Relative paths are interpreted relative to this setting (but internally
+      stored as absolute paths).
+    :param no_data_value: the pixel value that designates 'no data'
+    :param projection: the projection of the given pixel values
+    :param pixel_size: the size of one pixel (in units given by projection)
+        if x and y pixel sizes differ, provide them in (x, y) order
+    :param pixel_origin: the location (x, y) of pixel with index (0, 0)
+    :param time_first: the timestamp of the first frame in data (in
+        milliseconds since 1-1-1970)
+    :param time_delta: the difference between two consecutive frames (in ms)
+    :param metadata: a list of metadata corresponding to the input frames
+
+    :type url: str
+    :type no_data_value: number
+    :type projection: str
+    :type pixel_size: float or length-2 iterable of floats
+    :type pixel_origin: length-2 iterable of floats
+    :type time_first: integer or naive datetime
+    :type time_delta: integer or timedelta or NoneType
+    :type metadata: list or NoneType
+
+    Create the file for instance with ``numpy.save``.
+    """
+
+    def __init__(
+        self,
+        url,
+        no_data_value,
+        projection,
+        pixel_size,
+        pixel_origin,
+        time_first=0,
+        time_delta=None,
+        metadata=None,
+    ):
+        url = utils.safe_file_url(url)
+        data = utils.load_memmap(utils.safe_abspath(url))
+        if data.ndim != 3:
+            raise ValueError("The data should be a 3D array (t, y, x)")
+        RasterBlock.__init__(
+            self,
+            url,
+            *_validate_memory_args(
+                data,
+                no_data_value,
+                projection,
+                pixel_size,
+                pixel_origin,
+                time_first,
+                time_delta,
+                metadata,
+            )
+        )
+
+    @property
+    def url(self):
+        return self.args[0]
+
+    @property
+    def data(self):
+        return utils.load_memmap(utils.safe_abspath(self.url))
+
+    def get_file_signature(self):
+        return utils.get_file_signature(utils.safe_abspath(self.url))
+
+    def _get_vals_data(self, first_i, last_i):
+        return self.url, first_i, last_i + 1
+
+    @staticmethod
+    def process(process_kwargs):
+        if process_kwargs["mode"] != "vals":
+            return MemorySource.process(process_kwargs)
+
+        url, start, stop = process_kwargs["data"]
+        data = utils.load_memmap(utils.safe_abspath(url))[start:stop]
+        process_kwargs = {**process_kwargs, "data": data}
+        width = process_kwargs["width"]
+        height = process_kwargs["height"]
+        if width == 0 or height == 0:
+            return MemorySource.process(process_kwargs)
+
+        # return a view if the request is aligned and needs no padding
+        gt = utils.GeoTransform(process_kwargs["geo_transform"])
+        if _get_warp_indices(process_kwargs, gt, data.shape[1:]) is not None:
+            return MemorySource.process(process_kwargs)
+        ranges, padding = gt.get_array_ranges(process_kwargs["bbox"], data.shape)
+        (i1, i2), (j1, j2) = ranges
+        if padding is None and (i2 - i1, j2 - j1) == (height, width):
+            return {
+                "values": data[:, i1:i2, j1:j2],
+                "no_data_value": process_kwargs["no_data_value"],
+            }
+        return MemorySource.process(process_kwargs)
+
+
 class RasterFileSource(RasterBlock):
     """A raster source that interfaces data from a file path.
 
@@ -298,8 +598,25 @@ class RasterFileSource(RasterBlock):
       >>> from dask import config
       >>> config.set({"geomodeling.root": "/my/data/path"})
 
-    Note that this object keeps a file handle open. If you need to close the
-    file handle, call block.close_dataset (or dereference the whole object).
+    Opened files are kept in a per-thread pool of GDAL datasets, so that
+    metadata and data requests do not reopen the file every time. The pool
+    size is set by the 'geomodeling.dataset-pool-size' setting. If you need
+    to close the file handle (of the current thread), call
+    block.close_dataset.
+
+    The data is resampled to the requested resolution using the method given
+    by the 'aggregation' field of the request (see
+    :mod:`dask_geomodeling.raster.resample`). Requests in a different
+    projection than the file are reprojected using nearest neighbour
+    interpolation.
+
+    Requests at a coarse resolution are read from the best matching overview
+    of the file, if it has overviews. Use ``utils.build_overviews`` to build
+    them.
+
+    The metadata of the file (like extent and period) is cached on this block
+    and on the blocks that depend on it, until the modification time or the
+    size of the file changes.
     """
 
     def __init__(self, url, time_first=0, time_delta=300000):
@@ -328,54 +645,63 @@ class RasterFileSource(RasterBlock):
 
     @property
     def gdal_dataset(self):
-        try:
-            return self._gdal_dataset
-        except AttributeError:
-            path = utils.safe_abspath(self.url)
-            self._gdal_dataset = gdal.Open(path)
-            return self._gdal_dataset
+        return utils.get_dataset(utils.safe_abspath(self.url))
 
     def close_dataset(self):
-        if hasattr(self, "_gdal_dataset"):
-            self._gdal_dataset = None
+        utils.close_dataset(utils.safe_abspath(self.url))
+
+    def get_file_signature(self):
+        path = utils.safe_abspath(self.url)
+        return utils.get_file_signature(path), utils.get_file_signature(path + ".ovr")
 
     @property
+    @cached_metadata
     def projection(self):
         return utils.get_epsg_or_wkt(self.gdal_dataset.GetProjection())
 
     @property
+    @cached_metadata
     def dtype(self):
-        first_band = self.gdal_dataset.GetRasterBand(1)
+        dataset = self.gdal_dataset  # keep a reference while using the band
+        first_band = dataset.GetRasterBand(1)
         return gdal_array.GDALTypeCodeToNumericTypeCode(first_band.DataType)
 
     @property
+    @cached_metadata
     def fillvalue(self):
-        first_band = self.gdal_dataset.GetRasterBand(1)
+        dataset = self.gdal_dataset  # keep a reference while using the band
+        first_band = dataset.GetRasterBand(1)
         return self.dtype(first_band.GetNoDataValue())
 
     @property
+    @cached_metadata
     def geo_transform(self):
         return utils.GeoTransform(self.gdal_dataset.GetGeoTransform())
 
     def _get_extent(self):
+        dataset = self.gdal_dataset
         bbox = self.geo_transform.get_bbox(
-            (0, 0), (self.gdal_dataset.RasterYSize, self.gdal_dataset.RasterXSize)
+            (0, 0), (dataset.RasterYSize, dataset.RasterXSize)
         )
         return utils.Extent(bbox, utils.get_sr(self.projection))
 
     @property
+    @cached_metadata
     def extent(self):
         extent_epsg4326 = self._get_extent().transformed(utils.EPSG4326)
         return extent_epsg4326.bbox
 
     @property
+    @cached_metadata
     def geometry(self):
         return self._get_extent().as_geometry()
 
+    @cached_metadata
     def __len__(self):
         return self.gdal_dataset.RasterCount
 
     @property
+    @cached_metadata
     def period(self):
         if len(self) == 0:
             return
@@ -387,6 +713,7 @@ class RasterFileSource(RasterBlock):
             return first, last
 
     @property
+    @cached_metadata
     def timedelta(self):
         if len(self) <= 1:
             return None
@@ -395,12 +722,6 @@ class RasterFileSource(RasterBlock):
     def get_sources_and_requests(self, **request):
         mode = request["mode"]
 
-        if (
-            mode == "vals"
-            and request.get("projection").upper() != self.projection.upper()
-        ):
-            raise RuntimeError("This source block cannot reproject data")
-
         # interpret start and stop request parameters
         start, stop, first_i, last_i = utils.snap_start_stop(
             request.get("start"),
@@ -420,18 +741,21 @@ class RasterFileSource(RasterBlock):
                 "bbox": request["bbox"],
                 "width": request["width"],
                 "height": request["height"],
-                "first_band": last_i,
-                "last_band": first_i,
+                "first_band": first_i,
+                "last_band": last_i,
                 "dtype": self.dtype,
                 "fillvalue": self.fillvalue,
+                "projection": request["projection"],
+                "src_projection": self.projection,
+                "aggregation": get_resampling_method(request),
             }
         elif mode == "meta":
             # metadata can't be None at this point
             process_kwargs = {
                 "mode": "meta",
                 "url": self.url,
-                "first_band": last_i,
-                "last_band": first_i,
+                "first_band": first_i,
+                "last_band": last_i,
             }
         elif mode == "time":
             process_kwargs = {
@@ -466,7 +790,7 @@ class RasterFileSource(RasterBlock):
         # open the dataset
         url = process_kwargs["url"]
         path = utils.safe_abspath(url)
-        dataset = gdal.Open(path)
+        dataset = utils.get_dataset(path)
         first_band = process_kwargs["first_band"]
         last_band = process_kwargs["last_band"]
 
@@ -491,9 +815,27 @@ class RasterFileSource(RasterBlock):
         if width == 0 or height == 0:
             return np.empty((length, height, width), dtype=dtype)
 
-        # transform the requested bounding box to indices into the array
+        # reproject if the requested projection differs
         shape = dataset.RasterCount, dataset.RasterYSize, dataset.RasterXSize
         gt = utils.GeoTransform(dataset.GetGeoTransform())
+        indices = _get_warp_indices(process_kwargs, gt, shape[1:])
+        if indices is not None:
+            result = np.full((length, height, width), no_data_value, dtype=dtype)
+            _read_warped(dataset, first_band, indices, result)
+            if result.dtype.kind == "f":
+                result[~np.isfinite(result)] = no_data_value
+            return {"values": result, "no_data_value": no_data_value}
+
+        # point requests: read the pixel from all bands in one call
+        index = _get_point_index(gt, bbox, shape)
+        if index is not None:
+            i, j = index
+            values = np.empty((length, 1, 1), dtype=dtype)
+            _read_bands(dataset, first_band, ((i, i + 1), (j, j + 1)), values)
+            result = _fill_point(values, no_data_value, height, width)
+            return {"values": result, "no_data_value": no_data_value}
+
+        # transform the requested bounding box to indices into the array
         ranges, padding = gt.get_array_ranges(bbox, shape)
         read_shape = [rng[1] - rng[0] for rng in ranges]
 
@@ -504,25 +846,35 @@ class RasterFileSource(RasterBlock):
             )
             return {"values": result, "no_data_value": no_data_value}
 
-        # read arrays from file
-        result = np.empty([length] + read_shape, dtype=dtype)
-        for k in range(length):
-            band = dataset.GetRasterBand(first_band + k + 1)
-            result[k] = band.ReadAsArray(
-                int(ranges[1][0]),
-                int(ranges[0][0]),
-                int(read_shape[1]),
-                int(read_shape[0]),
+        # compute the part of the result that is covered by the file
+        zoomed = utils.get_zoomed_ranges(ranges, padding, height, width)
+        (i1, i2), (j1, j2) = zoomed
+        result = np.empty((length, height, width), dtype=dtype)
+        _fill_padding(result, zoomed, no_data_value)
+
+        # read (and resample) the bands from file into the result
+        method = process_kwargs["aggregation"]
+        if i1 < i2 and j1 < j2 and method == "nearest":
+            # let GDAL resample directly into the result
+            _read_bands(dataset, first_band, ranges, result[:, i1:i2, j1:j2])
+        elif i1 < i2 and j1 < j2:
+            # coarse requests are read at most at twice the requested resolution
+            factor = min(read_shape[0] / (i2 - i1), read_shape[1] / (j2 - j1))
+            factor = max(int(factor / 2), 1)
+            buf = np.empty(
+                (
+                    length,
+                    int(np.ceil(read_shape[0] / factor)),
+                    int(np.ceil(read_shape[1] / factor)),
+                ),
+                dtype=dtype,
+            )
+            _read_bands(dataset, first_band, ranges, buf)
+            result[:, i1:i2, j1:j2] = resample(
+                buf, no_data_value, i2 - i1, j2 - j1, method
             )
-
-        # pad the data to the shape given by the index
-        if padding is not None:
-            padding = ((0, 0),) + padding  # for the time axis
-            result = np.pad(result, padding, "constant", constant_values=no_data_value)
-
-        # zoom to the desired height and width
-        result = utils.zoom_raster(result, no_data_value, height, width)
 
         # fill nan values if they popped up
-        result[~np.isfinite(result)] = no_data_value
+        if result.dtype.kind == "f":
+            result[~np.isfinite(result)] = no_data_value
         return {"values": result, "no_data_value": no_data_value}
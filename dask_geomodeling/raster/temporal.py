@@ -1,16 +1,23 @@
 """
 Module containing raster blocks for temporal operations.
 """
+from bisect import bisect_right
 from functools import partial
+import multiprocessing
 import pytz
 from datetime import timedelta as Timedelta
 from pandas.tseries.frequencies import to_offset
 
 import numpy as np
 import pandas as pd
+from dask import config
+from dask.base import tokenize
 
+from dask_geomodeling.core import ResultCache, cached_metadata
 from dask_geomodeling.utils import (
     get_dtype_max,
+    get_nearest_time_index,
+    get_time_index,
     parse_percentile_statistic,
     dtype_for_statistic,
 )
@@ -36,9 +43,11 @@ class Snap(RasterBlock):
     apparently have the time structure of the Store supplied as the
     index parameter.
 
-    In contrast to the group block, this block does not take
-    advantage of aligned bands in any way. Therefore the perfomance will
-    be noticeably worse, in particular when requesting long timeslices.
+    The store frames nearest to the requested index times are looked up at
+    once, from the period and timedelta of the store or else in its time
+    index. Consecutive store frames are read with a single request. Index
+    times halfway two store frames snap to the even frame index if the store
+    has a timedelta and to the earlier frame otherwise.
     """
 
     def __init__(self, store, index):
@@ -55,38 +64,47 @@ class Snap(RasterBlock):
     def index(self):
         return self.args[1]
 
+    @cached_metadata
     def __len__(self):
         return len(self.index)
 
     @property
+    @cached_metadata
     def dtype(self):
         return self.store.dtype
 
     @property
+    @cached_metadata
     def fillvalue(self):
         return self.store.fillvalue
 
     @property
+    @cached_metadata
     def period(self):
         return self.index.period if self.store else None
 
     @property
+    @cached_metadata
     def timedelta(self):
         return self.index.timedelta
 
     @property
+    @cached_metadata
     def extent(self):
         return self.store.extent
 
     @property
+    @cached_metadata
     def geometry(self):
         return self.store.geometry
 
     @property
+    @cached_metadata
     def projection(self):
         return self.store.projection
 
     @property
+    @cached_metadata
     def geo_transform(self):
         return self.store.geo_transform
 
@@ -122,17 +140,52 @@ class Snap(RasterBlock):
                 (self.store, request),
             ]
 
-        # Return a list of requests with snapped times. Times that occur more
-        # than once will not be evaluated multiple times due to caching.
-        requests = [(dict(snap_mode="concat"), None)]
-        request["stop"] = None
-        for time in index_time:
-            store_time = self.store.get_data(mode="time", start=time)["time"]
+        if not index_time:
+            return [(dict(snap_mode="gather", indices=[]), None)]
+
+        # find the store frame nearest to each index time
+        indices, get_time = self._get_nearest_frames(index_time)
+
+        # request runs of consecutive store frames, each frame only once
+        frames = np.unique(indices)
+        run_starts = np.flatnonzero(np.diff(frames, prepend=-2) != 1)
+        run_stops = np.append(run_starts[1:], len(frames)) - 1
+        requests = [
+            (
+                dict(snap_mode="gather", indices=np.searchsorted(frames, indices)),
+                None,
+            )
+        ]
+        for a, b in zip(frames[run_starts], frames[run_stops]):
             _request = request.copy()
-            _request["start"] = store_time[0]
+            _request["start"] = get_time(a)
+            _request["stop"] = get_time(b)
             requests.append((self.store, _request))
         return requests
 
+    def _get_nearest_frames(self, index_time):
+        """Return the index of the store frame nearest to each of index_time,
+        and a function that returns the time of a store frame (by index).
+
+        For stores with a timedelta, the frame indices are computed from the
+        period. Times halfway two frames then snap to the even frame index,
+        just like the raster sources round a 'time' request. For other stores,
+        the time index of the store is searched, and times halfway two frames
+        snap to the earlier one.
+        """
+        delta = self.store.timedelta
+        if delta is None:
+            store_time = self.store.time_index
+            indices = get_nearest_time_index(store_time, index_time)
+            return indices, lambda i: store_time[i].item()
+        period = self.store.period
+        origin = np.datetime64(period[0], "us")
+        step = np.timedelta64(delta, "us")
+        last = int(round((period[1] - period[0]) / delta))
+        offsets = (get_time_index(index_time) - origin) / step
+        indices = np.rint(offsets).astype(np.intp).clip(0, last)
+        return indices, lambda i: (origin + i * step).item()
+
     @staticmethod
     def process(process_kwargs, *args):
         if len(args) == 0:
@@ -154,17 +207,25 @@ class Snap(RasterBlock):
             elif "meta" in data:
                 return {"meta": data["meta"] * repeats}
 
-        # we have a bunch of single frame results that need to be concatenated
-        if snap_mode == "concat":
+        # we have runs of frames from which the snapped frames are taken
+        if snap_mode == "gather":
             if any((arg is None for arg in args)):
                 return None
 
             # combine the args
+            indices = process_kwargs["indices"]
             if "values" in args[0]:
-                values = np.concatenate([x["values"] for x in args], 0)
-                return {"values": values, "no_data_value": args[0]["no_data_value"]}
+                if len(args) == 1:
+                    values = args[0]["values"]
+                else:
+                    values = np.concatenate([x["values"] for x in args], 0)
+                return {
+                    "values": values[indices],
+                    "no_data_value": args[0]["no_data_value"],
+                }
             elif "meta" in args[0]:
-                return {"meta": [x["meta"][0] for x in args]}
+                meta = [m for x in args for m in x["meta"]]
+                return {"meta": [meta[i] for i in indices]}
 
 
 class Shift(BaseSingle):
@@ -194,6 +255,7 @@ class Shift(BaseSingle):
         return Timedelta(milliseconds=self.args[1])
 
     @property
+    @cached_metadata
     def period(self):
         start, stop = self.store.period
         return start + self.time, stop + self.time
@@ -214,9 +276,9 @@ class Shift(BaseSingle):
     def process(data, time):
         if data is None:
             return None
-        # shift result if necessary
+        # shift result if necessary (without changing the input inplace)
         if "time" in data:
-            data["time"] = [t + time for t in data["time"]]
+            return {"time": [t + time for t in data["time"]]}
 
         return data
 
@@ -327,10 +389,155 @@ def _label_to_period(dt, frequency, closed, label, timezone):
     return period
 
 
+def _get_bin_starts(times, frequency, closed, label, timezone):
+    """Return the (sorted) indices of the first frame of each bin"""
+    if frequency is None:
+        return [0]
+    series = pd.Series(index=times, dtype=float)
+    series = series.tz_localize("UTC").tz_convert(timezone)
+    indices = series.resample(frequency, closed=closed, label=label).indices
+    return sorted(inds[0] for inds in indices.values() if len(inds) > 0)
+
+
+def _get_time_chunks(source, request, frequency, closed, label, timezone):
+    """Split the time range of a 'vals' request to source into chunks.
+
+    The chunks are cut at the start of a bin where possible. The chunk size
+    (in frames) is derived from the geomodeling.temporal-chunk-size setting.
+
+    Returns a list of (start, stop) tuples, or None if the request does not
+    need to be split.
+    """
+    chunk_size = config.get("geomodeling.temporal-chunk-size")
+    if not chunk_size:
+        return
+    frame_size = request["width"] * request["height"]
+    frame_size *= np.result_type(np.float32, source.dtype).itemsize
+    max_frames = max(int(chunk_size // max(frame_size, 1)), 1)
+    time_data = source.get_data(
+        mode="time", start=request["start"], stop=request["stop"]
+    )
+    times = time_data["time"] if time_data else []
+    if len(times) <= max_frames:
+        return
+    bin_starts = _get_bin_starts(times, frequency, closed, label, timezone)
+    chunks = []
+    first = 0
+    while first < len(times):
+        last = min(first + max_frames, len(times))
+        if last < len(times):
+            # end the chunk at the start of a bin, if there is one
+            bin_start = bin_starts[bisect_right(bin_starts, last) - 1]
+            if bin_start > first:
+                last = bin_start
+        chunks.append((times[first], times[last - 1]))
+        first = last
+    return chunks
+
+
+# frames with more pixels are reduced bin by bin instead of with reduceat
+REDUCEAT_MAX_SIZE = 64
+
+
 def count_not_nan(x, *args, **kwargs):
     return np.sum(~np.isnan(x), *args, **kwargs)
 
 
+def _reduceat(ufunc, values, starts, dtype=None):
+    """Apply ufunc.reduceat along the first axis of values.
+
+    For large frames, numpy's reduceat along the first axis is much slower
+    than reducing the (contiguous) bins one by one, so then we loop.
+    """
+    if values[0].size <= REDUCEAT_MAX_SIZE:
+        return ufunc.reduceat(values, starts, axis=0, dtype=dtype)
+    stops = np.append(starts[1:], len(values))
+    return np.array(
+        [ufunc.reduce(values[a:b], axis=0, dtype=dtype) for a, b in zip(starts, stops)]
+    )
+
+
+def _reduce_bins(values, starts, statistic):
+    """Reduce values along the first axis over bins of consecutive frames.
+
+    :param values: a float array with NaN for no data (changed inplace)
+    :param starts: the index of the first frame of each bin. A bin ends
+      where the next one starts, the last bin ends at the last frame.
+    :param statistic: the statistic to compute
+
+    Returns None if the statistic cannot be computed by a reduction.
+    """
+    if statistic == "min":
+        return _reduceat(np.fmin, values, starts)
+    elif statistic == "max":
+        return _reduceat(np.fmax, values, starts)
+    elif statistic not in ("sum", "count", "mean"):
+        return
+    no_data = np.isnan(values)
+    if statistic != "sum":
+        count = _reduceat(np.add, ~no_data, starts, dtype=np.int64)
+        if statistic == "count":
+            return count
+    np.copyto(values, 0, where=no_data)
+    total = _reduceat(np.add, values, starts)
+    if statistic == "sum":
+        return total
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return total / count
+
+
+def _cast_aggregated(aggregated, dtype, fillvalue):
+    """Cast aggregated values to dtype, setting NaN and inf to fillvalue"""
+    # keep track of NaN or inf values before casting to target dtype
+    no_data_mask = ~np.isfinite(aggregated)
+    # cast to target dtype
+    if dtype != aggregated.dtype:
+        aggregated = aggregated.astype(dtype)
+    # set fillvalue to NaN values
+    aggregated[no_data_mask] = fillvalue
+    return aggregated
+
+
+def _get_accumulators(values, starts, statistic):
+    """Reduce bins into the accumulators from which statistic can be computed
+    after combining them with the accumulators of other time chunks."""
+    if statistic != "mean":
+        return {statistic: _reduce_bins(values, starts, statistic)}
+    # count first: reducing the sum changes values inplace
+    count = _reduce_bins(values, starts, "count")
+    return {"sum": _reduce_bins(values, starts, "sum"), "count": count}
+
+
+def _combine_accumulators(chunks, n_bins, statistic):
+    """Combine the accumulators of time chunks into one aggregate per bin.
+
+    Returns the aggregated values and the (sorted) indices of the bins that
+    received data, or (None, []) if no chunk has data.
+    """
+    chunks = [chunk for chunk in chunks if chunk is not None and chunk["bins"]]
+    if not chunks:
+        return None, []
+    keys = ("sum", "count") if statistic == "mean" else (statistic,)
+    shape = (n_bins,) + chunks[0][keys[0]].shape[1:]
+    combined = {
+        key: np.full(shape, np.nan if key in ("min", "max") else 0.0) for key in keys
+    }
+    for chunk in chunks:
+        bins = chunk["bins"]
+        for key, accumulator in combined.items():
+            if key == "min":
+                accumulator[bins] = np.fmin(accumulator[bins], chunk[key])
+            elif key == "max":
+                accumulator[bins] = np.fmax(accumulator[bins], chunk[key])
+            else:
+                accumulator[bins] += chunk[key]
+    bins = sorted(set(i for chunk in chunks for i in chunk["bins"]))
+    if statistic != "mean":
+        return combined[statistic], bins
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return combined["sum"] / combined["count"], bins
+
+
 class TemporalAggregate(BaseSingle):
     """
     Geoblock that resamples rasters in time.
@@ -355,6 +562,15 @@ class TemporalAggregate(BaseSingle):
     :type label: string or NoneType
     :type timezone: string
 
+    For the statistics that can be computed from running totals
+    (``'sum', 'count', 'min', 'max', 'mean'``), long time ranges are
+    processed in chunks of frames if the geomodeling.temporal-chunk-size
+    setting (in bytes) is nonzero. Every chunk is a separate node in the
+    compute graph that reduces its frames to running totals, which are then
+    combined. With the 'sync' scheduler, only one chunk of frames is in memory
+    at a time. Parallel schedulers process chunks concurrently, so that up to
+    one chunk per worker is in memory.
+
     See also:
       https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.Series.resample.html
       https://pandas.pydata.org/pandas-docs/stable/user_guide/timeseries.html#dateoffset-objects
@@ -370,6 +586,8 @@ class TemporalAggregate(BaseSingle):
         "median": {"func": np.nanmedian, "extensive": False},
         # 'percentile' is hardcoded to np.nanpercentile
     }
+    # statistics that can be computed in time chunks
+    STREAMING_STATISTICS = ("sum", "count", "min", "max", "mean")
 
     def __init__(
         self,
@@ -443,6 +661,7 @@ class TemporalAggregate(BaseSingle):
         }
 
     @property
+    @cached_metadata
     def period(self):
         period = self.source.period
         if period is None:
@@ -452,6 +671,7 @@ class TemporalAggregate(BaseSingle):
         return tuple(_get_bin_label(x, **self._snap_kwargs) for x in period)
 
     @property
+    @cached_metadata
     def timedelta(self):
         try:
             return to_offset(self.frequency).delta
@@ -459,10 +679,12 @@ class TemporalAggregate(BaseSingle):
             return  # e.g. Month is non-equidistant
 
     @property
+    @cached_metadata
     def dtype(self):
         return dtype_for_statistic(self.source.dtype, self.statistic)
 
     @property
+    @cached_metadata
     def fillvalue(self):
         return get_dtype_max(self.dtype)
 
@@ -503,6 +725,21 @@ class TemporalAggregate(BaseSingle):
 
     def get_sources_and_requests(self, **request):
         kwargs = self._snap_kwargs
+        chunk = request.pop("chunk", None)
+        if chunk is not None:
+            # a time chunk of a 'vals' request, see _get_time_chunks
+            kwargs["mode"] = "vals"
+            kwargs["start"], kwargs["stop"] = chunk
+            kwargs["dtype"] = np.dtype(self.dtype).str
+            kwargs["statistic"] = self.statistic
+            kwargs["partial"] = True
+            time_request = {
+                "mode": "time",
+                "start": request["start"],
+                "stop": request["stop"],
+            }
+            return [(kwargs, None), (self.source, time_request), (self.source, request)]
+
         start = request.get("start")
         stop = request.get("stop")
         mode = request["mode"]
@@ -545,6 +782,22 @@ class TemporalAggregate(BaseSingle):
         if mode == "vals":
             kwargs["dtype"] = np.dtype(self.dtype).str
             kwargs["statistic"] = self.statistic
+            if self.statistic in self.STREAMING_STATISTICS:
+                chunks = _get_time_chunks(self.source, request, **self._snap_kwargs)
+                if chunks:
+                    kwargs["chunked"] = True
+                    return [(kwargs, None)] + [
+                        (
+                            self,
+                            {
+                                **request,
+                                "start": chunk_start,
+                                "stop": chunk_stop,
+                                "chunk": (start, stop),
+                            },
+                        )
+                        for (chunk_start, chunk_stop) in chunks
+                    ]
 
         time_request = {
             "mode": "time",
@@ -554,7 +807,7 @@ class TemporalAggregate(BaseSingle):
         return [(kwargs, None), (self.source, time_request), (self.source, request)]
 
     @staticmethod
-    def process(process_kwargs, time_data=None, data=None):
+    def process(process_kwargs, *args):
         mode = process_kwargs["mode"]
         # handle empty data
         if process_kwargs.get("empty"):
@@ -569,6 +822,22 @@ class TemporalAggregate(BaseSingle):
         if mode == "time":
             return {"time": labels.to_pydatetime().tolist()}
 
+        if process_kwargs.get("chunked"):
+            # combine the accumulators of the time chunks
+            statistic = process_kwargs["statistic"]
+            dtype = process_kwargs["dtype"]
+            if TemporalAggregate.STATISTICS[statistic]["extensive"]:
+                fillvalue = 0
+            else:
+                fillvalue = get_dtype_max(dtype)
+            aggregated, bins = _combine_accumulators(args, len(labels), statistic)
+            if aggregated is None:
+                return
+            result = np.full(shape=aggregated.shape, fill_value=fillvalue, dtype=dtype)
+            result[bins] = _cast_aggregated(aggregated[bins], dtype, fillvalue)
+            return {"values": result, "no_data_value": get_dtype_max(dtype)}
+
+        time_data, data = args
         if time_data is None or not time_data.get("time"):
             return None if mode == "vals" else {mode: []}
 
@@ -622,25 +891,58 @@ class TemporalAggregate(BaseSingle):
         # put NaN for no data
         values[data["values"] == data["no_data_value"]] = np.nan
 
+        # list the (non-empty) bins as (output index, frame indices)
+        bins = []
+        for i, timestamp in enumerate(labels):
+            inds = indices.get(timestamp, ())
+            if len(inds) > 0:
+                bins.append((i, inds))
+
+        # the bins of sorted frames are adjacent runs: reduce them at once
+        starts = np.array([inds[0] for (_, inds) in bins], dtype=int)
+        stops = np.array([inds[-1] + 1 for (_, inds) in bins], dtype=int)
+        adjacent = np.array_equal(stops[:-1], starts[1:]) and all(
+            len(inds) == stop - start
+            for (_, inds), start, stop in zip(bins, starts, stops)
+        )
+
+        if process_kwargs.get("partial"):
+            # a time chunk: return accumulators to be combined with others
+            if not bins:
+                return {"bins": []}
+            if adjacent:
+                groups = [(values[starts[0] : stops[-1]], starts - starts[0])]
+            else:
+                groups = [(values[inds], np.array([0])) for (_, inds) in bins]
+            accumulators = [_get_accumulators(v, s, statistic) for (v, s) in groups]
+            partial_result = {
+                key: np.concatenate([x[key] for x in accumulators])
+                for key in accumulators[0]
+            }
+            partial_result["bins"] = [i for (i, _) in bins]
+            return partial_result
+
         result = np.full(
             shape=(len(labels), values.shape[1], values.shape[2]),
             fill_value=fillvalue,
             dtype=dtype,
         )
-
-        for i, timestamp in enumerate(labels):
-            inds = indices[timestamp]
-            if len(inds) == 0:
-                continue
-            aggregated = agg_func(values[inds], axis=0)
-            # keep track of NaN or inf values before casting to target dtype
-            no_data_mask = ~np.isfinite(aggregated)
-            # cast to target dtype
-            if dtype != aggregated.dtype:
-                aggregated = aggregated.astype(dtype)
-            # set fillvalue to NaN values
-            aggregated[no_data_mask] = fillvalue
-            result[i] = aggregated
+        if not bins:
+            return {"values": result, "no_data_value": get_dtype_max(dtype)}
+
+        aggregated = None
+        if adjacent and not percentile:
+            aggregated = _reduce_bins(
+                values[starts[0] : stops[-1]], starts - starts[0], statistic
+            )
+        if aggregated is not None:
+            result[[i for (i, _) in bins]] = _cast_aggregated(
+                aggregated, dtype, fillvalue
+            )
+        else:  # e.g. median and percentile are computed per bin
+            for i, inds in bins:
+                aggregated = agg_func(values[inds], axis=0)
+                result[i] = _cast_aggregated(aggregated, dtype, fillvalue)
 
         return {"values": result, "no_data_value": get_dtype_max(dtype)}
 
@@ -649,6 +951,51 @@ def accumulate_count_not_nan(x, *args, **kwargs):
     return np.cumsum(~np.isnan(x), *args, **kwargs)
 
 
+# the number of frames between two checkpoints of a Cumulative
+CHECKPOINT_INTERVAL = 256
+
+_checkpoint_cache = ResultCache(0)
+
+
+def _get_checkpoint_cache():
+    """Return the process-wide cache of Cumulative checkpoints.
+
+    The budget of the cache (in bytes) is taken from the
+    geomodeling.checkpoint-cache-size setting. A size of 0 disables it.
+    """
+    maxsize = config.get("geomodeling.checkpoint-cache-size", 0)
+    if maxsize != _checkpoint_cache.maxsize:
+        _checkpoint_cache.resize(maxsize)
+    return _checkpoint_cache
+
+
+def _checkpoints_reusable():
+    """Whether Cumulative checkpoints stored here can be reused.
+
+    Checkpoints live in the memory of the process that stores them. They are
+    not reused with the 'processes' scheduler setting and are not stored in
+    the worker processes of a process-based scheduler.
+    """
+    if config.get("geomodeling.scheduler", "sync") == "processes":
+        return False
+    return multiprocessing.current_process().name == "MainProcess"
+
+
+def _store_checkpoints(accumulated, key, first_frame, times):
+    """Store every CHECKPOINT_INTERVAL-th frame of a cumulative.
+
+    :param accumulated: the cumulative, starting at frame index first_frame
+    :param key: the key of the checkpoints, see Cumulative._find_checkpoint
+    :param first_frame: the frame index of the first frame in accumulated
+    :param times: the times of the frames in accumulated
+    """
+    cache = _get_checkpoint_cache()
+    first_checkpoint = (-first_frame - 1) % CHECKPOINT_INTERVAL
+    for i in range(first_checkpoint, len(accumulated), CHECKPOINT_INTERVAL):
+        # copy, so that the cache does not keep the whole array alive
+        cache.put(key + (first_frame + i, times[i]), accumulated[i].copy())
+
+
 class Cumulative(BaseSingle):
     """
     Geoblock that computes a cumulative of a raster over time.
@@ -665,6 +1012,22 @@ class Cumulative(BaseSingle):
     :type frequency: string or NoneType
     :type timezone: string
 
+    Like ``TemporalAggregate``, long time ranges are processed in chunks of
+    frames if the geomodeling.temporal-chunk-size setting is nonzero. The
+    chunks are computed independently; their running totals are carried over
+    when they are combined.
+
+    Without frequency, the cumulative of a frame depends on all frames before
+    it. If the geomodeling.checkpoint-cache-size setting (in bytes) is
+    nonzero, the cumulative is stored in memory every ``CHECKPOINT_INTERVAL``
+    frames, so that a later request only reads the frames after the nearest
+    checkpoint. For sources with a timedelta, the nearest checkpoint is found
+    without requesting the times of all earlier frames. Checkpoints are
+    stored by the process that computes the cumulative: with the 'processes'
+    scheduler they would stay in the worker processes and are therefore
+    neither stored nor looked up. Checkpoints are discarded when the file
+    signatures of the source change.
+
     See also:
       https://pandas.pydata.org/pandas-docs/stable/user_guide/timeseries.html#dateoffset-objects
     """
@@ -723,14 +1086,32 @@ class Cumulative(BaseSingle):
         }
 
     @property
+    @cached_metadata
     def dtype(self):
         return dtype_for_statistic(self.source.dtype, self.statistic)
 
     @property
+    @cached_metadata
     def fillvalue(self):
         return get_dtype_max(self.dtype)
 
     def get_sources_and_requests(self, **request):
+        chunk = request.pop("chunk", None)
+        if chunk is not None:
+            # a time chunk of a 'vals' request, see _get_time_chunks
+            kwargs = self._snap_kwargs
+            kwargs["mode"] = "vals"
+            kwargs["start"], kwargs["stop"] = chunk
+            kwargs["dtype"] = np.dtype(self.dtype).str
+            kwargs["statistic"] = self.statistic
+            kwargs["partial"] = True
+            time_request = {
+                "mode": "time",
+                "start": request["start"],
+                "stop": request["stop"],
+            }
+            return [(kwargs, None), (self.source, time_request), (self.source, request)]
+
         # a time request does not involve any resampling, so just propagate
         if request["mode"] == "time":
             return [({"mode": "time"}, None), (self.source, request)]
@@ -754,6 +1135,11 @@ class Cumulative(BaseSingle):
         if self.frequency is None:
             request["start"] = self.period[0]
             request["stop"] = stop
+            if mode == "vals" and self.statistic in self.STATISTICS:
+                checkpoint = self._find_checkpoint(request, start)
+                if checkpoint is not None:
+                    kwargs.update(checkpoint)
+                    request["start"] = checkpoint["first_time"]
         else:
             start_period = _get_bin_period(start, **kwargs)
 
@@ -771,6 +1157,24 @@ class Cumulative(BaseSingle):
         if mode == "vals":
             kwargs["dtype"] = np.dtype(self.dtype).str
             kwargs["statistic"] = self.statistic
+            if self.statistic in self.STATISTICS:
+                chunks = _get_time_chunks(self.source, request, **self._snap_kwargs)
+            else:
+                chunks = None  # percentiles cannot be computed in chunks
+            if chunks:
+                kwargs["chunked"] = True
+                return [(kwargs, None)] + [
+                    (
+                        self,
+                        {
+                            **request,
+                            "start": chunk_start,
+                            "stop": chunk_stop,
+                            "chunk": (start, stop),
+                        },
+                    )
+                    for (chunk_start, chunk_stop) in chunks
+                ]
 
         time_request = {
             "mode": "time",
@@ -779,14 +1183,82 @@ class Cumulative(BaseSingle):
         }
         return [(kwargs, None), (self.source, time_request), (self.source, request)]
 
+    def _find_checkpoint(self, request, start):
+        """Find the latest checkpoint before the frame at 'start'.
+
+        Returns a dict with the checkpoint key, the index and time of the first
+        frame to read and the checkpoint (None if there is none), or None if
+        checkpoints are disabled.
+        """
+        cache = _get_checkpoint_cache()
+        if not cache.maxsize or not _checkpoints_reusable():
+            return
+        # checkpoints are stored per source (including the signatures of its
+        # files), statistic and spatial request
+        layer = {k: v for (k, v) in request.items() if k not in ("start", "stop")}
+        signatures = tokenize(self.source.get_file_signatures())
+        key = (self.source.token, signatures, self.statistic, tokenize(layer))
+        # the frame index of start, and a function to get the time of a frame
+        delta = self.source.timedelta
+        if delta is not None:
+            origin = request["start"]
+            first = int(round((start - origin) / delta))
+
+            def get_time(index):
+                return origin + index * delta
+
+        else:
+            # the source is not equidistant: the times have to be requested
+            time_data = self.source.get_data(
+                mode="time", start=request["start"], stop=start
+            )
+            get_time = time_data["time"].__getitem__
+            first = len(time_data["time"]) - 1
+        last_checkpoint = (first // CHECKPOINT_INTERVAL) * CHECKPOINT_INTERVAL - 1
+        for index in range(last_checkpoint, -1, -CHECKPOINT_INTERVAL):
+            checkpoint = cache.get(key + (index, get_time(index)))
+            if checkpoint is not None:
+                break
+        else:
+            index, checkpoint = -1, None
+        return {
+            "checkpoint_key": key,
+            "checkpoint": checkpoint,
+            "first_frame": index + 1,
+            "first_time": get_time(index + 1),
+        }
+
     @staticmethod
-    def process(process_kwargs, time_data=None, data=None):
+    def process(process_kwargs, *args):
         mode = process_kwargs["mode"]
         # handle empty data
         if process_kwargs.get("empty"):
             return None if mode == "vals" else {mode: []}
         if mode == "time":
-            return time_data
+            return args[0]
+        if process_kwargs.get("chunked"):
+            # add the running total of each bin to the next chunk(s)
+            totals = {}
+            if process_kwargs.get("checkpoint") is not None:
+                totals[None] = process_kwargs["checkpoint"]
+            parts = []
+            for chunk in args:
+                if chunk is None:
+                    return
+                for key, total, accumulated in chunk["bins"]:
+                    if key in totals:
+                        accumulated = accumulated + totals[key]
+                        total = total + totals[key]
+                    totals[key] = total
+                    parts.append(accumulated)
+            if not parts:
+                return
+            dtype = process_kwargs["dtype"]
+            # sum and count are extensive, so the fillvalue is 0
+            result = _cast_aggregated(np.concatenate(parts), dtype, fillvalue=0)
+            return {"values": result, "no_data_value": get_dtype_max(dtype)}
+
+        time_data, data = args
         if time_data is None or not time_data.get("time"):
             return None if mode == "vals" else {mode: []}
 
@@ -851,6 +1323,19 @@ class Cumulative(BaseSingle):
         values[data["values"] == data["no_data_value"]] = np.nan
 
         output_mask = (times.index >= start_ts) & (times.index <= stop_ts)
+        if process_kwargs.get("partial"):
+            # a time chunk: return the cumulative and the total per bin
+            bins = []
+            for key, indices_in_bin in indices.items():
+                if len(indices_in_bin) == 0:
+                    continue
+                accumulated = agg_func(values[indices_in_bin], axis=0)
+                mask = output_mask[indices_in_bin]
+                bins.append(
+                    (indices_in_bin[0], key, accumulated[-1], accumulated[mask])
+                )
+            return {"bins": [x[1:] for x in sorted(bins, key=lambda x: x[0])]}
+
         output_offset = np.where(output_mask)[0][0]
         n_frames = output_mask.sum()
         result = np.full(
@@ -859,10 +1344,26 @@ class Cumulative(BaseSingle):
             dtype=dtype,
         )
 
+        # continue from the checkpoint as if all frames before it were read
+        checkpoint = process_kwargs.get("checkpoint")
+        if checkpoint is not None and statistic == "sum":
+            first = values[0]
+            values[0] = np.where(np.isnan(first), checkpoint, first + checkpoint)
+
         for indices_in_bin in indices.values():
             mask = output_mask[indices_in_bin]
             data = values[indices_in_bin]
-            accumulated = agg_func(data, axis=0)[mask]
+            accumulated = agg_func(data, axis=0)
+            if checkpoint is not None and statistic == "count":
+                accumulated += checkpoint
+            if "checkpoint_key" in process_kwargs and _checkpoints_reusable():
+                _store_checkpoints(
+                    accumulated,
+                    process_kwargs["checkpoint_key"],
+                    process_kwargs["first_frame"],
+                    time_data["time"],
+                )
+            accumulated = accumulated[mask]
             # keep track of NaN or inf values before casting to target dtype
             no_data_mask = ~np.isfinite(accumulated)
             # cast to target dtype
@@ -2,6 +2,8 @@ from unittest import mock
 import unittest
 import pickle
 import logging
+import gc
+import threading
 
 from datetime import datetime
 from datetime import timedelta
@@ -12,8 +14,15 @@ from numpy.testing import assert_equal
 from shapely.geometry import box
 
 from dask_geomodeling.core import Block, compute, construct, DummyBlock
+from dask_geomodeling.core import get_scheduler, ResultCache, get_result_cache
+from dask_geomodeling.core import estimate_size, cached_metadata
+from dask_geomodeling.core import compute_multiple, get_data_many
+from dask_geomodeling.core import graphs
+from dask_geomodeling.core import NodeCallback, Profiler, planning_cache
 
+from dask import config
 from dask.base import tokenize
+from dask.local import get_sync
 
 
 class MockBlock(Block):
@@ -50,6 +59,74 @@ class Mul(Block):
         return dict(no_data_value=255, values=a["values"] * b["values"])
 
 
+class CountingBlock(Block):
+    calls = []
+
+    @staticmethod
+    def process(fill_value):
+        CountingBlock.calls.append(fill_value)
+        return dict(no_data_value=255, values=np.full((2, 3), fill_value))
+
+
+class MetadataBlock(Block):
+    @property
+    @cached_metadata
+    def metadata(self):
+        sources = [x for x in self.args if isinstance(x, Block)]
+        return [self.count()] + [x.metadata for x in sources]
+
+    def count(self):
+        return 1
+
+
+class FileMetadataBlock(MetadataBlock):
+    signature = 1
+
+    def get_file_signature(self):
+        return self.signature
+
+
+class NormalizingBlock(Block):
+    inits = 0
+
+    def __init__(self, value, *args):
+        NormalizingBlock.inits += 1
+        super().__init__(float(value), *args)
+
+    @staticmethod
+    def process(value, *args):
+        return value
+
+
+class TimeBlock(Block):
+    calls = []
+
+    @staticmethod
+    def process(request):
+        TimeBlock.calls.append(request["mode"])
+        return {"time": [datetime(2000, 1, 1)]}
+
+    def get_sources_and_requests(self, **request):
+        return [(request, None)]
+
+
+class FileBlock(CountingBlock):
+    signature = 1
+
+    def get_file_signature(self):
+        return FileBlock.signature
+
+
+class PlanningBlock(Block):
+    """Queries the time of its source twice while planning"""
+
+    def get_sources_and_requests(self, **request):
+        source = self.args[0]
+        for _ in range(2):
+            time = source.get_data(mode="time")["time"]
+        return [(source, dict(request, start=time[0]))]
+
+
 class TestBlock(unittest.TestCase):
     def setUp(self):
         self.N = 10
@@ -175,6 +252,44 @@ class TestBlock(unittest.TestCase):
         # did not tokenize again
         self.assertEqual(1, patched_tokenize.call_count)
 
+    def test_token_large_array(self):
+        array = np.random.random(2 ** 14)  # 128 kB
+        block = MockBlock(array)
+        self.assertEqual(block.token, tokenize(MockBlock.get_import_path(), array))
+
+    def test_token_large_array_digest_cached(self):
+        array = np.random.random(2 ** 14)
+        with mock.patch.object(
+            graphs, "normalize_token", side_effect=graphs.normalize_token
+        ) as patched:
+            token = MockBlock(array).token
+            self.assertEqual(MockBlock(array).token, token)
+            self.assertEqual(MockBlock(array.copy()).token, token)
+        # the digest of the same array was reused
+        self.assertEqual(patched.call_count, 2)
+
+    def test_token_large_array_digest_released(self):
+        array = np.random.random(2 ** 14)
+        MockBlock(array).token
+        (key,) = [
+            k for (k, (ref, _)) in graphs._array_digests.items() if ref() is array
+        ]
+        del array
+        gc.collect()
+        self.assertNotIn(key, graphs._array_digests)
+
+    def test_token_large_array_sampled(self):
+        array = np.random.random(2 ** 14)
+        other = array.copy()
+        other[1] = -1.0
+        self.assertNotEqual(MockBlock(array).token, MockBlock(other).token)
+        with config.set({"geomodeling.token-sample-size": 1024}):
+            # index 1 is not in the sample
+            self.assertEqual(MockBlock(array).token, MockBlock(other).token)
+            other = other.copy()
+            other[-1] = -1.0
+            self.assertNotEqual(MockBlock(array).token, MockBlock(other).token)
+
     def test_graph_equal_sources(self):
         add = Add(self.block, self.block)
         graph, _ = add.get_graph()
@@ -189,6 +304,43 @@ class TestBlock(unittest.TestCase):
         self.assertEqual(len(graph), 3)
         self.assertIn(add.name, graph)
 
+    def test_graph_order(self):
+        a, b = MockBlock(1.0), MockBlock(2.0)
+        view = Mul(Add(a, b), Add(b, Mul(a, b)))
+        graph, name = view.get_graph()
+        self.assertEqual(name, view.name)
+        self.assertEqual(
+            list(graph),
+            [
+                a.name,
+                b.name,
+                Add(a, b).name,
+                Mul(a, b).name,
+                Add(b, Mul(a, b)).name,
+                view.name,
+            ],
+        )
+        self.assertEqual(graph[view.name], [Mul, Add(a, b).name, view.args[1].name])
+
+    def test_deep_chain(self):
+        view = self.block
+        for i in range(10000):
+            view = Add(view, MockBlock(float(i % 2)))
+        self.assertEqual(len(view.get_graph()[0]), 10002)
+        graph, name = view.get_compute_graph()
+        self.assertEqual(len(graph), 10002)
+        self.assertEqual(graph[name][1], view.args[0].get_compute_graph()[1])
+        # values are uint8
+        assert_equal(compute(graph, name)["values"], (1 + 5000) % 256)
+
+    def test_deep_chain_construct(self):
+        view = self.block
+        for i in range(10000):
+            view = Add(view, self.block)
+        constructed = construct(*view.get_graph(serialize=True))
+        self.assertEqual(constructed.token, view.token)
+        self.assertEqual(constructed.get_graph(), view.get_graph())
+
     def test_compute_graph(self):
         add = Add(self.block, self.block)
         graph, name = add.get_compute_graph(**self.request)
@@ -218,6 +370,30 @@ class TestBlock(unittest.TestCase):
         assert_equal(result["values"].shape, self.shape)
         assert_equal(result["values"], 2.0)
 
+    def test_compute_threads(self):
+        add = Add(self.block, MockBlock(2.0))
+        result = add.get_data(scheduler="threads", **self.request)
+        assert_equal(result["values"], 3.0)
+
+    def test_compute_scheduler_callable(self):
+        add = Add(self.block, self.block)
+        get = mock.Mock(side_effect=get_sync)
+        result = add.get_data(scheduler=get, **self.request)
+        self.assertEqual(get.call_count, 1)
+        assert_equal(result["values"], 2.0)
+
+    def test_compute_scheduler_from_config(self):
+        add = Add(self.block, self.block)
+        get = mock.Mock(side_effect=get_sync)
+        with config.set({"geomodeling.scheduler": get}):
+            add.get_data(**self.request)
+        self.assertEqual(get.call_count, 1)
+
+    def test_get_scheduler(self):
+        self.assertIs(get_scheduler("sync"), get_sync)
+        self.assertIsNot(get_scheduler("threads"), get_sync)
+        self.assertRaises(ValueError, get_scheduler, "unknown")
+
     def test_pickle(self):
         pkl = pickle.dumps(self.block)
         view2 = pickle.loads(pkl)
@@ -285,3 +461,305 @@ class TestBlock(unittest.TestCase):
             with self.assertLogs(level=logging.WARNING):
                 result = construct(graph, invalid_name, validate=False)
             self.assertEqual(result.token, block.token)
+
+    def test_construct_cached(self):
+        path = NormalizingBlock.get_import_path()
+        graph = {"a": [path, 1], "b": [path, 2, "a"]}
+        NormalizingBlock.inits = 0
+        with config.set({"geomodeling.construct-cache-size": 128}):
+            expected = construct(graph, "b")
+            self.assertEqual(NormalizingBlock.inits, 2)
+            result = construct(graph, "b")
+        # the __init__ was skipped, but the args are normalized
+        self.assertEqual(NormalizingBlock.inits, 2)
+        self.assertEqual(result.token, expected.token)
+        self.assertEqual(result.args[0], 2.0)
+        self.assertIsInstance(result.args[0], float)
+        self.assertEqual(result.args[1].token, expected.args[1].token)
+
+    def test_construct_cached_disabled_by_default(self):
+        path = NormalizingBlock.get_import_path()
+        graph = {"a": [path, 3]}
+        NormalizingBlock.inits = 0
+        construct(graph, "a")
+        construct(graph, "a")
+        self.assertEqual(NormalizingBlock.inits, 2)
+
+    def test_construct_cached_settings(self):
+        path = NormalizingBlock.get_import_path()
+        graph = {"a": [path, 4]}
+        NormalizingBlock.inits = 0
+        with config.set({"geomodeling.construct-cache-size": 128}):
+            construct(graph, "a")
+            with config.set({"geomodeling.root": "/other/root"}):
+                construct(graph, "a")
+            with config.set({"geomodeling.strict-file-paths": True}):
+                construct(graph, "a")
+        # the graph is validated again for other path settings
+        self.assertEqual(NormalizingBlock.inits, 3)
+
+    def test_construct_cached_invalid(self):
+        block = Add(self.block, 2)
+        graph, name = block.get_graph(serialize=True)
+        graph[name] = graph[name][:2]
+        with config.set({"geomodeling.construct-cache-size": 128}):
+            self.assertRaises(TypeError, construct, graph, name)
+            self.assertRaises(TypeError, construct, graph, name)
+
+    def test_import_path(self):
+        path = Add.get_import_path()
+        self.assertEqual(path, "dask_geomodeling.tests.test_core.Add")
+        self.assertIs(Block.from_import_path(path), Add)
+        self.assertIs(Block.from_import_path(path), Add)
+        self.assertRaises(TypeError, Block.from_import_path, "numpy.ndarray")
+
+    def test_cached_metadata(self):
+        block = MetadataBlock(MetadataBlock(1))
+        with mock.patch.object(MetadataBlock, "count", return_value=1) as count:
+            self.assertEqual(block.metadata, [1, [1]])
+            self.assertEqual(block.metadata, [1, [1]])
+        self.assertEqual(count.call_count, 2)
+
+    def test_cached_metadata_opt_out(self):
+        source = MetadataBlock(1)
+        source.CACHE_METADATA = False
+        block = MetadataBlock(source)
+        with mock.patch.object(MetadataBlock, "count", return_value=1) as count:
+            block.metadata
+            block.metadata
+        # the opt-out propagates to blocks depending on source
+        self.assertEqual(count.call_count, 4)
+
+    def test_cached_metadata_file_changed(self):
+        block = MetadataBlock(FileMetadataBlock(1))
+        with mock.patch.object(MetadataBlock, "count", return_value=1) as count:
+            block.metadata
+            block.metadata
+            self.assertEqual(count.call_count, 2)
+            with mock.patch.object(FileMetadataBlock, "signature", 2):
+                block.metadata
+                block.metadata
+        # a changed file clears the cache of source and the blocks depending on it
+        self.assertEqual(count.call_count, 4)
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        CountingBlock.calls = []
+        get_result_cache().clear()
+
+    def tearDown(self):
+        get_result_cache().clear()
+
+    def test_estimate_size(self):
+        array = np.zeros((10, 10), dtype="f8")
+        self.assertGreaterEqual(estimate_size({"values": array}), 800)
+        self.assertLess(estimate_size({"values": array[:1]}), 800)
+
+    def test_lru_eviction(self):
+        cache = ResultCache(2500)
+        cache.put("a", np.zeros(1000, dtype="u1"))
+        cache.put("b", np.zeros(1000, dtype="u1"))
+        cache.get("a")  # 'a' is now more recently used than 'b'
+        cache.put("c", np.zeros(1000, dtype="u1"))
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+        self.assertEqual(cache.size, 2000)
+
+    def test_too_large(self):
+        cache = ResultCache(100)
+        self.assertFalse(cache.put("a", np.zeros(1000, dtype="u1")))
+        self.assertEqual(len(cache), 0)
+
+    def test_disabled_by_default(self):
+        block = Add(CountingBlock(1), CountingBlock(2))
+        block.get_data()
+        block.get_data()
+        self.assertEqual(len(CountingBlock.calls), 4)
+
+    def test_reuse_across_requests(self):
+        source = CountingBlock(1)
+        with config.set({"geomodeling.result-cache-size": 10 ** 6}):
+            result1 = Add(source, CountingBlock(2)).get_data()
+            result2 = Add(source, CountingBlock(3)).get_data()
+        # the source was only computed once
+        self.assertEqual(sorted(CountingBlock.calls), [1, 2, 3])
+        assert_equal(result1["values"], 3)
+        assert_equal(result2["values"], 4)
+
+    def test_cached_endpoint(self):
+        block = Add(CountingBlock(1), CountingBlock(2))
+        with config.set({"geomodeling.result-cache-size": 10 ** 6}):
+            block.get_data()
+            result = block.get_data()
+        self.assertEqual(len(CountingBlock.calls), 2)
+        assert_equal(result["values"], 3)
+
+    def test_changed_file(self):
+        FileBlock.signature = 1
+        block = Add(FileBlock(1), CountingBlock(2))
+        with config.set({"geomodeling.result-cache-size": 10 ** 6}):
+            block.get_data()
+            block.get_data()
+            self.assertEqual(sorted(CountingBlock.calls), [1, 2])
+            FileBlock.signature = 2
+            block.get_data()
+        # the file source and the blocks that depend on it are recomputed
+        self.assertEqual(sorted(CountingBlock.calls), [1, 1, 2])
+
+    def test_processes_scheduler(self):
+        block = Add(CountingBlock(1), CountingBlock(2))
+        with config.set({"geomodeling.result-cache-size": 10 ** 6}):
+            block.get_data(scheduler="processes")
+            # the results are stored in this process
+            self.assertEqual(len(get_result_cache()), 3)
+            result = block.get_data()
+        self.assertEqual(CountingBlock.calls, [])
+        assert_equal(result["values"], 3)
+
+
+class TestGetDataMany(unittest.TestCase):
+    def setUp(self):
+        CountingBlock.calls = []
+
+    def test_get_data_many(self):
+        block = Add(CountingBlock(1), CountingBlock(2))
+        results = block.get_data_many([{"a": 1}, {"a": 2}, {"a": 1}])
+        self.assertEqual(len(results), 3)
+        for result in results:
+            assert_equal(result["values"], 3)
+        # the identical requests were computed once
+        self.assertEqual(len(CountingBlock.calls), 4)
+
+    def test_get_data_many_shared_sources(self):
+        a, b = CountingBlock(2), CountingBlock(3)
+        results = get_data_many([(Add(a, b), {}), (Mul(a, b), {}), (a, {})])
+        assert_equal(results[0]["values"], 5)
+        assert_equal(results[1]["values"], 6)
+        assert_equal(results[2]["values"], 2)
+        self.assertEqual(sorted(CountingBlock.calls), [2, 3])
+
+    def test_get_data_many_empty(self):
+        self.assertEqual(get_data_many([]), [])
+
+    def test_get_data_many_scheduler(self):
+        get = mock.Mock(side_effect=get_sync)
+        block = Add(CountingBlock(1), CountingBlock(2))
+        block.get_data_many([{}, {"a": 1}], scheduler=get)
+        self.assertEqual(get.call_count, 1)
+
+    def test_compute_multiple(self):
+        graph, name_1 = Add(CountingBlock(1), CountingBlock(2)).get_compute_graph()
+        graph, name_2 = Mul(CountingBlock(1), CountingBlock(2)).get_compute_graph(
+            cached_compute_graph=graph
+        )
+        result_1, result_2 = compute_multiple(graph, [name_1, name_2])
+        assert_equal(result_1["values"], 3)
+        assert_equal(result_2["values"], 2)
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.view = Add(CountingBlock(1), CountingBlock(2))
+
+    def test_by_class(self):
+        with Profiler() as profiler:
+            self.view.get_data()
+        by_class = profiler.by_class()
+        self.assertEqual(set(by_class), {"add", "countingblock"})
+        self.assertEqual(by_class["add"]["count"], 1)
+        self.assertEqual(by_class["countingblock"]["count"], 2)
+        for totals in by_class.values():
+            self.assertGreaterEqual(totals["wall_time"], 0)
+            self.assertGreaterEqual(totals["cpu_time"], 0)
+            self.assertGreaterEqual(totals["output_size"], 48)
+
+    def test_by_name(self):
+        with Profiler() as profiler:
+            self.view.get_data()
+            self.view.get_data()
+        by_name = profiler.by_name()
+        self.assertEqual(len(by_name), 3)
+        self.assertEqual(by_name[self.view.get_compute_graph()[1]]["count"], 2)
+
+    def test_cache_hits(self):
+        self.addCleanup(get_result_cache().clear)
+        with config.set({"geomodeling.result-cache-size": 10 ** 6}):
+            Add(self.view.args[0], CountingBlock(3)).get_data()
+            with Profiler() as profiler:
+                self.view.get_data()
+        by_class = profiler.by_class()
+        self.assertEqual(by_class["countingblock"]["count"], 2)
+        self.assertEqual(by_class["countingblock"]["cached"], 1)
+        self.assertEqual(by_class["add"]["cached"], 0)
+        key = self.view.args[0].get_compute_graph()[1]
+        self.assertEqual(profiler.by_name()[key]["wall_time"], 0)
+
+    def test_report(self):
+        with Profiler() as profiler:
+            self.view.get_data(scheduler="threads")
+        self.assertIn("countingblock", profiler.report())
+        self.assertIn(self.view.get_compute_graph()[1], profiler.report(by="name"))
+        self.assertRaises(ValueError, profiler.report, by="unknown")
+
+    def test_other_thread(self):
+        thread = threading.Thread(target=CountingBlock(3).get_data)
+        with Profiler() as profiler:
+            thread.start()
+            thread.join()
+            self.view.get_data()
+        self.assertEqual(set(profiler.by_class()), {"add", "countingblock"})
+        self.assertEqual(profiler.by_class()["countingblock"]["count"], 2)
+
+    def test_callback(self):
+        callback = NodeCallback()
+        with mock.patch.object(callback, "node_finished") as node_finished:
+            with callback:
+                result = self.view.get_data()
+            self.view.get_data()
+        self.assertEqual(node_finished.call_count, 3)
+        key, stats = node_finished.call_args[0]
+        self.assertEqual(key, self.view.get_compute_graph()[1])
+        self.assertEqual(stats["output_size"], estimate_size(result))
+
+
+class TestPlanningCache(unittest.TestCase):
+    def setUp(self):
+        TimeBlock.calls = []
+
+    def test_get_compute_graph(self):
+        view = PlanningBlock(TimeBlock())
+        view.get_compute_graph(mode="vals")
+        self.assertEqual(TimeBlock.calls, ["time"])
+        # the cache is not kept after planning
+        view.get_compute_graph(mode="vals")
+        self.assertEqual(TimeBlock.calls, ["time", "time"])
+
+    def test_nested(self):
+        source = TimeBlock()
+        view = Add(PlanningBlock(source, 1), PlanningBlock(source, 2))
+        graph, name = view.get_compute_graph(mode="vals")
+        self.assertEqual(len(graph), 4)
+        self.assertEqual(TimeBlock.calls, ["time"])
+
+    def test_explicit_scope(self):
+        view = PlanningBlock(TimeBlock())
+        with planning_cache():
+            view.get_compute_graph(mode="vals")
+            view.get_compute_graph(mode="meta")
+        self.assertEqual(TimeBlock.calls, ["time"])
+
+    def test_vals_not_cached(self):
+        source = TimeBlock()
+        with planning_cache():
+            source.get_data(mode="vals")
+            source.get_data(mode="vals")
+            source.get_data(mode="time")
+            source.get_data(mode="time")
+        self.assertEqual(TimeBlock.calls, ["vals", "vals", "time"])
+
+    def test_get_data_many(self):
+        view = PlanningBlock(TimeBlock())
+        get_data_many([(view, {"mode": "vals"}), (view, {"mode": "meta"})])
+        self.assertEqual(TimeBlock.calls, ["time", "vals", "meta"])
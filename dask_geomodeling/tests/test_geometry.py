@@ -21,6 +21,7 @@ from dask_geomodeling.tests.factories import (
     MockRaster,
 )
 
+from dask_geomodeling.raster import MemorySource
 from dask_geomodeling.geometry import aggregate
 from dask_geomodeling.geometry import set_operations
 from dask_geomodeling.geometry import field_operations
@@ -961,6 +962,112 @@ class TestBucketize(unittest.TestCase):
         self.assertEqual(expected, sorted(buckets))
 
 
+class TestPointSample(unittest.TestCase):
+    def setUp(self):
+        data = np.arange(3 * 10 * 10, dtype=np.int32).reshape(3, 10, 10)
+        data[:, 0, 0] = -1
+        self.raster = MemorySource(
+            data=data,
+            no_data_value=-1,
+            projection="EPSG:3857",
+            pixel_size=1,
+            pixel_origin=(0, 10),
+            time_first=Datetime(2018, 1, 1),
+            time_delta=Timedelta(hours=1),
+        )
+        # small squares, their centroids are sampled
+        centers = [(0.5, 9.5), (2.5, 7.5), (9.5, 0.5), (20.5, 20.5), (2.9, 7.9)]
+        self.source = MockGeometry(
+            polygons=[
+                (
+                    (x - 0.1, y - 0.1),
+                    (x + 0.1, y - 0.1),
+                    (x + 0.1, y + 0.1),
+                    (x - 0.1, y + 0.1),
+                )
+                for (x, y) in centers
+            ],
+            properties=[{"id": i} for i in range(1, 6)],
+        )
+        self.view = geometry.PointSample(self.source, self.raster)
+        self.request = dict(
+            mode="intersects",
+            projection="EPSG:3857",
+            geometry=box(-100, -100, 100, 100),
+        )
+
+    def test_arg_types(self):
+        self.assertRaises(TypeError, geometry.PointSample, self.source, None)
+        self.assertRaises(TypeError, geometry.PointSample, None, self.raster)
+        self.assertRaises(
+            TypeError, geometry.PointSample, self.source, self.raster, projection=4326
+        )
+        self.assertRaises(
+            ValueError, geometry.PointSample, self.source, self.raster, pixel_size=0
+        )
+        self.assertRaises(
+            ValueError, geometry.PointSample, self.source, self.raster, window_size=0
+        )
+
+        # if no projection / pixel_size specified, take them from raster
+        self.assertEqual("EPSG:3857", self.view.projection)
+        self.assertEqual(1.0, self.view.pixel_size)
+
+    def test_column_attr(self):
+        self.assertSetEqual(
+            self.view.columns, self.source.columns | {self.view.column_name}
+        )
+
+    def test_sample(self):
+        features = self.view.get_data(**self.request)["features"]
+        assert_series_equal(
+            features["value"],
+            pd.Series([np.nan, 222.0, 299.0, np.nan, 222.0], index=features.index),
+            check_names=False,
+        )
+
+    def test_windows(self):
+        for window_size, expected in [(1, 4), (3, 4), (10, 2), (256, 1)]:
+            view = geometry.PointSample(
+                self.source, self.raster, window_size=window_size
+            )
+            sources_and_requests = view.get_sources_and_requests(**self.request)
+            # the process kwargs, the source and a raster request per window
+            self.assertEqual(expected, len(sources_and_requests) - 2)
+            features = view.get_data(**self.request)["features"]
+            assert_almost_equal(features["value"].values[1:3], [222.0, 299.0])
+
+    def test_window_block(self):
+        windows = geometry.PointSampleWindows(self.source, "EPSG:3857", 1, 3)
+        self.assertEqual(
+            windows.get_data(**self.request)["windows"],
+            [(-21, -20, 20, 21), (-10, -9, 0, 1), (-8, -7, 2, 3), (-1, 0, 9, 10)],
+        )
+
+    def test_graph(self):
+        graph, name = self.view.get_compute_graph(**self.request)
+        # the source and the window are nodes of the graph
+        self.assertEqual(3, len(graph))
+        self.assertIn(self.source.get_compute_graph(**self.request)[1], graph[name])
+
+    def test_time_range(self):
+        self.request["start"] = Datetime(2018, 1, 1)
+        self.request["stop"] = Datetime(2018, 1, 1, 2)
+        features = self.view.get_data(**self.request)["features"]
+        assert_almost_equal(features["value"].iloc[1][0], [22.0, 122.0, 222.0])
+
+    def test_empty(self):
+        self.request["geometry"] = box(100, 100, 200, 200)
+        features = self.view.get_data(**self.request)["features"]
+        self.assertEqual(0, len(features))
+
+    def test_extent(self):
+        self.request["mode"] = "extent"
+        self.assertEqual(
+            self.source.get_data(**self.request), self.view.get_data(**self.request)
+        )
+
+
 class TestSetGetSeries(unittest.TestCase):
     def setUp(self):
         self.N = 10
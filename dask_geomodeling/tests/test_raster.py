@@ -1,8 +1,10 @@
 from datetime import datetime as Datetime
 from datetime import timedelta as Timedelta
 import unittest
+from unittest import mock
 
 import numpy as np
+from dask import config
 from numpy.testing import assert_equal, assert_allclose
 from scipy import ndimage
 
@@ -538,6 +540,75 @@ class TestMath(unittest.TestCase):
             result = view.get_data(**self.vals_request)
             assert_equal(result["values"], result["no_data_value"])
 
+    def test_math_fused_graph(self):
+        view = (self.storage + 2) * self.storage / 3 > 0.5
+        graph, name = view.get_compute_graph(**self.vals_request)
+        # only the storage and the fused comparison remain
+        self.assertEqual(2, len(graph))
+        self.assertTrue(name.startswith("greater_"))
+
+    def test_math_fused_values(self):
+        values = np.arange(6, dtype="u1").reshape(2, 3)
+        values[1, 1] = 255
+        storage = MockRaster(
+            origin=Datetime(2000, 1, 1),
+            timedelta=Timedelta(hours=1),
+            bands=3,
+            value=values,
+        )
+        nodata = MockRaster(
+            origin=Datetime(2000, 1, 1),
+            timedelta=Timedelta(hours=1),
+            bands=3,
+            value=255,
+        )
+        request = dict(
+            mode="vals",
+            start=Datetime(2000, 1, 1),
+            stop=Datetime(2000, 1, 1, 2),
+            bbox=(0, 0, 3, 2),
+            width=3,
+            height=2,
+        )
+        views = [
+            (storage + 2) * storage / 3,
+            (storage - 1) ** 2 >= 4,
+            ((storage > 1) & (storage < 4)) | (storage == 0),
+            (storage + 1) != 3,
+            (storage * 2) + np.ones(1, dtype="f8"),
+            (storage + nodata) * 2,
+            storage / (storage - storage),
+        ]
+        for view in views:
+            with mock.patch.object(raster.elemwise, "FUSED_MAX_OPERATIONS", 0):
+                expected = view.get_data(**request)
+            # small chunks, so that the evaluation is chunked
+            with mock.patch.object(raster.elemwise, "FUSED_CHUNK_SIZE", 2):
+                actual = view.get_data(**request)
+            self.assertEqual(expected["no_data_value"], actual["no_data_value"])
+            self.assertEqual(expected["values"].dtype, actual["values"].dtype)
+            assert_equal(expected["values"], actual["values"])
+
+    def test_math_fused_shared(self):
+        a = self.storage + 1
+        view = a * a
+        graph, name = view.get_compute_graph(**self.vals_request)
+        operations = graph[name][1]["operations"]
+        self.assertEqual(2, len(operations))
+        assert_equal(view.get_data(**self.vals_request)["values"], 4)
+
+    def test_math_fused_time_meta(self):
+        view = (self.storage + 2) * self.storage
+        time = view.get_data(**self.time_request)
+        self.assertEqual(time["time"], self.expected_time)
+        meta = view.get_data(**self.meta_request)
+        self.assertEqual(meta["meta"], self.expected_meta)
+        self.assertIsNone(
+            view.get_data(
+                mode="vals", start=Datetime(2018, 1, 1), stop=Datetime(2018, 2, 2)
+            )
+        )
+
 
 class TestFillNoData(unittest.TestCase):
     klass = raster.FillNoData
@@ -758,6 +829,22 @@ class TestCombine(unittest.TestCase):
 
         self.assertEqual(len(combined), 0)
 
+    def test_metadata_is_cached(self):
+        storage1 = MockRaster(
+            origin=Datetime(2018, 4, 1), timedelta=Timedelta(hours=1), bands=3
+        )
+        storage2 = MockRaster(
+            origin=Datetime(2018, 5, 1), timedelta=Timedelta(hours=1), bands=3
+        )
+        combined = self.klass(storage1, storage2)
+        with mock.patch.object(
+            MockRaster, "period", new_callable=mock.PropertyMock
+        ) as period:
+            period.return_value = (Datetime(2018, 4, 1), Datetime(2018, 5, 1))
+            combined.period
+            combined.period
+        self.assertEqual(period.call_count, 2)  # once per source
+
 
 class TestGroup(TestCombine, unittest.TestCase):
     klass = raster.Group
@@ -790,6 +877,23 @@ class TestGroup(TestCombine, unittest.TestCase):
 
         super(TestGroup, self).setUp()
 
+    def test_time_index(self):
+        # the storages are not aligned, so the time index is requested
+        view = self.klass(self.storage1, self.storage2)
+        self.assertIsNone(view.timedelta)
+        expected = [Datetime(2000, 1, 1, 0, x) for x in (0, 3, 5, 6, 9, 10, 12, 15)]
+        self.assertEqual(view.time_index.tolist(), expected)
+        self.assertFalse(view.time_index.flags.writeable)
+        self.assertEqual(len(view), 8)
+
+    def test_time_index_equidistant(self):
+        view = self.klass(self.storage1, self.storage3)
+        expected = [Datetime(2000, 1, 1, 0, x) for x in (0, 5, 10)]
+        self.assertEqual(view.time_index.tolist(), expected)
+
+    def test_time_index_empty(self):
+        self.assertEqual(len(self.klass(self.storage4).time_index), 0)
+
     def test_group_by_time(self):
         view = self.klass(self.storage1, self.storage2, self.storage3, self.storage4)
         time = view.get_data(
@@ -1081,6 +1185,81 @@ class TestSnap(unittest.TestCase):
         )
         self.assertEqual(data["meta"], ["Testmeta for band 0"] * 3)
 
+    def test_snap_single_store_request(self):
+        # all 3 frames of the store are needed, they are requested at once
+        sources_and_requests = self.view.get_sources_and_requests(**self.vals_request)
+        self.assertEqual(len(sources_and_requests), 2)
+        _, request = sources_and_requests[1]
+        self.assertEqual(request["start"], Datetime(2000, 1, 1))
+        self.assertEqual(request["stop"], Datetime(2000, 1, 1, 0, 10))
+        data = self.view.get_data(**self.vals_request)
+        self.assertEqual(data["values"].shape, (6, 3, 2))
+
+    def test_snap_skip_frames(self):
+        # the middle frame of the store is not needed
+        index = MockRaster(
+            origin=Datetime(2000, 1, 1), timedelta=Timedelta(minutes=10), bands=2
+        )
+        view = self.klass(self.raster, index)
+        sources_and_requests = view.get_sources_and_requests(**self.meta_request)
+        self.assertEqual(len(sources_and_requests), 3)
+        data = view.get_data(**self.meta_request)
+        self.assertEqual(data["meta"], ["Testmeta for band 0", "Testmeta for band 2"])
+
+    def test_snap_halfway(self):
+        # index times halfway two store frames snap like the store does
+        index = MockRaster(
+            origin=Datetime(2000, 1, 1, 0, 2, 30),
+            timedelta=Timedelta(minutes=5),
+            bands=2,
+        )
+        view = self.klass(self.raster, index)
+        data = view.get_data(**self.meta_request)
+        expected = [
+            self.raster.get_data(mode="meta", start=time)["meta"][0]
+            for time in index.get_data(**self.time_request)["time"]
+        ]
+        self.assertEqual(data["meta"], expected)
+
+    def test_snap_halfway_no_time_request(self):
+        # every index time is halfway two store frames
+        store = MockRaster(
+            origin=Datetime(2000, 1, 1), timedelta=Timedelta(minutes=10), bands=100
+        )
+        index = MockRaster(
+            origin=Datetime(2000, 1, 1, 0, 5), timedelta=Timedelta(minutes=10), bands=99
+        )
+        view = self.klass(store, index)
+        request = dict(
+            mode="meta", start=Datetime(2000, 1, 1), stop=Datetime(2000, 1, 2)
+        )
+        with mock.patch.object(store, "get_data", wraps=store.get_data) as get_data:
+            view.get_sources_and_requests(**request)
+        self.assertFalse(get_data.called)
+        expected = [
+            store.get_data(mode="meta", start=time)["meta"][0]
+            for time in index.get_data(**self.time_request)["time"]
+        ]
+        self.assertEqual(view.get_data(**request)["meta"], expected)
+
+    def test_snap_halfway_not_equidistant(self):
+        # a store without a timedelta: halfway times snap to the earlier frame
+        store = raster.Group(
+            self.raster,  # value 7 at 0, 5 and 10 minutes
+            MockRaster(
+                origin=Datetime(2000, 1, 1), timedelta=Timedelta(minutes=10), bands=2
+            ),  # value 1 at 0 and 10 minutes
+        )
+        self.assertIsNone(store.timedelta)
+        index = MockRaster(
+            origin=Datetime(2000, 1, 1, 0, 2, 30),
+            timedelta=Timedelta(minutes=5),
+            bands=2,
+        )
+        view = self.klass(store, index)
+        data = view.get_data(**self.vals_request)
+        assert_equal(data["values"][:, 0, 0], [1, 7])
+
 
 class TestTemporalAggregate(unittest.TestCase):
     klass = raster.TemporalAggregate
@@ -1395,6 +1574,78 @@ class TestTemporalAggregate(unittest.TestCase):
         self.request_empty["mode"] = "meta"
         assert view.get_data(**self.request_empty) == {"meta": []}
 
+    def test_get_data_chunked(self):
+        for frequency in ("W", None):
+            for statistic in self.klass.STREAMING_STATISTICS:
+                view = self.klass(self.raster, frequency, statistic=statistic)
+                expected = view.get_data(**self.request_all)
+                # a frame of 3 float64 pixels is 24 bytes: one frame per chunk
+                with config.set({"geomodeling.temporal-chunk-size": 24}):
+                    sources_and_requests = view.get_sources_and_requests(
+                        **self.request_all
+                    )
+                    result = view.get_data(**self.request_all)
+                self.assertEqual(len(sources_and_requests), 4)
+                assert_equal(result["values"], expected["values"])
+                self.assertEqual(result["values"].dtype, expected["values"].dtype)
+
+    def test_get_data_chunked_not_supported(self):
+        view = self.klass(self.raster, "W", statistic="median")
+        with config.set({"geomodeling.temporal-chunk-size": 24}):
+            sources_and_requests = view.get_sources_and_requests(**self.request_all)
+        self.assertIs(sources_and_requests[1][0], self.raster)
+
+    def test_chunks_aligned_to_bins(self):
+        view = self.klass(self.raster, "W")
+        # two frames per chunk, the first week contains two frames
+        with config.set({"geomodeling.temporal-chunk-size": 48}):
+            sources_and_requests = view.get_sources_and_requests(**self.request_all)
+        self.assertListEqual(
+            [(req["start"], req["stop"]) for (_, req) in sources_and_requests[1:]],
+            [
+                (Datetime(2000, 1, 1), Datetime(2000, 1, 2)),
+                (Datetime(2000, 1, 3), Datetime(2000, 1, 3)),
+            ],
+        )
+
+    def test_chunks_disabled(self):
+        view = self.klass(self.raster, "W")
+        with config.set({"geomodeling.temporal-chunk-size": 0}):
+            sources_and_requests = view.get_sources_and_requests(**self.request_all)
+        self.assertEqual(len(sources_and_requests), 3)
+
+
+class TestReduceBins(unittest.TestCase):
+    def setUp(self):
+        self.values = np.random.random((10, 3, 2)).astype(np.float32)
+        self.values[2:6, 0, 0] = np.nan  # covers a whole bin
+        self.values[1, 1, 1] = np.nan
+        self.starts = np.array([0, 2, 4, 5])
+
+    def test_reduce_bins(self):
+        for statistic, func in [
+            ("sum", np.nansum),
+            ("count", raster.temporal.count_not_nan),
+            ("min", np.nanmin),
+            ("max", np.nanmax),
+            ("mean", np.nanmean),
+        ]:
+            expected = [func(x, axis=0) for x in np.split(self.values, self.starts[1:])]
+            # small frames use reduceat, large frames loop over the bins
+            for max_size in (64, 0):
+                with mock.patch.object(
+                    raster.temporal, "REDUCEAT_MAX_SIZE", max_size
+                ), np.errstate(invalid="ignore"):
+                    actual = raster.temporal._reduce_bins(
+                        self.values.copy(), self.starts, statistic
+                    )
+                assert_allclose(actual, expected, rtol=1e-6, err_msg=statistic)
+
+    def test_reduce_bins_not_supported(self):
+        self.assertIsNone(
+            raster.temporal._reduce_bins(self.values, self.starts, "median")
+        )
+
 
 class TestCumulative(unittest.TestCase):
     klass = raster.Cumulative
@@ -1526,6 +1777,119 @@ class TestCumulative(unittest.TestCase):
         self.request_empty["mode"] = "meta"
         assert view.get_data(**self.request_empty) == {"meta": []}
 
+    def test_get_data_chunked(self):
+        for frequency in ("W", None):
+            for statistic in ("sum", "count"):
+                view = self.klass(self.raster, statistic, frequency)
+                for request in (self.request_all, self.request_second):
+                    expected = view.get_data(**request)
+                    # a frame of 3 float64 pixels is 24 bytes: 1 frame per chunk
+                    with config.set({"geomodeling.temporal-chunk-size": 24}):
+                        result = view.get_data(**request)
+                    assert_equal(result["values"], expected["values"])
+                    self.assertEqual(result["values"].dtype, expected["values"].dtype)
+
+    def test_get_data_checkpoint(self):
+        self.addCleanup(raster.temporal._checkpoint_cache.clear)
+        view = self.klass(self.raster, frequency=None, statistic="sum")
+        with mock.patch.object(raster.temporal, "CHECKPOINT_INTERVAL", 2), config.set(
+            {"geomodeling.checkpoint-cache-size": 1024}
+        ):
+            sources_and_requests = view.get_sources_and_requests(**self.request_last)
+            self.assertEqual(sources_and_requests[2][1]["start"], Datetime(2000, 1, 1))
+            # the request for all frames stores a checkpoint at the 2nd frame
+            view.get_data(**self.request_all)
+            sources_and_requests = view.get_sources_and_requests(**self.request_last)
+            self.assertEqual(sources_and_requests[2][1]["start"], Datetime(2000, 1, 3))
+            result = view.get_data(**self.request_last)
+        assert_equal(result["values"], [[[3.0, 0.0, 0.0]]])
+
+    def test_get_data_checkpoint_no_time_request(self):
+        self.addCleanup(raster.temporal._checkpoint_cache.clear)
+        view = self.klass(self.raster, frequency=None, statistic="sum")
+        with mock.patch.object(raster.temporal, "CHECKPOINT_INTERVAL", 2), config.set(
+            {"geomodeling.checkpoint-cache-size": 1024}
+        ):
+            view.get_data(**self.request_all)
+            with mock.patch.object(
+                self.raster, "get_data", wraps=self.raster.get_data
+            ) as get_data:
+                sources_and_requests = view.get_sources_and_requests(
+                    **self.request_last
+                )
+        self.assertEqual(sources_and_requests[2][1]["start"], Datetime(2000, 1, 3))
+        # only the time of the requested (last) frame is requested
+        get_data.assert_called_once_with(mode="time", start=None, stop=None)
+
+    def test_get_data_checkpoint_not_equidistant(self):
+        self.addCleanup(raster.temporal._checkpoint_cache.clear)
+        view = self.klass(self.raster, frequency=None, statistic="sum")
+        with mock.patch.object(raster.temporal, "CHECKPOINT_INTERVAL", 2), config.set(
+            {"geomodeling.checkpoint-cache-size": 1024}
+        ):
+            view.get_data(**self.request_all)
+            with mock.patch.object(MockRaster, "timedelta", None):
+                sources_and_requests = view.get_sources_and_requests(
+                    **self.request_last
+                )
+        self.assertEqual(sources_and_requests[2][1]["start"], Datetime(2000, 1, 3))
+
+    def test_get_data_checkpoint_count(self):
+        self.addCleanup(raster.temporal._checkpoint_cache.clear)
+        view = self.klass(self.raster, frequency=None, statistic="count")
+        with mock.patch.object(raster.temporal, "CHECKPOINT_INTERVAL", 1), config.set(
+            {"geomodeling.checkpoint-cache-size": 1024}
+        ):
+            view.get_data(**self.request_first_two)
+            result = view.get_data(**self.request_last)
+        assert_equal(result["values"], [[[3, 3, 0]]])
+
+    def test_get_data_checkpoint_file_changed(self):
+        self.addCleanup(raster.temporal._checkpoint_cache.clear)
+        view = self.klass(self.raster, frequency=None, statistic="sum")
+        with mock.patch.object(raster.temporal, "CHECKPOINT_INTERVAL", 2), config.set(
+            {"geomodeling.checkpoint-cache-size": 1024}
+        ):
+            with mock.patch.object(
+                self.raster, "get_file_signatures", return_value=[(1, 1)]
+            ):
+                view.get_data(**self.request_all)
+            with mock.patch.object(
+                self.raster, "get_file_signatures", return_value=[(2, 1)]
+            ):
+                sources_and_requests = view.get_sources_and_requests(
+                    **self.request_last
+                )
+        self.assertEqual(sources_and_requests[2][1]["start"], Datetime(2000, 1, 1))
+
+    def test_get_data_checkpoint_processes(self):
+        self.addCleanup(raster.temporal._checkpoint_cache.clear)
+        view = self.klass(self.raster, frequency=None, statistic="sum")
+        with mock.patch.object(raster.temporal, "CHECKPOINT_INTERVAL", 2), config.set(
+            {"geomodeling.checkpoint-cache-size": 1024}
+        ):
+            with config.set({"geomodeling.scheduler": "processes"}):
+                sources_and_requests = view.get_sources_and_requests(
+                    **self.request_all
+                )
+            # no checkpoint is looked up and none will be stored
+            self.assertNotIn("checkpoint_key", sources_and_requests[0][0])
+            # neither are checkpoints stored in a worker process
+            with mock.patch.object(
+                raster.temporal.multiprocessing, "current_process"
+            ) as current_process:
+                current_process.return_value.name = "SpawnProcess-1"
+                view.get_data(**self.request_all)
+        self.assertEqual(len(raster.temporal._checkpoint_cache), 0)
+
+    def test_get_data_checkpoint_disabled(self):
+        view = self.klass(self.raster, frequency=None, statistic="sum")
+        with config.set({"geomodeling.checkpoint-cache-size": 0}):
+            view.get_data(**self.request_all)
+            sources_and_requests = view.get_sources_and_requests(**self.request_last)
+        self.assertEqual(sources_and_requests[2][1]["start"], Datetime(2000, 1, 1))
+        self.assertEqual(len(raster.temporal._checkpoint_cache), 0)
+
 
 class TestBase(unittest.TestCase):
     def setUp(self):
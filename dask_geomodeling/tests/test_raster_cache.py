@@ -0,0 +1,254 @@
+import os
+from datetime import datetime, timedelta
+
+from unittest import mock
+
+import numpy as np
+import pytest
+from dask import config
+from numpy.testing import assert_equal
+
+from dask_geomodeling.raster import RasterCache
+from dask_geomodeling.raster.sources import MemorySource, MemoryMappedSource
+from dask_geomodeling.tests.factories import setup_temp_root, teardown_temp_root
+
+
+@pytest.fixture
+def root():
+    path = setup_temp_root()
+    yield path
+    teardown_temp_root(path)
+
+
+@pytest.fixture
+def source():
+    data = np.arange(2 * 10 * 10, dtype=np.int32).reshape(2, 10, 10)
+    data[:, 0, :] = -1  # first row is nodata
+    yield MemorySource(
+        data=data,
+        no_data_value=-1,
+        projection="EPSG:28992",
+        pixel_size=0.5,
+        pixel_origin=(135000, 456000),
+        time_first=datetime(2000, 1, 1),
+        time_delta=timedelta(hours=1),
+        metadata=["Testmeta for band {}".format(i) for i in range(2)],
+    )
+
+
+@pytest.fixture
+def vals_request():
+    yield {
+        "mode": "vals",
+        "start": datetime(2000, 1, 1),
+        "stop": datetime(2000, 1, 1, 1),
+        "width": 10,
+        "height": 10,
+        "bbox": (135000, 455995, 135005, 456000),
+        "projection": "EPSG:28992",
+    }
+
+
+def n_tiles(path):
+    return sum(
+        name.endswith(".npy") for (_, _, names) in os.walk(path) for name in names
+    )
+
+
+def n_requests(view, request):
+    return len(view.get_sources_and_requests(**request)) - 1
+
+
+def test_cache_init(source, root):
+    with pytest.raises(TypeError):
+        RasterCache(None, "cache", 4)
+    with pytest.raises(TypeError):
+        RasterCache(source, 5, 4)
+    with pytest.raises(ValueError):
+        RasterCache(source, "cache", 0)
+
+
+def test_cache_attrs(source, root):
+    view = RasterCache(source, "cache", 4)
+    assert view.path == os.path.join(root, "cache")
+    assert view.tile_size == 4
+    assert view.period == source.period
+    assert view.geo_transform == source.geo_transform
+
+
+def test_cache_miss_and_hit(source, root, vals_request):
+    view = RasterCache(source, "cache", 4)
+    # the request spans 3 x 3 tiles, because the grid starts at 0, 0
+    assert n_requests(view, vals_request) == 9
+    first = view.get_data(**vals_request)
+    assert n_tiles(root) == 9
+    assert n_requests(view, vals_request) == 0
+    second = view.get_data(**vals_request)
+
+    expected = source.get_data(**vals_request)
+    for actual in (first, second):
+        assert actual["no_data_value"] == expected["no_data_value"]
+        assert actual["values"].dtype == expected["values"].dtype
+        assert_equal(actual["values"], expected["values"])
+
+
+@pytest.mark.parametrize(
+    "bbox,shape",
+    [
+        ((135001, 455996, 135004, 455998), (6, 4)),  # overlaps cached tiles
+        ((135001, 455996, 135004, 455998), (3, 2)),  # other zoom level
+        ((135002, 455996, 135004, 455998), (4, 4)),  # exactly one tile
+    ],
+)
+def test_cache_other_bbox(source, root, vals_request, bbox, shape):
+    view = RasterCache(source, "cache", 4)
+    view.get_data(**vals_request)
+    vals_request["bbox"] = bbox
+    vals_request["width"], vals_request["height"] = shape
+    assert_equal(
+        view.get_data(**vals_request)["values"],
+        source.get_data(**vals_request)["values"],
+    )
+    # the result is the same when read from the cache
+    assert n_requests(view, vals_request) == 0
+    assert_equal(
+        view.get_data(**vals_request)["values"],
+        source.get_data(**vals_request)["values"],
+    )
+
+
+def test_cache_per_layer(source, root, vals_request):
+    view = RasterCache(source, "cache", 4)
+    view.get_data(**vals_request)
+    vals_request["start"] = vals_request["stop"] = datetime(2000, 1, 1, 1)
+    assert n_requests(view, vals_request) == 9
+    assert_equal(
+        view.get_data(**vals_request)["values"],
+        source.get_data(**vals_request)["values"],
+    )
+
+
+def test_cache_per_store(source, root, vals_request):
+    RasterCache(source, "cache", 4).get_data(**vals_request)
+    view = RasterCache(source + 1, "cache", 4)
+    assert n_requests(view, vals_request) == 9
+
+
+def test_cache_unaligned(source, root, vals_request):
+    vals_request["bbox"] = (135000.1, 455995, 135005.1, 456000)
+    view = RasterCache(source, "cache", 4)
+    sources_and_requests = view.get_sources_and_requests(**vals_request)
+    assert sources_and_requests[1] == (source, vals_request)
+    view.get_data(**vals_request)
+    assert n_tiles(root) == 0
+
+
+def test_cache_point(source, root, vals_request):
+    vals_request["bbox"] = (135001, 455999, 135001, 455999)
+    vals_request["width"] = vals_request["height"] = 1
+    view = RasterCache(source, "cache", 4)
+    assert_equal(
+        view.get_data(**vals_request)["values"],
+        source.get_data(**vals_request)["values"],
+    )
+    assert n_tiles(root) == 0
+
+
+def test_cache_empty(source, root, vals_request):
+    vals_request["start"] = vals_request["stop"] = datetime(1970, 1, 1)
+    view = RasterCache(source, "cache", 4)
+    assert view.get_data(**vals_request) is None
+    assert n_tiles(root) == 0
+
+
+def test_cache_eviction(source, root, vals_request):
+    view = RasterCache(source, "cache", 4)
+    # a tile has 2 x 4 x 4 int32 values and a header of 128 bytes
+    with config.set({"geomodeling.raster-cache-size": 5 * (128 + 128)}):
+        actual = view.get_data(**vals_request)
+    assert n_tiles(root) == 5
+    assert_equal(actual["values"], source.get_data(**vals_request)["values"])
+
+
+def test_cache_removed_tile(source, root, vals_request):
+    view = RasterCache(source, "cache", 4)
+    view.get_data(**vals_request)
+    ((process_kwargs, _),) = view.get_sources_and_requests(**vals_request)
+    for path in process_kwargs["paths"]:
+        os.remove(path)
+    # the tiles were opened while planning, so they can still be read
+    actual = view.process(process_kwargs)
+    assert_equal(actual["values"], source.get_data(**vals_request)["values"])
+
+
+def test_cache_planning_has_no_side_effects(source, root, vals_request):
+    view = RasterCache(source, "cache", 4)
+    view.get_data(**vals_request)
+    with mock.patch("os.utime") as utime:
+        view.get_sources_and_requests(**vals_request)
+    assert not utime.called
+
+
+def test_cache_changed_file(root, vals_request):
+    path = os.path.join(root, "data.npy")
+    np.save(path, np.ones((2, 10, 10), dtype=np.int32))
+    source = MemoryMappedSource(
+        url="data.npy",
+        no_data_value=-1,
+        projection="EPSG:28992",
+        pixel_size=0.5,
+        pixel_origin=(135000, 456000),
+        time_first=datetime(2000, 1, 1),
+        time_delta=timedelta(hours=1),
+    )
+    view = RasterCache(source, "cache", 4)
+    assert_equal(view.get_data(**vals_request)["values"], 1)
+    np.save(path, np.full((2, 10, 10), 2, dtype=np.int32))
+    os.utime(path, ns=(0, 0))
+    assert n_requests(view, vals_request) == 9
+    assert_equal(view.get_data(**vals_request)["values"], 2)
+
+
+def test_cache_some_tiles_empty(source, root, vals_request):
+    # the store returns no data for the tiles in the left column
+    get_sources_and_requests = source.get_sources_and_requests
+
+    def get_sources_and_requests_right(**request):
+        if request["mode"] == "vals" and request["bbox"][0] < 135002:
+            return [({"mode": "empty_vals"}, None)]
+        return get_sources_and_requests(**request)
+
+    view = RasterCache(source, "cache", 4)
+    with mock.patch.object(
+        source, "get_sources_and_requests", side_effect=get_sources_and_requests_right
+    ):
+        actual = view.get_data(**vals_request)
+    expected = source.get_data(**vals_request)["values"]
+    expected[:, :, :4] = actual["no_data_value"]
+    assert_equal(actual["values"], expected)
+    assert n_tiles(root) == 6
+
+
+def test_cache_pixel_size_snapped(source, root, vals_request):
+    view = RasterCache(source, "cache", 4)
+    view.get_data(**vals_request)
+    # the same resolution, but with a slightly different pixel size
+    x1, y1, x2, y2 = vals_request["bbox"]
+    vals_request["bbox"] = x1, y1, np.nextafter(x2, np.inf), y2
+    assert n_requests(view, vals_request) == 0
+
+
+def test_cache_eviction_tracks_size(source, root, vals_request):
+    view = RasterCache(source, "cache", 4)
+    with mock.patch("dask_geomodeling.raster.cache._evict", return_value=0) as evict:
+        view.get_data(**vals_request)
+    # the tiles are counted once, and not walked after every saved tile
+    assert evict.call_count <= 1
+
+
+@pytest.mark.parametrize("mode", ["time", "meta"])
+def test_cache_other_modes(source, root, vals_request, mode):
+    vals_request["mode"] = mode
+    view = RasterCache(source, "cache", 4)
+    assert view.get_data(**vals_request) == source.get_data(**vals_request)
+    assert n_tiles(root) == 0
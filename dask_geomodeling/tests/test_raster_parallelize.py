@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+from unittest import mock
+
+import numpy as np
+import pytest
+from numpy.testing import assert_equal
+
+from dask_geomodeling.raster import RasterTiler
+from dask_geomodeling.raster.sources import MemorySource
+
+
+@pytest.fixture
+def source():
+    time_first = datetime(2000, 1, 1)
+    time_delta = timedelta(hours=1)
+    data = np.arange(3 * 10 * 10, dtype=np.int32).reshape(3, 10, 10)
+    data[:, 0, :] = -1  # first row is nodata
+    yield MemorySource(
+        data=data,
+        no_data_value=-1,
+        projection="EPSG:28992",
+        pixel_size=0.5,
+        pixel_origin=(135000, 456000),
+        time_first=time_first,
+        time_delta=time_delta,
+        metadata=["Testmeta for band {}".format(i) for i in range(3)],
+    )
+
+
+@pytest.fixture
+def vals_request():
+    yield {
+        "mode": "vals",
+        "start": datetime(2000, 1, 1),
+        "stop": datetime(2000, 1, 1, 2),
+        "width": 10,
+        "height": 10,
+        "bbox": (135000, 455995, 135005, 456000),
+        "projection": "EPSG:28992",
+    }
+
+
+def test_tiler_init(source):
+    with pytest.raises(TypeError):
+        RasterTiler(None, 4, 4)
+    with pytest.raises(ValueError):
+        RasterTiler(source, 0, 4)
+
+
+def test_tiler_attrs(source):
+    view = RasterTiler(source, 4, 3)
+    assert view.tile_width == 4
+    assert view.tile_height == 3
+    assert view.period == source.period
+    assert view.geo_transform == source.geo_transform
+
+
+@pytest.mark.parametrize("tile_size", [(1, 1), (3, 4), (4, 3), (5, 5), (9, 2)])
+def test_tiler_vals(source, vals_request, tile_size):
+    view = RasterTiler(source, *tile_size)
+    actual = view.get_data(**vals_request)
+    expected = source.get_data(**vals_request)
+    assert actual["no_data_value"] == expected["no_data_value"]
+    assert actual["values"].dtype == expected["values"].dtype
+    assert_equal(actual["values"], expected["values"])
+
+
+def test_tiler_zoomed(source, vals_request):
+    vals_request["width"] = vals_request["height"] = 20
+    view = RasterTiler(source, 6, 6)
+    assert_equal(
+        view.get_data(**vals_request)["values"],
+        source.get_data(**vals_request)["values"],
+    )
+
+
+def test_tiler_tiles(source, vals_request):
+    view = RasterTiler(source, 4, 3)
+    sources_and_requests = view.get_sources_and_requests(**vals_request)
+    assert len(sources_and_requests) == 1 + 3 * 4
+    requests = [request for (_, request) in sources_and_requests[1:]]
+    assert requests[0]["bbox"] == (135000, 455998.5, 135002, 456000)
+    assert (requests[0]["width"], requests[0]["height"]) == (4, 3)
+    assert requests[-1]["bbox"] == (135004, 455995, 135005, 455995.5)
+    assert (requests[-1]["width"], requests[-1]["height"]) == (2, 1)
+
+
+def test_tiler_graph(source, vals_request):
+    view = RasterTiler(source, 5, 5)
+    graph, name = view.get_compute_graph(**vals_request)
+    # the four tiles are independent nodes
+    assert sum(key.startswith("memorysource") for key in graph) == 4
+
+
+def test_tiler_no_tiling(source, vals_request):
+    view = RasterTiler(source, 10, 10)
+    sources_and_requests = view.get_sources_and_requests(**vals_request)
+    assert len(sources_and_requests) == 2
+    assert sources_and_requests[1][1] == vals_request
+
+
+def test_tiler_empty(source, vals_request):
+    vals_request["start"] = vals_request["stop"] = datetime(1970, 1, 1)
+    view = RasterTiler(source, 4, 4)
+    assert view.get_data(**vals_request) is None
+
+
+@pytest.mark.parametrize("empty_side", ["left", "right"])
+def test_tiler_some_tiles_empty(source, vals_request, empty_side):
+    # the store returns no data for the tiles in the left or right half
+    get_sources_and_requests = source.get_sources_and_requests
+
+    def get_sources_and_requests_half(**request):
+        left = request["bbox"][0] < 135002.5
+        if request["mode"] == "vals" and left == (empty_side == "left"):
+            return [({"mode": "empty_vals"}, None)]
+        return get_sources_and_requests(**request)
+
+    expected = source.get_data(**vals_request)["values"]
+    if empty_side == "left":
+        expected[:, :, :5] = -1
+    else:
+        expected[:, :, 5:] = -1
+    view = RasterTiler(source, 5, 4)
+    with mock.patch.object(
+        source, "get_sources_and_requests", side_effect=get_sources_and_requests_half
+    ):
+        actual = view.get_data(**vals_request)
+    assert actual["no_data_value"] == -1
+    assert_equal(actual["values"], expected)
+
+
+@pytest.mark.parametrize("mode", ["time", "meta"])
+def test_tiler_other_modes(source, vals_request, mode):
+    vals_request["mode"] = mode
+    view = RasterTiler(source, 4, 4)
+    assert view.get_data(**vals_request) == source.get_data(**vals_request)
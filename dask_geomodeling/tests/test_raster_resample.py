@@ -0,0 +1,129 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+from numpy.testing import assert_equal, assert_allclose
+
+from dask_geomodeling.raster.resample import get_resampling_method, resample
+from dask_geomodeling.raster.sources import MemorySource
+
+
+@pytest.fixture
+def data():
+    yield np.array([[[1, 2, 3, 4], [5, 6, 7, 8], [9, 10, 11, 12], [13, 14, 15, 255]]])
+
+
+@pytest.fixture
+def source():
+    yield MemorySource(
+        data=np.array([[[1, 3], [5, 255]]], dtype=np.uint8),
+        no_data_value=255,
+        projection="EPSG:28992",
+        pixel_size=1,
+        pixel_origin=(0, 2),
+        time_first=datetime(2000, 1, 1),
+    )
+
+
+@pytest.mark.parametrize("method", ["nearest", "bilinear", "average"])
+def test_same_shape(data, method):
+    assert resample(data, 255, 4, 4, method) is data
+
+
+@pytest.mark.parametrize("method", ["nearest", "bilinear", "average"])
+@pytest.mark.parametrize("dtype", ["u1", "i4", "f4", "f8"])
+def test_dtype(data, method, dtype):
+    result = resample(data.astype(dtype), 255, 3, 5, method)
+    assert result.shape == (1, 3, 5)
+    assert result.dtype == np.dtype(dtype)
+
+
+@pytest.mark.parametrize("method", ["nearest", "bilinear", "average"])
+def test_all_nodata(method):
+    data = np.full((2, 4, 4), 255, dtype=np.uint8)
+    assert_equal(resample(data, 255, 2, 3, method), 255)
+
+
+@pytest.mark.parametrize("method", ["nearest", "bilinear", "average"])
+def test_empty(method):
+    result = resample(np.empty((1, 0, 0)), -1.0, 2, 2, method)
+    assert_equal(result, -1.0)
+
+
+def test_nearest(data):
+    assert_equal(resample(data, 255, 2, 2, "nearest"), [[[6, 8], [14, 255]]])
+    assert_equal(
+        resample(data[:, :2, :2], 255, 4, 4, "nearest"),
+        [[[1, 1, 2, 2], [1, 1, 2, 2], [5, 5, 6, 6], [5, 5, 6, 6]]],
+    )
+
+
+def test_average(data):
+    assert_equal(resample(data, 255, 2, 2, "average"), [[[4, 6], [12, 13]]])
+    assert_equal(resample(data, 255, 1, 1, "average"), [[[8]]])
+
+
+def test_average_float(data):
+    result = resample(data.astype("f8"), 255, 2, 2, "average")
+    assert_allclose(result, [[[3.5, 5.5], [11.5, 38 / 3]]])
+
+
+def test_average_nan(data):
+    data = data.astype("f8")
+    data[0, 0, 0] = np.nan
+    result = resample(data, 255, 2, 2, "average")
+    assert_allclose(result[0, 0, 0], 13 / 3)
+
+
+def test_bilinear():
+    data = np.array([[[0.0, 4.0], [8.0, 12.0]]])
+    result = resample(data, -1.0, 4, 4, "bilinear")
+    assert_allclose(
+        result,
+        [
+            [
+                [0.0, 1.0, 3.0, 4.0],
+                [2.0, 3.0, 5.0, 6.0],
+                [6.0, 7.0, 9.0, 10.0],
+                [8.0, 9.0, 11.0, 12.0],
+            ]
+        ],
+    )
+
+
+def test_bilinear_nodata():
+    data = np.array([[[0.0, 4.0], [8.0, -1.0]]])
+    result = resample(data, -1.0, 4, 4, "bilinear")
+    # the nodata pixel does not contribute
+    assert_allclose(result[0, 0], [0.0, 1.0, 3.0, 4.0])
+    assert_allclose(result[0, 3, 3], -1.0)
+    assert_allclose(result[0, 2, 2], (0.0 * 1 + 4.0 * 3 + 8.0 * 3) / 7)
+
+
+def test_bilinear_integer_rounds():
+    data = np.array([[[0, 1]]], dtype=np.uint8)
+    assert_equal(resample(data, 255, 1, 4, "bilinear"), [[[0, 0, 1, 1]]])
+
+
+def test_get_resampling_method():
+    assert get_resampling_method({}) == "nearest"
+    assert get_resampling_method({"aggregation": None}) == "nearest"
+    assert get_resampling_method({"aggregation": "average"}) == "average"
+    with pytest.raises(ValueError):
+        get_resampling_method({"aggregation": "median"})
+
+
+@pytest.mark.parametrize(
+    "aggregation,expected",
+    [(None, 255), ("nearest", 255), ("average", 3), ("bilinear", 3)],
+)
+def test_source_aggregation(source, aggregation, expected):
+    data = source.get_data(
+        mode="vals",
+        bbox=(0, 0, 2, 2),
+        width=1,
+        height=1,
+        projection="EPSG:28992",
+        aggregation=aggregation,
+    )
+    assert_equal(data["values"], [[[expected]]])
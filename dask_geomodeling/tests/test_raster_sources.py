@@ -1,12 +1,22 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from unittest import mock
 import unittest
 import os
 
 import numpy as np
+from dask import config
 from numpy.testing import assert_equal, assert_allclose
+from osgeo import gdal
 
 from dask_geomodeling import utils
-from dask_geomodeling.raster import MemorySource, RasterFileSource
+from dask_geomodeling.core import get_result_cache
+from dask_geomodeling.raster import (
+    MemorySource,
+    MemoryMappedSource,
+    RasterFileSource,
+)
+from dask_geomodeling.raster.sources import _get_overview_level
 
 from dask_geomodeling.tests.factories import (
     setup_temp_root,
@@ -75,6 +85,31 @@ class TstRasterSourceBase:
             self.assertEqual(data["values"].shape, (1, 1, 1))
             assert_equal(data["values"], data["no_data_value"])
 
+    def test_point_time_series(self):
+        data = self.source.get_data(
+            mode="vals",
+            projection="EPSG:28992",
+            bbox=(136701, 455799, 136701, 455799),
+            width=1,
+            height=1,
+            start=datetime(2000, 1, 1),
+            stop=datetime(2000, 1, 2),
+        )
+        self.assertEqual(data["values"].shape, (2, 1, 1))
+        assert_equal(data["values"][1], 5)
+
+    def test_point_multiple_pixels(self):
+        data = self.source.get_data(
+            mode="vals",
+            projection="EPSG:28992",
+            bbox=(136701, 455799, 136701, 455799),
+            width=2,
+            height=3,
+            aggregation="average",
+        )
+        self.assertEqual(data["values"].shape, (1, 3, 2))
+        assert_equal(data["values"], 5)
+
     def test_bbox_single_pixel(self):
         data = self.source.get_data(
             mode="vals",
@@ -119,7 +154,7 @@ class TstRasterSourceBase:
         )
         self.assertEqual(data["values"].shape, (1, 2, 4))
         n = data["no_data_value"]
-        assert_equal(data["values"], [[[5, 4, n, n], [5, 4, n, n]]])
+        assert_equal(data["values"], [[[5, 5, n, n], [5, 5, n, n]]])
 
     def test_bbox_single_pixel_zoom_in(self):
         data = self.source.get_data(
@@ -132,6 +167,56 @@ class TstRasterSourceBase:
         self.assertEqual(data["values"].shape, (1, 5, 5))
         assert_equal(data["values"], 5)
 
+    def test_bbox_zoom_out(self):
+        data = self.source.get_data(
+            mode="vals",
+            projection="EPSG:28992",
+            bbox=(136695, 455800 - 5, 136705, 455800 + 5),
+            width=1,
+            height=1,
+        )
+        self.assertEqual(data["values"].shape, (1, 1, 1))
+        assert_equal(data["values"], 5)
+
+    def test_bbox_zoom_out_nodata(self):
+        data = self.source.get_data(
+            mode="vals",
+            projection="EPSG:28992",
+            bbox=(136700, 455800 - 20, 136720, 455800),
+            width=2,
+            height=2,
+        )
+        self.assertEqual(data["values"].shape, (1, 2, 2))
+        assert_equal(data["values"], data["no_data_value"])
+
+    def test_reproject_point(self):
+        # the center of the pixel in EPSG:3857
+        x, y = 569980.08, 6816439.33
+        data = self.source.get_data(
+            mode="vals",
+            projection="EPSG:3857",
+            bbox=(x, y, x, y),
+            width=1,
+            height=1,
+        )
+        self.assertEqual(data["values"].shape, (1, 1, 1))
+        assert_equal(data["values"], 5)
+
+    def test_reproject_bbox(self):
+        x, y = 569980.08, 6816439.33
+        data = self.source.get_data(
+            mode="vals",
+            projection="EPSG:3857",
+            bbox=(x - 20, y - 20, x + 20, y + 20),
+            width=5,
+            height=5,
+        )
+        self.assertEqual(data["values"].shape, (1, 5, 5))
+        n = data["no_data_value"]
+        assert_equal(data["values"][0, 2, 2], 5)
+        assert_equal(data["values"][0, 0], n)
+        assert_equal(data["values"][0, :, 0], n)
+
     def test_get_time_last(self):
         data = self.source.get_data(mode="time")
         self.assertEqual(data["time"], [self.source.period[1]])
@@ -242,3 +327,211 @@ class TestGeoTIFFSource(TstRasterSourceBase, unittest.TestCase):
 
     def tearDown(self):
         self.source.close_dataset()  # needed for the tearDownClass
+
+    def test_multiple_bands(self):
+        data = self.source.get_data(
+            mode="vals",
+            projection="EPSG:28992",
+            bbox=(136700, 455800 - 5, 136710, 455800),
+            width=2,
+            height=1,
+            start=datetime(2000, 1, 1),
+            stop=datetime(2000, 1, 2),
+        )
+        self.assertEqual(data["values"].shape, (2, 1, 2))
+        n = data["no_data_value"]
+        assert_equal(data["values"], [[[5, n]], [[5, n]]])
+
+    def test_dataset_is_pooled(self):
+        self.assertIs(self.source.gdal_dataset, self.source.gdal_dataset)
+
+    def test_close_dataset(self):
+        dataset = self.source.gdal_dataset
+        self.source.close_dataset()
+        self.assertIsNot(dataset, self.source.gdal_dataset)
+
+    def test_dataset_pool_disabled(self):
+        with config.set({"geomodeling.dataset-pool-size": 0}):
+            self.assertIsNot(self.source.gdal_dataset, self.source.gdal_dataset)
+
+    def test_dataset_pool_per_thread(self):
+        dataset = self.source.gdal_dataset
+        with ThreadPoolExecutor(1) as executor:
+            other = executor.submit(lambda: self.source.gdal_dataset).result()
+        self.assertIsNotNone(other)
+        self.assertIsNot(dataset, other)
+
+    def test_dataset_pool_reopens_changed_file(self):
+        dataset = self.source.gdal_dataset
+        stat = os.stat(self.single_pixel_tif)
+        os.utime(
+            self.single_pixel_tif, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9)
+        )
+        self.assertIsNot(dataset, self.source.gdal_dataset)
+
+    def test_dataset_pool_size(self):
+        dataset = self.source.gdal_dataset
+        with config.set({"geomodeling.dataset-pool-size": 1}):
+            path = os.path.join(self.path, "test02.tiff")
+            create_tif(path, bands=1, dtype="u1", shape=(1, 1))
+            try:
+                other = utils.get_dataset(path)
+                self.assertIsNotNone(other)
+                # the first dataset was evicted from the pool
+                self.assertIsNot(dataset, self.source.gdal_dataset)
+            finally:
+                utils.close_dataset()
+                os.remove(path)
+
+
+class TestMemoryMappedSource(TstRasterSourceBase, unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.path = setup_temp_root()
+        cls.npy = os.path.join(cls.path, "test01.npy")
+        np.save(cls.npy, np.array([[[4]], [[5]]], dtype=np.uint8))
+
+    @classmethod
+    def tearDownClass(cls):
+        teardown_temp_root(cls.path)
+
+    def setUp(self):
+        self.source = MemoryMappedSource(
+            url="test01.npy",
+            no_data_value=255,
+            projection="EPSG:28992",
+            pixel_size=5,
+            pixel_origin=(136700, 455800),
+            time_first=datetime(2000, 1, 1),
+            time_delta=timedelta(days=1),
+            metadata=["meta 1", "meta 2"],
+        )
+
+    def test_url(self):
+        self.assertEqual(self.source.url, "file://" + self.npy)
+
+    def test_graph_contains_path(self):
+        graph, name = self.source.get_compute_graph(
+            mode="vals",
+            projection="EPSG:28992",
+            bbox=(136700, 455800 - 5, 136700 + 5, 455800),
+            width=1,
+            height=1,
+        )
+        process_kwargs = graph[name][1]
+        self.assertEqual(process_kwargs["data"], ("file://" + self.npy, 1, 2))
+
+    def test_aligned_request_is_view(self):
+        data = self.source.get_data(
+            mode="vals",
+            projection="EPSG:28992",
+            bbox=(136700, 455800 - 5, 136700 + 5, 455800),
+            width=1,
+            height=1,
+        )
+        self.assertTrue(np.shares_memory(data["values"], self.source.data))
+        self.assertFalse(data["values"].flags.writeable)
+
+    def test_changed_file_not_cached(self):
+        request = dict(
+            mode="vals",
+            projection="EPSG:28992",
+            bbox=(136700, 455800 - 5, 136700 + 5, 455800),
+            width=1,
+            height=1,
+        )
+        self.addCleanup(get_result_cache().clear)
+        self.addCleanup(np.save, self.npy, np.array([[[4]], [[5]]], dtype=np.uint8))
+        with config.set({"geomodeling.result-cache-size": 10 ** 6}):
+            self.assertEqual(self.source.get_data(**request)["values"].item(), 5)
+            np.save(self.npy, np.array([[[4]], [[6]]], dtype=np.uint8))
+            os.utime(self.npy, ns=(0, 0))
+            self.assertEqual(self.source.get_data(**request)["values"].item(), 6)
+
+    def test_padded_request_is_copy(self):
+        data = self.source.get_data(
+            mode="vals",
+            projection="EPSG:28992",
+            bbox=(136700, 455800 - 5, 136710, 455800),
+            width=2,
+            height=1,
+        )
+        self.assertFalse(np.shares_memory(data["values"], self.source.data))
+
+    def test_not_3d(self):
+        np.save(os.path.join(self.path, "test02.npy"), np.zeros((2, 2)))
+        with self.assertRaises(ValueError):
+            MemoryMappedSource("test02.npy", 255, "EPSG:28992", 5, (0, 0))
+
+
+class TestOverviews(unittest.TestCase):
+    def setUp(self):
+        self.path = setup_temp_root()
+        self.tif = os.path.join(self.path, "overviews.tiff")
+        create_tif(
+            self.tif,
+            base_level=7,
+            dtype="u1",
+            geo_transform=(0.0, 1.0, 0.0, 1024.0, 0.0, -1.0),
+            shape=(1024, 1024),
+        )
+        self.source = RasterFileSource(self.tif)
+
+    def tearDown(self):
+        self.source.close_dataset()
+        teardown_temp_root(self.path)
+
+    def get_values(self, size):
+        return self.source.get_data(
+            mode="vals",
+            projection="EPSG:28992",
+            bbox=(0, 0, 1024, 1024),
+            width=size,
+            height=size,
+        )["values"]
+
+    def test_build_overviews(self):
+        self.assertEqual(utils.build_overviews(self.tif), [2, 4])
+        band = self.source.gdal_dataset.GetRasterBand(1)
+        self.assertEqual(band.GetOverviewCount(), 2)
+
+    def test_read_overview(self):
+        utils.build_overviews(self.tif, [4])
+        # change the data without updating the overview
+        dataset = gdal.Open(self.tif, gdal.GA_Update)
+        dataset.GetRasterBand(1).Fill(3)
+        dataset = None
+
+        assert_equal(self.get_values(256), 7)  # from the overview
+        assert_equal(self.get_values(512), 3)  # too coarse overview
+        assert_equal(self.get_values(1024), 3)
+
+
+class TestOverviewLevel(unittest.TestCase):
+    def setUp(self):
+        self.band = mock.Mock(XSize=1000, YSize=500)
+        overviews = [
+            mock.Mock(XSize=500, YSize=250),
+            mock.Mock(XSize=250, YSize=125),
+            mock.Mock(XSize=125, YSize=63),
+        ]
+        self.band.GetOverviewCount.return_value = len(overviews)
+        self.band.GetOverview.side_effect = overviews.__getitem__
+
+    def test_native(self):
+        self.assertIsNone(_get_overview_level(self.band, 1, 1))
+        self.assertIsNone(_get_overview_level(self.band, 1.9, 1.9))
+        self.assertIsNone(_get_overview_level(self.band, 0.5, 0.5))
+
+    def test_overview(self):
+        self.assertEqual(_get_overview_level(self.band, 2, 2), 0)
+        self.assertEqual(_get_overview_level(self.band, 7.9, 7.9), 1)
+        self.assertEqual(_get_overview_level(self.band, 100, 100), 2)
+
+    def test_anisotropic(self):
+        # the finest resolution determines the overview
+        self.assertEqual(_get_overview_level(self.band, 4, 2), 0)
+
+    def test_no_overviews(self):
+        self.band.GetOverviewCount.return_value = 0
+        self.assertIsNone(_get_overview_level(self.band, 4, 4))
@@ -1,4 +1,5 @@
 from unittest import mock
+from datetime import datetime
 import unittest
 import pytest
 import sys
@@ -205,6 +206,109 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(expected, result)
 
 
+class TestZoomedRanges(unittest.TestCase):
+    def test_no_padding(self):
+        ranges = utils.get_zoomed_ranges(((2, 6), (0, 4)), None, 4, 4)
+        self.assertEqual(ranges, ((0, 4), (0, 4)))
+
+    def test_padding(self):
+        ranges = utils.get_zoomed_ranges(((0, 2), (0, 2)), ((1, 1), (2, 0)), 4, 4)
+        self.assertEqual(ranges, ((1, 3), (2, 4)))
+
+    def test_zoom_out(self):
+        ranges = utils.get_zoomed_ranges(((0, 5), (0, 1)), ((5, 0), (1, 0)), 5, 1)
+        self.assertEqual(ranges, ((2, 5), (0, 1)))
+
+    def test_zoom_in(self):
+        ranges = utils.get_zoomed_ranges(((0, 1), (0, 1)), ((0, 1), (0, 0)), 4, 3)
+        self.assertEqual(ranges, ((0, 2), (0, 3)))
+
+    def test_nearest_indices(self):
+        assert_array_equal(utils.get_nearest_indices(4, 4), [0, 1, 2, 3])
+        assert_array_equal(utils.get_nearest_indices(4, 2), [1, 3])
+        assert_array_equal(utils.get_nearest_indices(2, 4), [0, 0, 1, 1])
+
+
+class TestTimeIndex(unittest.TestCase):
+    def setUp(self):
+        self.times = [datetime(2000, 1, 1), datetime(2000, 1, 2), datetime(2000, 1, 4)]
+        self.index = utils.get_time_index(self.times)
+
+    def test_time_index(self):
+        self.assertEqual(self.index.dtype, np.dtype("datetime64[us]"))
+        self.assertFalse(self.index.flags.writeable)
+        self.assertEqual(self.index.tolist(), self.times)
+
+    def test_nearest(self):
+        for time, expected in [
+            (datetime(1970, 1, 1), 0),
+            (datetime(2000, 1, 1), 0),
+            (datetime(2000, 1, 1, 12), 0),  # halfway snaps to the first
+            (datetime(2000, 1, 1, 12, 1), 1),
+            (datetime(2000, 1, 3), 1),
+            (datetime(2000, 1, 3, 1), 2),
+            (datetime(2018, 1, 1), 2),
+        ]:
+            self.assertEqual(utils.get_nearest_time_index(self.index, time), expected)
+
+    def test_nearest_multiple(self):
+        times = [datetime(2000, 1, 3, 1), datetime(1970, 1, 1)]
+        assert_array_equal(utils.get_nearest_time_index(self.index, times), [2, 0])
+
+    def test_nearest_single_frame(self):
+        times = [datetime(1970, 1, 1), datetime(2018, 1, 1)]
+        assert_array_equal(utils.get_nearest_time_index(self.index[:1], times), [0, 0])
+
+
+class TestWarpIndices(unittest.TestCase):
+    def setUp(self):
+        utils._warp_indices_cache.clear()
+        self.addCleanup(utils._warp_indices_cache.clear)
+        self.args = (
+            (136700.0, 5.0, 0.0, 455800.0, 0.0, -5.0),
+            (2, 3),
+            "EPSG:28992",
+        )
+
+    def test_same_projection(self):
+        mask, rows, cols = utils.get_warp_indices(
+            *self.args, (136695, 455790, 136715, 455800), 4, 2, "EPSG:28992"
+        )
+        assert_array_equal(mask, [[0, 1, 1, 1], [0, 1, 1, 1]])
+        assert_array_equal(rows, [0, 0, 0, 1, 1, 1])
+        assert_array_equal(cols, [0, 1, 2, 0, 1, 2])
+
+    def test_other_projection(self):
+        x, y = 569980.08, 6816439.33  # center of the first pixel
+        mask, rows, cols = utils.get_warp_indices(
+            *self.args, (x, y, x, y), 1, 1, "EPSG:3857"
+        )
+        assert_array_equal(mask, [[True]])
+        assert_array_equal(rows, [0])
+        assert_array_equal(cols, [0])
+
+    def test_cached(self):
+        request = (136695, 455790, 136715, 455800), 4, 2, "EPSG:3857"
+        result = utils.get_warp_indices(*self.args, *request)
+        self.assertIs(result, utils.get_warp_indices(*self.args, *request))
+        self.assertFalse(result[0].flags.writeable)
+
+    def test_cache_disabled(self):
+        request = (136695, 455790, 136715, 455800), 4, 2, "EPSG:3857"
+        with config.set({"geomodeling.warp-cache-size": 0}):
+            result = utils.get_warp_indices(*self.args, *request)
+            self.assertIsNot(result, utils.get_warp_indices(*self.args, *request))
+
+    def test_cache_budget(self):
+        # a 100 x 100 grid takes more than 10 kB, a 10 x 10 grid less
+        bbox = (136695, 455790, 136715, 455800)
+        with config.set({"geomodeling.warp-cache-size": 10000}):
+            utils.get_warp_indices(*self.args, bbox, 100, 100, "EPSG:3857")
+            self.assertEqual(len(utils._warp_indices_cache), 0)
+            utils.get_warp_indices(*self.args, bbox, 10, 10, "EPSG:3857")
+            self.assertEqual(len(utils._warp_indices_cache), 1)
+
+
 class TestGeoTransform(unittest.TestCase):
     def setUp(self):
         self.geotransform = utils.GeoTransform((190000, 1, 0, 450000, 0, -1))
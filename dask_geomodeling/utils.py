@@ -1,7 +1,9 @@
 import re
 import pytz
 import os
+import threading
 import warnings
+from collections import OrderedDict
 from functools import lru_cache
 from itertools import repeat
 
@@ -16,6 +18,8 @@ from osgeo import gdal, ogr, osr, gdal_array
 from shapely.geometry import box, Point
 from shapely import wkb as shapely_wkb
 
+from dask_geomodeling.core.cache import ResultCache
+
 import fiona
 
 POLYGON = "POLYGON (({0} {1},{2} {1},{2} {3},{0} {3},{0} {1}))"
@@ -451,6 +455,61 @@ def transform_extent(extent, src_srs, dst_srs):
     return target.bounds
 
 
+_warp_indices_cache = ResultCache(0)
+
+
+def get_warp_indices(
+    src_geo_transform, src_shape, src_projection, bbox, width, height, projection
+):
+    """Return the source pixels for reprojecting a raster (nearest neighbour)
+
+    The centers of the pixels of the requested raster are transformed into
+    the source projection. The results are kept in a process-wide cache, so
+    that requesting the same raster again does not recompute the
+    transformation. The budget of the cache (in bytes) is set by the
+    geomodeling.warp-cache-size setting; a size of 0 disables the cache.
+    Results larger than the budget are not cached.
+
+    :param src_geo_transform: the geo transform of the source raster
+    :param src_shape: the (height, width) of the source raster
+    :param src_projection: the projection of the source raster
+    :param bbox: the requested bounding box as tuple ``(x1, y1, x2, y2)``
+    :param width: the requested width
+    :param height: the requested height
+    :param projection: the requested projection
+
+    :returns: a tuple of (mask, rows, cols). The (height, width) boolean mask
+      is True for pixels that lie inside the source raster. The rows and
+      cols are the indices into the source raster for these pixels. The
+      arrays are read-only.
+    """
+    key = src_geo_transform, src_shape, src_projection, bbox, width, height, projection
+    maxsize = config.get("geomodeling.warp-cache-size", 0)
+    if maxsize != _warp_indices_cache.maxsize:
+        _warp_indices_cache.resize(maxsize)
+    if maxsize:
+        result = _warp_indices_cache.get(key)
+        if result is not None:
+            return result
+
+    x1, y1, x2, y2 = bbox
+    x = x1 + (np.arange(width) + 0.5) * ((x2 - x1) / width)
+    y = y2 - (np.arange(height) + 0.5) * ((y2 - y1) / height)
+    points = np.empty((height, width, 2))
+    points[..., 0] = x[np.newaxis, :]
+    points[..., 1] = y[:, np.newaxis]
+    transform = osr.CoordinateTransformation(get_sr(projection), get_sr(src_projection))
+    points = np.array(transform.TransformPoints(points.reshape(-1, 2)))[:, :2]
+    rows, cols = GeoTransform(src_geo_transform).get_indices(points)
+    mask = (rows >= 0) & (rows < src_shape[0]) & (cols >= 0) & (cols < src_shape[1])
+    result = mask.reshape(height, width), rows[mask], cols[mask]
+    for array in result:
+        array.setflags(write=False)
+    if maxsize:
+        _warp_indices_cache.put(key, result)
+    return result
+
+
 EPSG3857 = get_sr("EPSG:3857")
 EPSG4326 = get_sr("EPSG:4326")
 
@@ -753,6 +812,121 @@ def safe_file_url(url, start=None):
     return "://".join([protocol, abspath])
 
 
+_dataset_pool = threading.local()
+
+
+def get_file_signature(path):
+    """Return (mtime, size) of a file, or None if it cannot be determined
+    (for instance for GDAL virtual file systems).
+
+    The signature is used to detect files that were changed in place, for
+    instance by the dataset pool and the result cache.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_dataset(path):
+    """Return an opened GDAL dataset for a path from a per-thread pool.
+
+    GDAL dataset handles may not be shared between threads, so every thread
+    keeps its own least-recently-used pool of open datasets. The size of the
+    pool is set by the 'geomodeling.dataset-pool-size' setting (0 disables the
+    pool). A pooled dataset is reopened if the modification time or size of
+    the file (or of its external overviews) changed.
+
+    Returns None if the file could not be opened, just like ``gdal.Open``.
+    """
+    size = config.get("geomodeling.dataset-pool-size")
+    if not size:
+        return gdal.Open(path)
+    try:
+        pool = _dataset_pool.datasets
+    except AttributeError:
+        pool = _dataset_pool.datasets = OrderedDict()
+
+    signature = get_file_signature(path), get_file_signature(path + ".ovr")
+    try:
+        dataset, pooled_signature = pool[path]
+    except KeyError:
+        pass
+    else:
+        if pooled_signature == signature:
+            pool.move_to_end(path)
+            return dataset
+        del pool[path]
+
+    dataset = gdal.Open(path)
+    if dataset is None:
+        return
+    pool[path] = dataset, signature
+    while len(pool) > size:
+        pool.popitem(last=False)
+    return dataset
+
+
+def close_dataset(path=None):
+    """Remove a dataset (or all datasets if path is None) from the pool of
+    the current thread, closing it if it is not referenced elsewhere."""
+    pool = getattr(_dataset_pool, "datasets", None)
+    if pool is None:
+        return
+    if path is None:
+        pool.clear()
+    else:
+        pool.pop(path, None)
+
+
+@lru_cache(16)
+def _load_memmap(path, signature):
+    return np.load(path, mmap_mode="r")
+
+
+def load_memmap(path):
+    """Return a read-only memory map of a .npy file.
+
+    The memory maps are cached per process and reopened if the modification
+    time or size of the file changed.
+    """
+    return _load_memmap(path, get_file_signature(path))
+
+
+OVERVIEW_MIN_SIZE = 256
+
+
+def build_overviews(url, factors=None, resampling="average"):
+    """Build external overviews (a .ovr file) for a raster file.
+
+    :param url: the path to the file. Relative paths are interpreted relative
+      to the geomodeling.root setting.
+    :param factors: a list of integer decimation factors. By default, powers
+      of 2 are used until the largest dimension of the coarsest overview is
+      at most OVERVIEW_MIN_SIZE.
+    :param resampling: the GDAL resampling method, default 'average'
+
+    :returns: the list of decimation factors
+
+    RasterFileSource uses the overviews to read coarse resolution requests.
+    """
+    path = safe_abspath(url)
+    dataset = gdal.Open(path)
+    if dataset is None:
+        raise IOError("Could not open '{}'".format(path))
+    if factors is None:
+        size = max(dataset.RasterXSize, dataset.RasterYSize)
+        factors = []
+        while size > OVERVIEW_MIN_SIZE:
+            size = -(-size // 2)  # overview sizes are rounded up
+            factors.append(2 ** (len(factors) + 1))
+    if factors:
+        dataset.BuildOverviews(resampling.upper(), factors)
+    dataset = None  # flush the overviews to disk
+    return factors
+
+
 PERCENTILE_REGEX = re.compile(r"^p([\d.]+)$")  # regex to match e.g. 'p50'
 
 
@@ -863,7 +1037,13 @@ def zoom_raster(data, no_data_value, height, width):
     """Zooms a data array to specified height and width
 
     Deals with no_data by setting these to 0, zooming, and putting back nodata.
-    Edges around nodata will be biased towards 0."""
+    Edges around nodata will be biased towards 0.
+
+    Deprecated: use dask_geomodeling.raster.resample.resample instead."""
+    warnings.warn(
+        "zoom_raster is deprecated, use dask_geomodeling.raster.resample",
+        DeprecationWarning,
+    )
     if data.shape[1:] == (height, width):
         return data
     factor = 1, height / data.shape[1], width / data.shape[2]
@@ -882,8 +1062,68 @@ def zoom_raster(data, no_data_value, height, width):
     return result
 
 
+def get_zoomed_ranges(ranges, padding, height, width):
+    """Return the part of a (height, width) array that is covered by data
+
+    :param ranges: the [start, stop) array ranges of the data, as returned by
+      ``GeoTransform.get_array_ranges``
+    :param padding: the [before, after] paddings of the data, as returned by
+      ``GeoTransform.get_array_ranges``
+    :param height: the height of the zoomed array
+    :param width: the width of the zoomed array
+
+    :returns: two [start, stop) ranges into the zoomed array. Pixels are
+      assigned to the data if their center lies inside it.
+    """
+    if padding is None:
+        padding = (0, 0), (0, 0)
+    result = []
+    for (start, stop), (before, after), size in zip(ranges, padding, (height, width)):
+        total = before + (stop - start) + after
+        factor = size / total
+        result.append(
+            (
+                max(int(np.ceil(before * factor - 0.5)), 0),
+                min(int(np.ceil((total - after) * factor - 0.5)), size),
+            )
+        )
+    return tuple(result)
+
+
+def get_nearest_indices(length, size):
+    """Return the indices into an axis of given length that resample it to
+    size using nearest neighbour interpolation."""
+    indices = ((np.arange(size) + 0.5) * (length / size)).astype(np.intp)
+    return np.minimum(indices, length - 1)
+
+
 def dt_to_ms(dt):
     """Converts a datetime to a POSIX timestamp in milliseconds"""
     if dt.tzinfo is None:
         dt = dt.replace(tzinfo=pytz.UTC)
     return int(dt.timestamp() * 1000)
+
+
+def get_time_index(times):
+    """Convert naive UTC datetimes to a read-only numpy datetime64 array"""
+    result = np.array(times, dtype="datetime64[us]")
+    result.flags.writeable = False
+    return result
+
+
+def get_nearest_time_index(time_index, times):
+    """Return the index of the frame in time_index that is nearest to times.
+
+    :param time_index: a sorted (and nonempty) datetime64 array, see
+      get_time_index
+    :param times: a naive UTC datetime or a list of them
+
+    Uses a binary search. Times halfway two frames snap to the first frame.
+    """
+    targets = np.asarray(get_time_index(times))
+    if len(time_index) == 1:
+        return np.zeros(targets.shape, dtype=np.intp)
+    right = np.searchsorted(time_index, targets).clip(1, len(time_index) - 1)
+    left = right - 1
+    closer = (time_index[right] - targets) < (targets - time_index[left])
+    return np.where(closer, right, left)